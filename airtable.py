@@ -4,9 +4,14 @@ All reads and writes to Airtable: Projects, Clients, Traffic table
 """
 
 import os
-import httpx
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+import dedup
+from utils import airtable_client, clients_cache
+
 # ===================
 # CONFIG
 # ===================
@@ -20,7 +25,46 @@ TRAFFIC_TABLE = 'Traffic'
 UPDATES_TABLE = 'Updates'
 MEETINGS_TABLE = 'Meetings'
 
-TIMEOUT = 10.0
+# ===================
+# FIELD PROJECTIONS
+# ===================
+
+# Each read asks Airtable for only the fields it uses (fields[]),
+# so big fields like The Story and EmailBody don't ride along.
+
+# Dedup gate only needs to know how the original was routed
+DUPLICATE_FIELDS = ['Route']
+
+# Clarify reply handler reads the suggested job and client
+PENDING_CLARIFY_FIELDS = ['JobNumber', 'clientCode', 'Status']
+
+# Fields needed to build a job card - anything else stays on Airtable
+JOB_FIELDS = [
+    'Job Number', 'Project Name', 'Description', 'The Story',
+    'Project Owner', 'Stage', 'Status', 'Update Due', 'Live',
+    'With Client?', 'Update', 'Update History', 'Channel Url',
+    'Days Since Update',
+]
+
+# get_project / get_job_by_number share one cached record, so fetch both sets
+PROJECT_RECORD_FIELDS = JOB_FIELDS + [
+    'Client', 'Round', 'Teams Channel ID', 'Files Url',
+]
+
+MEETING_FIELDS = [
+    'Title', 'Day', 'Start', 'End', 'Location', 'Whose meeting', "Who's going",
+]
+
+# ===================
+# PROJECT CACHE
+# ===================
+
+# Short-lived project cache so the enrich step after routing (and repeat
+# lookups of the same job) skip the Projects round trip
+PROJECT_CACHE_TTL = float(os.environ.get('PROJECT_CACHE_TTL', '60'))
+PROJECT_CACHE_SIZE = int(os.environ.get('PROJECT_CACHE_SIZE', '500'))
+_project_cache = OrderedDict()  # job number -> (fetched_at, record), least recently used first
+_project_cache_lock = threading.Lock()
 
 
 def _parse_date_to_iso(date_str):
@@ -51,19 +95,6 @@ def _parse_date_to_iso(date_str):
     return None
 
 
-def _headers():
-    """Standard Airtable headers"""
-    return {
-        'Authorization': f'Bearer {AIRTABLE_API_KEY}',
-        'Content-Type': 'application/json'
-    }
-
-
-def _url(table):
-    """Build Airtable URL for a table"""
-    return f'https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{table}'
-
-
 # ===================
 # TRAFFIC TABLE (Deduplication & Logging)
 # ===================
@@ -72,25 +103,38 @@ def check_duplicate(internet_message_id):
     """
     Check if we've already processed this email.
     Returns the existing record if found, None otherwise.
+    
+    Local dedup index first (microseconds); the Airtable formula scan
+    only runs on a local miss, e.g. after a redeploy wiped the index.
     """
-    if not AIRTABLE_API_KEY or not internet_message_id:
+    if not internet_message_id:
+        return None
+    
+    local = dedup.lookup(internet_message_id)
+    if local:
+        return local
+    
+    if not AIRTABLE_API_KEY:
         return None
     
     try:
         params = {
-            'filterByFormula': f"{{internetMessageId}}='{internet_message_id}'"
+            'filterByFormula': f"{{internetMessageId}}='{internet_message_id}'",
+            'maxRecords': 1
         }
         
-        response = httpx.get(
-            _url(TRAFFIC_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
+        # Only Route is read by the caller - skip the (up to 99 KB) EmailBody
+        response = airtable_client.get(TRAFFIC_TABLE, params=params, fields=DUPLICATE_FIELDS)
         response.raise_for_status()
         
         records = response.json().get('records', [])
-        return records[0] if records else None
+        if not records:
+            return None
+        
+        # Backfill so the next redelivery is caught locally
+        record = records[0]
+        dedup.remember(internet_message_id, record.get('id'), record.get('fields', {}).get('Route'))
+        return record
         
     except Exception as e:
         print(f"[airtable] Error checking duplicate: {e}")
@@ -107,14 +151,9 @@ def check_pending_clarify(conversation_id):
     
     try:
         filter_formula = f"AND({{conversationId}}='{conversation_id}', {{Status}}='pending')"
-        params = {'filterByFormula': filter_formula}
+        params = {'filterByFormula': filter_formula, 'maxRecords': 1}
         
-        response = httpx.get(
-            _url(TRAFFIC_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
+        response = airtable_client.get(TRAFFIC_TABLE, params=params, fields=PENDING_CLARIFY_FIELDS)
         response.raise_for_status()
         
         records = response.json().get('records', [])
@@ -125,51 +164,60 @@ def check_pending_clarify(conversation_id):
         return None
 
 
+def build_traffic_fields(internet_message_id, conversation_id, route, status, job_number, client_code, sender_email, subject, email_body=None):
+    """
+    Build the fields dict for a Traffic record.
+    email_body is truncated to 99,000 chars if too long (Airtable limit is 100,000).
+    """
+    # Truncate email body if too long for Airtable
+    truncated_body = None
+    if email_body:
+        if len(email_body) > 99000:
+            truncated_body = email_body[:99000] + "\n\n[TRUNCATED - email too long]"
+        else:
+            truncated_body = email_body
+    
+    return {
+        'internetMessageId': internet_message_id or '',
+        'conversationId': conversation_id or '',
+        'Route': route,
+        'Status': status,
+        'JobNumber': job_number or '',
+        'clientCode': client_code or '',
+        'SenderEmail': sender_email or '',
+        'Subject': subject or '',
+        'EmailBody': truncated_body or ''
+    }
+
+
 def log_traffic(internet_message_id, conversation_id, route, status, job_number, client_code, sender_email, subject, email_body=None):
     """
-    Log email to Traffic table.
+    Log email to Traffic table (synchronously).
     Returns the created record ID or None.
     
-    email_body is truncated to 99,000 chars if too long (Airtable limit is 100,000).
+    The /traffic endpoint uses traffic_log.log_traffic instead, which
+    queues the write and batches it in the background.
     """
     if not AIRTABLE_API_KEY:
         return None
     
     try:
-        # Truncate email body if too long for Airtable
-        truncated_body = None
-        if email_body:
-            if len(email_body) > 99000:
-                truncated_body = email_body[:99000] + "\n\n[TRUNCATED - email too long]"
-            else:
-                truncated_body = email_body
-        
         record_data = {
-            'fields': {
-                'internetMessageId': internet_message_id or '',
-                'conversationId': conversation_id or '',
-                'Route': route,
-                'Status': status,
-                'JobNumber': job_number or '',
-                'clientCode': client_code or '',
-                'SenderEmail': sender_email or '',
-                'Subject': subject or '',
-                'EmailBody': truncated_body or ''
-            }
+            'fields': build_traffic_fields(
+                internet_message_id, conversation_id, route, status,
+                job_number, client_code, sender_email, subject, email_body
+            )
         }
         
-        response = httpx.post(
-            _url(TRAFFIC_TABLE), 
-            headers=_headers(), 
-            json=record_data, 
-            timeout=TIMEOUT
-        )
+        response = airtable_client.post(TRAFFIC_TABLE, record_data)
         
         if response.status_code != 200:
             print(f"[airtable] Traffic log rejected: {response.status_code} - {response.text}")
             return None
         
-        return response.json().get('id')
+        record_id = response.json().get('id')
+        dedup.remember(internet_message_id, record_id, route)
+        return record_id
         
     except Exception as e:
         print(f"[airtable] Error logging to Traffic: {e}")
@@ -192,12 +240,7 @@ def get_email_body(internet_message_id):
             'maxRecords': 1
         }
         
-        response = httpx.get(
-            _url(TRAFFIC_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
+        response = airtable_client.get(TRAFFIC_TABLE, params=params, fields=['EmailBody'])
         response.raise_for_status()
         
         records = response.json().get('records', [])
@@ -221,12 +264,7 @@ def update_traffic_record(record_id, updates):
         return False
     
     try:
-        response = httpx.patch(
-            f"{_url(TRAFFIC_TABLE)}/{record_id}",
-            headers=_headers(),
-            json={'fields': updates},
-            timeout=TIMEOUT
-        )
+        response = airtable_client.patch(TRAFFIC_TABLE, {'fields': updates}, record_id=record_id)
         response.raise_for_status()
         return True
         
@@ -239,32 +277,60 @@ def update_traffic_record(record_id, updates):
 # PROJECTS TABLE
 # ===================
 
+def _get_project_record(job_number):
+    """
+    Fetch one Projects record by exact job number, via the project cache.
+    Returns the Airtable record or None. Raises on HTTP errors.
+    """
+    with _project_cache_lock:
+        cached = _project_cache.get(job_number)
+        if cached and time.time() - cached[0] < PROJECT_CACHE_TTL:
+            _project_cache.move_to_end(job_number)
+            return cached[1]
+    
+    params = {
+        'filterByFormula': f"{{Job Number}}='{job_number}'",
+        'maxRecords': 1
+    }
+    
+    response = airtable_client.get(PROJECTS_TABLE, params=params, fields=PROJECT_RECORD_FIELDS)
+    response.raise_for_status()
+    
+    records = response.json().get('records', [])
+    if not records:
+        return None
+    
+    with _project_cache_lock:
+        _project_cache[job_number] = (time.time(), records[0])
+        _project_cache.move_to_end(job_number)
+        while len(_project_cache) > PROJECT_CACHE_SIZE:
+            _project_cache.popitem(last=False)
+    return records[0]
+
+
+def invalidate_project(job_number):
+    """Drop a job from the project cache (call after writing to it, or after a worker has)"""
+    if not job_number:
+        return
+    with _project_cache_lock:
+        _project_cache.pop(job_number, None)
+
+
 def get_project(job_number):
     """
     Look up project by job number.
+    One Projects call (none if cached) - Team ID is joined from the
+    local Clients index rather than a second round trip.
     Returns dict with project info or None.
     """
     if not AIRTABLE_API_KEY or not job_number:
         return None
     
     try:
-        params = {
-            'filterByFormula': f"{{Job Number}}='{job_number}'"
-        }
-        
-        response = httpx.get(
-            _url(PROJECTS_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
-        if not records:
+        record = _get_project_record(job_number)
+        if not record:
             return None
         
-        record = records[0]
         fields = record['fields']
         
         # Client name might be a linked field (list)
@@ -275,7 +341,7 @@ def get_project(job_number):
         # Extract client code from job number
         client_code = job_number.split()[0] if job_number else None
         
-        # Get Team ID from Clients table
+        # Join Team ID from the Clients index (cached, no round trip)
         team_id = get_team_id(client_code) if client_code else None
         
         return {
@@ -298,6 +364,58 @@ def get_project(job_number):
         return None
 
 
+def _job_from_fields(fields):
+    """
+    Build a job card dict from a Projects record's fields.
+    Shared by the list queries and get_job_by_number.
+    """
+    job_number = fields.get('Job Number', '')
+    
+    # Get update from rollup first (source of truth), fallback to text field
+    latest_update = fields.get('Update History', '') or fields.get('Update', '')
+    
+    # Parse update history (field name is 'Update History')
+    update_history_raw = fields.get('Update History', [])
+    update_history = []
+    last_updated = None
+    
+    if update_history_raw:
+        if isinstance(update_history_raw, list):
+            update_history = update_history_raw[:5]  # Keep last 5 for history
+        elif isinstance(update_history_raw, str):
+            update_history = [u.strip() for u in update_history_raw.split('\n') if u.strip()][:5]
+        
+        # Extract date from first history entry if present
+        if update_history:
+            first_update = update_history[0]
+            if ' | ' in first_update:
+                date_part, _ = first_update.split(' | ', 1)
+                last_updated = date_part
+    
+    # Parse Update Due - now D/M/YYYY format, convert to ISO for JS
+    update_due_raw = fields.get('Update Due', '')
+    update_due = _parse_date_to_iso(update_due_raw)
+    
+    return {
+        'jobNumber': job_number,
+        'jobName': fields.get('Project Name', ''),
+        'description': fields.get('Description', ''),
+        'theStory': fields.get('The Story', ''),
+        'projectOwner': fields.get('Project Owner', ''),
+        'stage': fields.get('Stage', ''),
+        'status': fields.get('Status', ''),
+        'updateDue': update_due,
+        'liveDate': fields.get('Live', ''),  # Month dropdown: "Jan", "Feb", "Tbc"
+        'withClient': fields.get('With Client?', False),
+        'clientCode': job_number.split()[0] if job_number else '',
+        'update': latest_update,
+        'lastUpdated': last_updated,
+        'updateHistory': update_history,
+        'channelUrl': fields.get('Channel Url', ''),
+        'daysSinceUpdate': fields.get('Days Since Update', '-'),
+    }
+
+
 def get_active_jobs(client_code):
     """
     Get all active (not completed) jobs for a client.
@@ -313,66 +431,12 @@ def get_active_jobs(client_code):
         
         print(f"[airtable] Fetching active jobs for {client_code}")
         
-        response = httpx.get(
-            _url(PROJECTS_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
+        jobs = [
+            _job_from_fields(record.get('fields', {}))
+            for record in airtable_client.iter_records(PROJECTS_TABLE, params=params, fields=JOB_FIELDS)
+        ]
         
-        print(f"[airtable] Found {len(records)} active jobs for {client_code}")
-        
-        jobs = []
-        for record in records:
-            fields = record.get('fields', {})
-            job_number = fields.get('Job Number', '')
-            
-            # Get update from rollup first (source of truth), fallback to text field
-            latest_update = fields.get('Update History', '') or fields.get('Update', '')
-            
-            # Parse update history (field name is 'Update History')
-            update_history_raw = fields.get('Update History', []) or fields.get('Update history', [])
-            update_history = []
-            last_updated = None
-            
-            if update_history_raw:
-                if isinstance(update_history_raw, list):
-                    update_history = update_history_raw[:5]  # Keep last 5 for history
-                elif isinstance(update_history_raw, str):
-                    update_history = [u.strip() for u in update_history_raw.split('\n') if u.strip()][:5]
-                
-                # Extract date from first history entry if present
-                if update_history:
-                    first_update = update_history[0]
-                    if ' | ' in first_update:
-                        date_part, _ = first_update.split(' | ', 1)
-                        last_updated = date_part
-            
-            # Parse Update Due - now D/M/YYYY format, convert to ISO for JS
-            update_due_raw = fields.get('Update Due', '')
-            update_due = _parse_date_to_iso(update_due_raw)
-            
-            jobs.append({
-                'jobNumber': job_number,
-                'jobName': fields.get('Project Name', ''),
-                'description': fields.get('Description', ''),
-                'theStory': fields.get('The Story', ''),
-                'projectOwner': fields.get('Project Owner', ''),
-                'stage': fields.get('Stage', ''),
-                'status': fields.get('Status', ''),
-                'updateDue': update_due,
-                'liveDate': fields.get('Live', ''),  # Month dropdown: "Jan", "Feb", "Tbc"
-                'withClient': fields.get('With Client?', False),
-                'clientCode': job_number.split()[0] if job_number else '',
-                'update': latest_update,
-                'lastUpdated': last_updated,
-                'updateHistory': update_history,
-                'channelUrl': fields.get('Channel Url', ''),
-                'daysSinceUpdate': fields.get('Days Since Update', '-'),
-            })
+        print(f"[airtable] Found {len(jobs)} active jobs for {client_code}")
         
         return jobs
         
@@ -384,7 +448,7 @@ def get_active_jobs(client_code):
 def get_all_active_jobs():
     """
     Get ALL active jobs across ALL clients.
-    Returns list of job dicts - typically ~20 jobs total.
+    Returns list of job dicts - every page, not just the first 100.
     Use this for cross-client queries like "What's due today?"
     """
     if not AIRTABLE_API_KEY:
@@ -397,66 +461,12 @@ def get_all_active_jobs():
         
         print(f"[airtable] Fetching all active jobs across all clients")
         
-        response = httpx.get(
-            _url(PROJECTS_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
-        
-        print(f"[airtable] Found {len(records)} total active jobs")
+        jobs = [
+            _job_from_fields(record.get('fields', {}))
+            for record in airtable_client.iter_records(PROJECTS_TABLE, params=params, fields=JOB_FIELDS)
+        ]
         
-        jobs = []
-        for record in records:
-            fields = record.get('fields', {})
-            job_number = fields.get('Job Number', '')
-            
-            # Get update from rollup first (source of truth), fallback to text field
-            latest_update = fields.get('Update History', '') or fields.get('Update', '')
-            
-            # Parse update history (field name is 'Update History')
-            update_history_raw = fields.get('Update History', []) or fields.get('Update history', [])
-            update_history = []
-            last_updated = None
-            
-            if update_history_raw:
-                if isinstance(update_history_raw, list):
-                    update_history = update_history_raw[:5]  # Keep last 5 for history
-                elif isinstance(update_history_raw, str):
-                    update_history = [u.strip() for u in update_history_raw.split('\n') if u.strip()][:5]
-                
-                # Extract date from first history entry if present
-                if update_history:
-                    first_update = update_history[0]
-                    if ' | ' in first_update:
-                        date_part, _ = first_update.split(' | ', 1)
-                        last_updated = date_part
-            
-            # Parse Update Due - now D/M/YYYY format, convert to ISO for JS
-            update_due_raw = fields.get('Update Due', '')
-            update_due = _parse_date_to_iso(update_due_raw)
-            
-            jobs.append({
-                'jobNumber': job_number,
-                'jobName': fields.get('Project Name', ''),
-                'description': fields.get('Description', ''),
-                'theStory': fields.get('The Story', ''),
-                'projectOwner': fields.get('Project Owner', ''),
-                'stage': fields.get('Stage', ''),
-                'status': fields.get('Status', ''),
-                'updateDue': update_due,
-                'liveDate': fields.get('Live', ''),  # Month dropdown: "Jan", "Feb", "Tbc"
-                'withClient': fields.get('With Client?', False),
-                'clientCode': job_number.split()[0] if job_number else '',
-                'update': latest_update,
-                'lastUpdated': last_updated,
-                'updateHistory': update_history,
-                'channelUrl': fields.get('Channel Url', ''),
-                'daysSinceUpdate': fields.get('Days Since Update', '-'),
-            })
+        print(f"[airtable] Found {len(jobs)} total active jobs")
         
         return jobs
         
@@ -477,80 +487,28 @@ def get_job_by_number(job_number):
         # Normalize job number format (LAB_055 -> LAB 055)
         job_number = job_number.replace('_', ' ').upper()
         
-        filter_formula = f"{{Job Number}}='{job_number}'"
-        params = {
-            'filterByFormula': filter_formula,
-            'maxRecords': 1
-        }
-        
         print(f"[airtable] Fetching job: {job_number}")
         
-        response = httpx.get(
-            _url(PROJECTS_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
+        record = _get_project_record(job_number)
         
-        if not records:
+        if not record:
             print(f"[airtable] Job {job_number} not found")
             return None
         
-        fields = records[0].get('fields', {})
-        
-        # Get update from rollup first (source of truth), fallback to text field
-        latest_update = fields.get('Update History', '') or fields.get('Update', '')
+        fields = record.get('fields', {})
+        job = _job_from_fields(fields)
         
-        # Parse update history (field name is 'Update History')
-        update_history_raw = fields.get('Update History', []) or fields.get('Update history', [])
-        update_history = []
-        last_updated = None
-        
-        if update_history_raw:
-            if isinstance(update_history_raw, list):
-                update_history = update_history_raw[:5]  # Keep last 5 for history
-            elif isinstance(update_history_raw, str):
-                update_history = [u.strip() for u in update_history_raw.split('\n') if u.strip()][:5]
-            
-            # Extract date from first history entry if present
-            if update_history:
-                first_update = update_history[0]
-                if ' | ' in first_update:
-                    date_part, _ = first_update.split(' | ', 1)
-                    last_updated = date_part
-        
-        # Parse Update Due - now D/M/YYYY format, convert to ISO for JS
-        update_due_raw = fields.get('Update Due', '')
-        update_due = _parse_date_to_iso(update_due_raw)
-        
-        # Get client code and team ID
+        # Get client code, and join team ID from the Clients index
         client_code = job_number.split()[0] if job_number else ''
         team_id = get_team_id(client_code) if client_code else None
         
-        return {
-            'jobNumber': fields.get('Job Number', ''),
-            'jobName': fields.get('Project Name', ''),
-            'description': fields.get('Description', ''),
-            'theStory': fields.get('The Story', ''),
-            'projectOwner': fields.get('Project Owner', ''),
-            'stage': fields.get('Stage', ''),
-            'status': fields.get('Status', ''),
-            'updateDue': update_due,
-            'liveDate': fields.get('Live', ''),  # Month dropdown: "Jan", "Feb", "Tbc"
-            'withClient': fields.get('With Client?', False),
+        job.update({
             'clientCode': client_code,
-            'update': latest_update,
-            'lastUpdated': last_updated,
-            'updateHistory': update_history,
-            'channelUrl': fields.get('Channel Url', ''),
-            'daysSinceUpdate': fields.get('Days Since Update', '-'),
             'teamsChannelId': fields.get('Teams Channel ID', ''),
             'teamId': team_id,
             'filesUrl': fields.get('Files Url', ''),
-        }
+        })
+        return job
         
     except Exception as e:
         print(f"[airtable] Error getting job by number: {e}")
@@ -583,34 +541,17 @@ def update_project_record(job_number, updates):
         return {'success': False, 'error': 'Missing API key or job number'}
     
     try:
-        # Find the project record
-        params = {
-            'filterByFormula': f"{{Job Number}}='{job_number}'",
-            'maxRecords': 1
-        }
-        
-        response = httpx.get(
-            _url(PROJECTS_TABLE),
-            headers=_headers(),
-            params=params,
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
-        if not records:
+        # Find the project record (record IDs never change, so cache is safe)
+        record = _get_project_record(job_number)
+        if not record:
             return {'success': False, 'error': f'Job {job_number} not found'}
         
-        record_id = records[0]['id']
+        record_id = record['id']
         
         # Update the record
-        response = httpx.patch(
-            f"{_url(PROJECTS_TABLE)}/{record_id}",
-            headers=_headers(),
-            json={'fields': updates},
-            timeout=TIMEOUT
-        )
+        response = airtable_client.patch(PROJECTS_TABLE, {'fields': updates}, record_id=record_id)
         response.raise_for_status()
+        invalidate_project(job_number)
         
         print(f"[airtable] Updated project {job_number}: {list(updates.keys())}")
         return {'success': True, 'updated': list(updates.keys())}
@@ -637,24 +578,11 @@ def create_update_record(job_number, update_text, update_due=None):
     
     try:
         # First, find the project record ID to link to
-        params = {
-            'filterByFormula': f"{{Job Number}}='{job_number}'",
-            'maxRecords': 1
-        }
-        
-        response = httpx.get(
-            _url(PROJECTS_TABLE),
-            headers=_headers(),
-            params=params,
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
-        if not records:
+        record = _get_project_record(job_number)
+        if not record:
             return {'success': False, 'error': f'Project {job_number} not found'}
         
-        project_record_id = records[0]['id']
+        project_record_id = record['id']
         
         # Build the Updates record
         update_fields = {
@@ -666,14 +594,12 @@ def create_update_record(job_number, update_text, update_due=None):
             update_fields['Update due'] = update_due
         
         # Create the record
-        response = httpx.post(
-            _url(UPDATES_TABLE),
-            headers=_headers(),
-            json={'fields': update_fields},
-            timeout=TIMEOUT
-        )
+        response = airtable_client.post(UPDATES_TABLE, {'fields': update_fields})
         response.raise_for_status()
         
+        # Update History rollup on the project has changed
+        invalidate_project(job_number)
+        
         new_record = response.json()
         print(f"[airtable] Created update record for {job_number}: {new_record.get('id')}")
         
@@ -691,65 +617,33 @@ def create_update_record(job_number, update_text, update_due=None):
 def get_team_id(client_code):
     """
     Look up Team ID from Clients table by client code.
+    Served from the Clients snapshot cache - no round trip when warm.
     Returns Team ID string or None.
     """
     if not AIRTABLE_API_KEY or not client_code:
         return None
     
-    try:
-        params = {
-            'filterByFormula': f"{{Client code}}='{client_code}'"
-        }
-        
-        response = httpx.get(
-            _url(CLIENTS_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
-        if not records:
-            return None
-        
-        return records[0]['fields'].get('Teams ID', None)
-        
-    except Exception as e:
-        print(f"[airtable] Error looking up Team ID: {e}")
+    fields = clients_cache.get_client_fields(client_code)
+    if not fields:
         return None
+    
+    return fields.get('Teams ID', None)
 
 
 def get_client_name(client_code):
     """
     Look up client name from Clients table by client code.
+    Served from the Clients snapshot cache - no round trip when warm.
     Returns client name string or None.
     """
     if not AIRTABLE_API_KEY or not client_code:
         return None
     
-    try:
-        params = {
-            'filterByFormula': f"{{Client code}}='{client_code}'"
-        }
-        
-        response = httpx.get(
-            _url(CLIENTS_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
-        if not records:
-            return None
-        
-        return records[0]['fields'].get('Clients', None)
-        
-    except Exception as e:
-        print(f"[airtable] Error looking up client name: {e}")
+    fields = clients_cache.get_client_fields(client_code)
+    if not fields:
         return None
+    
+    return fields.get('Clients', None)
 
 
 # ===================
@@ -791,16 +685,9 @@ def get_meetings():
         return []
     
     try:
-        response = httpx.get(
-            _url(MEETINGS_TABLE),
-            headers=_headers(),
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
         meetings = []
         
-        for record in response.json().get('records', []):
+        for record in airtable_client.iter_records(MEETINGS_TABLE, fields=MEETING_FIELDS):
             fields = record.get('fields', {})
             
             start_str = fields.get('Start', '')
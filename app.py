@@ -13,96 +13,28 @@ FLOW:
 1. Gates (ignore self, check sender domain, deduplication)
 2. Check for pending clarify reply
 3. Call Claude (Claude uses tools to fetch jobs, make decisions)
-4. Log to Traffic table
+4. Log to Traffic table (queued - written in the background)
 5. Route based on type:
    - answer/redirect/clarify → connect.py sends email directly
-   - action → call worker, worker handles everything (file, Teams, confirmation)
+   - action → queue for a worker (dispatch.py), worker handles everything (file, Teams, confirmation)
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import httpx
+import json
+from concurrent.futures import ThreadPoolExecutor
 import airtable
 import traffic
+import prerouter
+import traffic_log
+import dispatch
 import connect
 
 app = Flask(__name__)
 CORS(app)
 
-# ===================
-# WORKER URLS
-# ===================
-
-WORKER_URLS = {
-    'update': 'https://dot-workers.up.railway.app/update',
-    'setup': 'https://dot-workers.up.railway.app/setup',
-    'triage': 'https://dot-workers.up.railway.app/setup',  # triage routes to setup
-    'new-job': 'https://dot-workers.up.railway.app/setup',  # new-job routes to setup
-    'file': 'https://dot-workers.up.railway.app/file',
-    'todo': 'https://dot-workers.up.railway.app/todo',
-    # Future workers:
-    # 'feedback': 'https://dot-workers.up.railway.app/feedback',
-}
-
-WORKER_TIMEOUT = 90.0  # Setup does more, give it time
-
-
-def call_worker(route, payload):
-    """
-    Call a worker service.
-    Workers handle everything: file attachments, Airtable updates, Teams, confirmation emails.
-    
-    Returns dict with success status and worker response.
-    """
-    url = WORKER_URLS.get(route)
-    
-    if not url:
-        print(f"[app] No worker URL configured for route: {route}")
-        return {
-            'success': False,
-            'error': f'No worker configured for route: {route}',
-            'route': route
-        }
-    
-    print(f"[app] Calling worker: {route} -> {url}")
-    
-    try:
-        response = httpx.post(
-            url,
-            json=payload,
-            timeout=WORKER_TIMEOUT,
-            headers={'Content-Type': 'application/json'}
-        )
-        
-        success = response.status_code == 200
-        
-        try:
-            response_data = response.json()
-        except:
-            response_data = response.text
-        
-        print(f"[app] Worker response: {response.status_code}, success={success}")
-        
-        return {
-            'success': success,
-            'status_code': response.status_code,
-            'response': response_data
-        }
-        
-    except httpx.TimeoutException:
-        print(f"[app] Worker timeout: {route}")
-        return {
-            'success': False,
-            'error': f'Worker timeout after {WORKER_TIMEOUT}s',
-            'route': route
-        }
-    except Exception as e:
-        print(f"[app] Worker error: {route} - {e}")
-        return {
-            'success': False,
-            'error': str(e),
-            'route': route
-        }
+# Runs the Airtable gate checks side by side
+gate_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='traffic-gate')
 
 
 # ===================
@@ -118,7 +50,8 @@ def health():
         'service': 'Dot Brain',
         'version': '3.2',
         'architecture': 'brain-thinks-workers-work',
-        'workers': list(WORKER_URLS.keys())
+        'workers': list(dispatch.WORKER_URLS.keys()),
+        'prerouter': prerouter.stats()
     })
 
 
@@ -139,6 +72,19 @@ def clear_session():
         return jsonify({'error': str(e)}), 500
 
 
+# ===================
+# DISPATCH STATUS
+# ===================
+
+@app.route('/traffic/dispatch/<dispatch_id>', methods=['GET'])
+def dispatch_status(dispatch_id):
+    """Progress of a queued worker call (queued, sending, retrying, delivered, failed)"""
+    status = dispatch.get_status(dispatch_id)
+    if not status:
+        return jsonify({'error': 'Unknown dispatch ID'}), 404
+    return jsonify(status)
+
+
 # ===================
 # HUB ENDPOINT (Simple Claude - Fast)
 # ===================
@@ -175,6 +121,33 @@ def handle_hub():
         }), 500
 
 
+@app.route('/hub/stream', methods=['POST'])
+def handle_hub_stream():
+    """
+    Streaming Hub - same request as /hub, answered as server-sent events.
+    Message text arrives as Claude writes it; see hub.stream_hub_request
+    for the event types.
+    """
+    import hub
+    data = request.get_json() or {}
+    
+    if not data.get('content', ''):
+        return jsonify({'error': 'No content provided'}), 400
+    
+    def events():
+        for event, payload in hub.stream_hub_request(data):
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # don't let a proxy sit on the stream
+        }
+    )
+
+
 # ===================
 # MAIN TRAFFIC ENDPOINT (Full Claude - Email)
 # ===================
@@ -222,7 +195,7 @@ def handle_traffic():
         # STEP 2: CHECK SENDER DOMAIN
         # ===================
         if not sender_email.lower().endswith('@hunch.co.nz'):
-            airtable.log_traffic(
+            traffic_log.log_traffic(
                 internet_message_id, conversation_id, 'external', 'ignored',
                 None, None, sender_email, subject
             )
@@ -236,9 +209,14 @@ def handle_traffic():
         # ===================
         # STEP 3: DEDUPLICATION
         # ===================
+        # Pending-clarify lookup starts now, alongside the dedup check
+        pending_future = gate_pool.submit(airtable.check_pending_clarify, conversation_id) if conversation_id else None
+        
         if internet_message_id:
             existing = airtable.check_duplicate(internet_message_id)
             if existing:
+                if pending_future:
+                    pending_future.cancel()
                 return jsonify({
                     'route': 'duplicate',
                     'status': 'already_processed',
@@ -250,8 +228,8 @@ def handle_traffic():
         # ===================
         # STEP 4: CHECK PENDING CLARIFY
         # ===================
-        if conversation_id:
-            pending_clarify = airtable.check_pending_clarify(conversation_id)
+        if pending_future:
+            pending_clarify = pending_future.result()
             if pending_clarify:
                 result = handle_clarify_reply(data, pending_clarify)
                 if result:
@@ -293,7 +271,7 @@ def handle_traffic():
         log_route = response_type if response_type in ['clarify', 'confirm', 'answer', 'redirect'] else route
         status = 'pending' if response_type in ['clarify', 'confirm'] else 'processed'
         
-        airtable.log_traffic(
+        traffic_log.log_traffic(
             internet_message_id, conversation_id, log_route, status,
             routing.get('jobNumber'), routing.get('clientCode'),
             sender_email, subject, content  # Pass email body for storage
@@ -370,22 +348,17 @@ def handle_traffic():
             # ACTION: Call worker - worker handles EVERYTHING
             # (file attachments, Airtable updates, Teams post, confirmation email)
             if source == 'email':
-                worker_result = call_worker(route, payload)
-                    
-                # If worker failed, send failure email from Brain
-                # (because worker might not have been able to send it)
-                if not worker_result.get('success'):
-                    connect.send_failure(
-                        to_email=sender_email,
-                        route=route,
-                        error_message=worker_result.get('error', 'Unknown error'),
-                        sender_name=sender_name,
-                        subject_line=subject,
-                        job_number=routing.get('jobNumber'),
-                        job_name=routing.get('jobName'),
-                        client_name=routing.get('clientName'),
-                        original_email=original_email
-                    )
+                # Queued - the dispatcher delivers it and, if the worker
+                # can't be reached, sends the failure email from Brain
+                worker_result = dispatch.dispatch(route, payload, failure={
+                    'to_email': sender_email,
+                    'sender_name': sender_name,
+                    'subject_line': subject,
+                    'job_number': routing.get('jobNumber'),
+                    'job_name': routing.get('jobName'),
+                    'client_name': routing.get('clientName'),
+                    'original_email': original_email
+                })
             else:
                 # Hub - return for user to act on
                 worker_result = {'success': True, 'status': 'user_action_required'}
@@ -489,11 +462,11 @@ def handle_clarify_reply(data, pending_clarify):
     
     if is_triage:
         # User wants to triage as new job - call setup worker
-        airtable.log_traffic(
+        traffic_log.log_traffic(
             internet_message_id, conversation_id, 'setup', 'processed',
             None, pending_fields.get('clientCode'), sender_email, subject, content
         )
-        airtable.update_traffic_record(pending_clarify['id'], {'Status': 'resolved'})
+        traffic_log.update_traffic_record(pending_clarify['id'], {'Status': 'resolved'})
         
         # Build payload for setup worker
         routing = {
@@ -505,19 +478,13 @@ def handle_clarify_reply(data, pending_clarify):
         
         payload = build_worker_payload(data, routing)
         
-        # Call setup worker
-        worker_result = call_worker('setup', payload)
-        
-        # If worker failed, send failure email
-        if not worker_result.get('success'):
-            connect.send_failure(
-                to_email=sender_email,
-                route='setup',
-                error_message=worker_result.get('error', 'Unknown error'),
-                sender_name=sender_name,
-                subject_line=subject,
-                original_email=original_email
-            )
+        # Queue for the setup worker (failure email sent if it can't be delivered)
+        worker_result = dispatch.dispatch('setup', payload, failure={
+            'to_email': sender_email,
+            'sender_name': sender_name,
+            'subject_line': subject,
+            'original_email': original_email
+        })
         
         return {
             'route': 'setup',
@@ -531,11 +498,11 @@ def handle_clarify_reply(data, pending_clarify):
         project = airtable.get_project(reply_job_number)
         
         if project:
-            airtable.log_traffic(
+            traffic_log.log_traffic(
                 internet_message_id, conversation_id, 'update', 'processed',
                 reply_job_number, reply_job_number.split()[0], sender_email, subject
             )
-            airtable.update_traffic_record(pending_clarify['id'], {
+            traffic_log.update_traffic_record(pending_clarify['id'], {
                 'Status': 'resolved',
                 'JobNumber': reply_job_number
             })
@@ -551,22 +518,16 @@ def handle_clarify_reply(data, pending_clarify):
             
             payload = build_worker_payload(data, routing)
             
-            # Call worker - worker handles file + update + comms
-            worker_result = call_worker('update', payload)
-            
-            # If worker failed, send failure email
-            if not worker_result.get('success'):
-                connect.send_failure(
-                    to_email=sender_email,
-                    route='update',
-                    error_message=worker_result.get('error', 'Unknown error'),
-                    sender_name=sender_name,
-                    subject_line=subject,
-                    job_number=reply_job_number,
-                    job_name=routing.get('jobName'),
-                    client_name=routing.get('clientName'),
-                    original_email=original_email
-                )
+            # Queue for the worker - worker handles file + update + comms
+            worker_result = dispatch.dispatch('update', payload, failure={
+                'to_email': sender_email,
+                'sender_name': sender_name,
+                'subject_line': subject,
+                'job_number': reply_job_number,
+                'job_name': routing.get('jobName'),
+                'client_name': routing.get('clientName'),
+                'original_email': original_email
+            })
             
             return {
                 'route': 'update',
@@ -600,11 +561,11 @@ def handle_clarify_reply(data, pending_clarify):
             project = airtable.get_project(suggested_job)
             
             if project:
-                airtable.log_traffic(
+                traffic_log.log_traffic(
                     internet_message_id, conversation_id, 'update', 'processed',
                     suggested_job, suggested_job.split()[0], sender_email, subject
                 )
-                airtable.update_traffic_record(pending_clarify['id'], {'Status': 'resolved'})
+                traffic_log.update_traffic_record(pending_clarify['id'], {'Status': 'resolved'})
                 
                 routing = {
                     'route': 'update',
@@ -617,22 +578,16 @@ def handle_clarify_reply(data, pending_clarify):
                 
                 payload = build_worker_payload(data, routing)
                 
-                # Call worker - worker handles file + update + comms
-                worker_result = call_worker('update', payload)
-                
-                # If worker failed, send failure email
-                if not worker_result.get('success'):
-                    connect.send_failure(
-                        to_email=sender_email,
-                        route='update',
-                        error_message=worker_result.get('error', 'Unknown error'),
-                        sender_name=sender_name,
-                        subject_line=subject,
-                        job_number=suggested_job,
-                        job_name=routing.get('jobName'),
-                        client_name=routing.get('clientName'),
-                        original_email=original_email
-                    )
+                # Queue for the worker - worker handles file + update + comms
+                worker_result = dispatch.dispatch('update', payload, failure={
+                    'to_email': sender_email,
+                    'sender_name': sender_name,
+                    'subject_line': subject,
+                    'job_number': suggested_job,
+                    'job_name': routing.get('jobName'),
+                    'client_name': routing.get('clientName'),
+                    'original_email': original_email
+                })
                 
                 return {
                     'route': 'update',
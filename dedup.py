@@ -0,0 +1,137 @@
+"""
+Dot Traffic - Dedup Index
+Local index of every internetMessageId we've logged to Traffic.
+
+check_duplicate reads here first: an in-memory LRU of recent IDs, then a
+SQLite table shared by every worker on the host. Only a miss falls back
+to the Airtable formula scan, so repeat deliveries are rejected in
+microseconds instead of a full Traffic table scan.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from utils import local_db
+
+# ===================
+# CONFIG
+# ===================
+
+LRU_SIZE = int(os.environ.get('DEDUP_LRU_SIZE', '5000'))
+
+# Older entries are pruned - Airtable still has them if one turns up
+RETENTION_DAYS = int(os.environ.get('DEDUP_RETENTION_DAYS', '30'))
+PRUNE_EVERY = 500  # inserts between prunes
+
+_recent = OrderedDict()  # message ID -> (record_id, route)
+_lock = threading.Lock()
+_inserts = 0
+_table_ready = False
+
+
+# ===================
+# STORAGE
+# ===================
+
+def _db():
+    """Connection with the seen_messages table in place"""
+    global _table_ready
+    conn = local_db.connect()
+    if not _table_ready:
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS seen_messages ('
+            ' message_id TEXT PRIMARY KEY,'
+            ' record_id TEXT,'
+            ' route TEXT,'
+            ' seen_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS seen_messages_seen_at ON seen_messages (seen_at)')
+        _table_ready = True
+    return conn
+
+
+def _remember_recent(message_id, record_id, route):
+    """Add to the in-memory LRU, evicting the oldest past LRU_SIZE"""
+    with _lock:
+        _recent[message_id] = (record_id, route)
+        _recent.move_to_end(message_id)
+        while len(_recent) > LRU_SIZE:
+            _recent.popitem(last=False)
+
+
+def _as_record(message_id, record_id, route):
+    """Shape a hit like the Airtable record check_duplicate used to return"""
+    return {
+        'id': record_id,
+        'fields': {'internetMessageId': message_id, 'Route': route or ''},
+        'source': 'local'
+    }
+
+
+# ===================
+# PUBLIC
+# ===================
+
+def lookup(message_id):
+    """
+    Check the local index for a message ID.
+    Returns a Traffic-record-shaped dict on a hit, None on a miss.
+    Never raises - a broken local store just means a miss.
+    """
+    if not message_id:
+        return None
+
+    with _lock:
+        hit = _recent.get(message_id)
+        if hit:
+            _recent.move_to_end(message_id)
+    if hit:
+        return _as_record(message_id, *hit)
+
+    try:
+        row = _db().execute(
+            'SELECT record_id, route FROM seen_messages WHERE message_id = ?',
+            (message_id,)
+        ).fetchone()
+    except Exception as e:
+        print(f"[dedup] Local lookup failed: {e}")
+        return None
+
+    if not row:
+        return None
+
+    _remember_recent(message_id, row[0], row[1])
+    return _as_record(message_id, row[0], row[1])
+
+
+def remember(message_id, record_id=None, route=None):
+    """
+    Record that a message ID has been logged (or found in Airtable).
+    Never raises - dedup falls back to Airtable if this fails.
+    """
+    global _inserts
+
+    if not message_id:
+        return
+
+    _remember_recent(message_id, record_id, route)
+
+    try:
+        conn = _db()
+        conn.execute(
+            'INSERT INTO seen_messages (message_id, record_id, route, seen_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(message_id) DO UPDATE SET '
+            ' record_id = COALESCE(excluded.record_id, record_id),'
+            ' route = COALESCE(excluded.route, route)',
+            (message_id, record_id, route, time.time())
+        )
+
+        _inserts += 1
+        if _inserts % PRUNE_EVERY == 0:
+            cutoff = time.time() - RETENTION_DAYS * 86400
+            conn.execute('DELETE FROM seen_messages WHERE seen_at < ?', (cutoff,))
+
+    except Exception as e:
+        print(f"[dedup] Local remember failed: {e}")
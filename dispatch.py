@@ -0,0 +1,372 @@
+"""
+Dot Traffic - Worker Dispatch
+Fire-and-forget delivery of action payloads to dot-workers.
+
+/traffic hands the payload from build_worker_payload to dispatch() and
+returns straight away with a dispatch ID. A background pool delivers it,
+retrying when the worker couldn't be reached, and sends the failure
+email itself once retries run out. Progress is kept in the local state
+DB so GET /traffic/dispatch/<id> works from any gunicorn worker.
+
+Statuses: queued -> sending -> (retrying ->) delivered | failed
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+import airtable
+import connect
+from utils import local_db
+
+# ===================
+# WORKER URLS
+# ===================
+
+WORKER_URLS = {
+    'update': 'https://dot-workers.up.railway.app/update',
+    'setup': 'https://dot-workers.up.railway.app/setup',
+    'triage': 'https://dot-workers.up.railway.app/setup',  # triage routes to setup
+    'new-job': 'https://dot-workers.up.railway.app/setup',  # new-job routes to setup
+    'file': 'https://dot-workers.up.railway.app/file',
+    'todo': 'https://dot-workers.up.railway.app/todo',
+    # Future workers:
+    # 'feedback': 'https://dot-workers.up.railway.app/feedback',
+}
+
+WORKER_TIMEOUT = 90.0  # Setup does more, give it time
+
+# One keep-alive session to dot-workers, shared by every dispatch thread
+worker_client = httpx.Client(
+    timeout=WORKER_TIMEOUT,
+    headers={'Content-Type': 'application/json'},
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=10)
+)
+
+# ===================
+# CONFIG
+# ===================
+
+DISPATCH_WORKERS = int(os.environ.get('DISPATCH_WORKERS', '8'))
+
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 2.0   # seconds, doubles each retry
+
+# Gateway errors mean the request never reached a healthy worker - safe to resend
+RETRY_STATUS_CODES = {502, 503, 504}
+
+# Dispatches left queued this long (process died) are picked up again
+STALE_AFTER = 10 * 60
+
+# How often each process sweeps for stale dispatches
+SWEEP_INTERVAL = 60
+
+# Finished dispatches are kept this long for the status endpoint
+RETENTION_DAYS = 7
+
+_pool = ThreadPoolExecutor(max_workers=DISPATCH_WORKERS, thread_name_prefix='dispatch')
+_sweeper = None
+_start_lock = threading.Lock()
+_table_ready = False
+
+
+# ===================
+# WORKER CALL
+# ===================
+
+def call_worker(route, payload):
+    """
+    Call a worker service (one attempt).
+    Workers handle everything: file attachments, Airtable updates, Teams, confirmation emails.
+
+    Returns dict with success status and worker response. 'retryable' is
+    set when the worker was never reached, so sending again can't double up.
+    """
+    url = WORKER_URLS.get(route)
+
+    if not url:
+        print(f"[dispatch] No worker URL configured for route: {route}")
+        return {
+            'success': False,
+            'error': f'No worker configured for route: {route}',
+            'route': route
+        }
+
+    print(f"[dispatch] Calling worker: {route} -> {url}")
+
+    try:
+        response = worker_client.post(url, json=payload)
+
+        success = response.status_code == 200
+
+        try:
+            response_data = response.json()
+        except ValueError:
+            response_data = response.text
+
+        print(f"[dispatch] Worker response: {response.status_code}, success={success}")
+
+        return {
+            'success': success,
+            'status_code': response.status_code,
+            'response': response_data,
+            'retryable': response.status_code in RETRY_STATUS_CODES
+        }
+
+    except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+        # Never got the payload to the worker
+        print(f"[dispatch] Worker unreachable: {route} - {e}")
+        return {
+            'success': False,
+            'error': f'Worker unreachable: {e}',
+            'route': route,
+            'retryable': True
+        }
+    except httpx.TimeoutException:
+        # The worker may still be doing the work - don't send it again
+        print(f"[dispatch] Worker timeout: {route}")
+        return {
+            'success': False,
+            'error': f'Worker timeout after {WORKER_TIMEOUT}s',
+            'route': route
+        }
+    except Exception as e:
+        print(f"[dispatch] Worker error: {route} - {e}")
+        return {
+            'success': False,
+            'error': str(e),
+            'route': route
+        }
+
+
+# ===================
+# STORAGE
+# ===================
+
+def _db():
+    """Connection with the dispatches table in place"""
+    global _table_ready
+    conn = local_db.connect()
+    if not _table_ready:
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS dispatches ('
+            ' id TEXT PRIMARY KEY,'
+            ' route TEXT NOT NULL,'
+            ' status TEXT NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' payload TEXT NOT NULL,'
+            ' failure TEXT,'
+            ' result TEXT,'
+            ' error TEXT,'
+            ' created_at REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS dispatches_status ON dispatches (status, updated_at)')
+        _table_ready = True
+    return conn
+
+
+def _set_status(dispatch_id, status, **columns):
+    """Update a dispatch row's status (and any of attempts/result/error)"""
+    sets = ['status = ?', 'updated_at = ?']
+    values = [status, time.time()]
+    for column, value in columns.items():
+        sets.append(f'{column} = ?')
+        values.append(json.dumps(value) if column == 'result' else value)
+    values.append(dispatch_id)
+    _db().execute(f"UPDATE dispatches SET {', '.join(sets)} WHERE id = ?", values)
+
+
+def _claim(dispatch_id):
+    """
+    Atomically move a dispatch to 'sending'. Returns the row if this
+    process won it, None if someone else already has.
+    """
+    conn = _db()
+    cursor = conn.execute(
+        "UPDATE dispatches SET status = 'sending', updated_at = ? "
+        "WHERE id = ? AND status IN ('queued', 'retrying')",
+        (time.time(), dispatch_id)
+    )
+    if cursor.rowcount != 1:
+        return None
+    return conn.execute(
+        'SELECT route, payload, failure, attempts FROM dispatches WHERE id = ?',
+        (dispatch_id,)
+    ).fetchone()
+
+
+# ===================
+# DELIVERY
+# ===================
+
+def _send_failure(route, failure, result):
+    """Tell the sender their action didn't go through"""
+    if not failure or not failure.get('to_email'):
+        return
+    try:
+        connect.send_failure(
+            route=route,
+            error_message=result.get('error', 'Unknown error'),
+            **failure
+        )
+    except Exception as e:
+        print(f"[dispatch] Failure email didn't send: {e}")
+
+
+def _deliver(dispatch_id):
+    """Deliver one dispatch, retrying unreachable workers with backoff"""
+    try:
+        row = _claim(dispatch_id)
+        if not row:
+            return
+        route, payload, failure, attempts = row
+        payload = json.loads(payload)
+        failure = json.loads(failure) if failure else None
+
+        while True:
+            attempts += 1
+            result = call_worker(route, payload)
+            retryable = result.pop('retryable', False)
+
+            if result.get('success'):
+                _set_status(dispatch_id, 'delivered', attempts=attempts, result=result, error=None)
+                # The worker has written to the job - don't serve it stale from the project cache
+                airtable.invalidate_project((failure or {}).get('job_number'))
+                return
+
+            if not retryable or attempts >= MAX_ATTEMPTS:
+                break
+
+            _set_status(dispatch_id, 'retrying', attempts=attempts,
+                        error=result.get('error') or f"HTTP {result.get('status_code')}")
+            time.sleep(BACKOFF_BASE * (2 ** (attempts - 1)))
+            _set_status(dispatch_id, 'sending')
+
+        print(f"[dispatch] {dispatch_id} failed after {attempts} attempt(s)")
+        airtable.invalidate_project((failure or {}).get('job_number'))  # it may have got part way
+        _set_status(dispatch_id, 'failed', attempts=attempts, result=result,
+                    error=result.get('error') or f"HTTP {result.get('status_code')}")
+        _send_failure(route, failure, result)
+
+    except Exception as e:
+        print(f"[dispatch] Error delivering {dispatch_id}: {e}")
+
+
+def _resume_stale():
+    """
+    Pick up dispatches a dead process left queued, and prune old ones.
+    _claim makes sure only one gunicorn worker resends each one.
+    """
+    try:
+        conn = _db()
+        cutoff = time.time() - STALE_AFTER
+        # 'sending' rows this old belonged to a process that died mid-call.
+        # The worker may have done the work, so don't send them again.
+        conn.execute(
+            "UPDATE dispatches SET status = 'failed', error = 'Interrupted - outcome unknown' "
+            "WHERE status = 'sending' AND updated_at < ?",
+            (cutoff,)
+        )
+        conn.execute(
+            'DELETE FROM dispatches WHERE updated_at < ?',
+            (time.time() - RETENTION_DAYS * 86400,)
+        )
+        stale = conn.execute(
+            "SELECT id FROM dispatches WHERE status IN ('queued', 'retrying') AND updated_at < ?",
+            (cutoff,)
+        ).fetchall()
+        for (dispatch_id,) in stale:
+            _pool.submit(_deliver, dispatch_id)
+        if stale:
+            print(f"[dispatch] Resuming {len(stale)} stale dispatches")
+    except Exception as e:
+        print(f"[dispatch] Couldn't resume stale dispatches: {e}")
+
+
+def _sweep():
+    """Resume stale dispatches every SWEEP_INTERVAL, for the life of the process"""
+    while True:
+        _resume_stale()
+        time.sleep(SWEEP_INTERVAL)
+
+
+def _ensure_started():
+    """
+    Start the stale-dispatch sweeper on first use - it sweeps straight
+    away, then every SWEEP_INTERVAL, so rows orphaned by a worker that
+    dies later are picked up too. Lazy so each gunicorn worker starts
+    its own after fork.
+    """
+    global _sweeper
+    if _sweeper is not None and _sweeper.is_alive():
+        return
+    with _start_lock:
+        if _sweeper is None or not _sweeper.is_alive():
+            _sweeper = threading.Thread(target=_sweep, name='dispatch-sweep', daemon=True)
+            _sweeper.start()
+
+
+# ===================
+# PUBLIC
+# ===================
+
+def dispatch(route, payload, failure=None):
+    """
+    Queue a worker call and return immediately.
+
+    Args:
+        route: worker route (key of WORKER_URLS)
+        payload: from build_worker_payload
+        failure: connect.send_failure kwargs (to_email, sender_name,
+                 subject_line, job_number...) used if delivery fails
+
+    Returns the worker_result dict for the /traffic response.
+    """
+    _ensure_started()
+
+    dispatch_id = uuid.uuid4().hex
+    now = time.time()
+    _db().execute(
+        'INSERT INTO dispatches (id, route, status, payload, failure, created_at, updated_at) '
+        "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+        (dispatch_id, route, json.dumps(payload), json.dumps(failure) if failure else None, now, now)
+    )
+    _pool.submit(_deliver, dispatch_id)
+
+    print(f"[dispatch] Queued {route} as {dispatch_id}")
+    return {
+        'success': True,
+        'status': 'queued',
+        'dispatchId': dispatch_id,
+        'statusUrl': f'/traffic/dispatch/{dispatch_id}'
+    }
+
+
+def get_status(dispatch_id):
+    """Progress of a dispatch, or None if the ID isn't known"""
+    _ensure_started()
+    row = _db().execute(
+        'SELECT route, status, attempts, result, error, created_at, updated_at '
+        'FROM dispatches WHERE id = ?',
+        (dispatch_id,)
+    ).fetchone()
+    if not row:
+        return None
+
+    route, status, attempts, result, error, created_at, updated_at = row
+    return {
+        'dispatchId': dispatch_id,
+        'route': route,
+        'status': status,
+        'attempts': attempts,
+        'worker': json.loads(result) if result else None,
+        'error': error,
+        'createdAt': created_at,
+        'updatedAt': updated_at
+    }
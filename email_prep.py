@@ -0,0 +1,417 @@
+"""
+Dot Traffic - Email Prep
+Trims an email body down to the part Claude needs to route it.
+
+Replies arrive with the whole thread underneath, plus signatures, logos
+and legal disclaimers - often tens of thousands of characters for a
+two-line request. The body goes through a line-by-line pipeline:
+
+1. Quotes    - cut at the first reply header ("On ... wrote:", Outlook's
+               From/Sent block, -----Original Message-----) after a short
+               excerpt of the message replied to, drop "> " lines.
+               A forward keeps the forwarded message (minus its headers),
+               since that's usually what the request is about.
+2. Disclaimers - drop "confidential / intended recipient" paragraphs
+                 at the end of a message
+3. Signatures  - after a closing sign-off + name, drop trailing lines
+                 that look like a signature (phone, email, URL, title,
+                 address); everything after "-- " or "Sent from my iPhone"
+4. Window      - keep the head and tail of whatever's left
+
+Only the copy sent to Claude is cleaned - Airtable still gets the full body.
+"""
+
+import os
+import re
+from collections import deque
+
+# ===================
+# CONFIG
+# ===================
+
+# Head / tail window on the cleaned body
+HEAD_CHARS = int(os.environ.get('EMAIL_PREP_HEAD_CHARS', '6000'))
+TAIL_CHARS = int(os.environ.get('EMAIL_PREP_TAIL_CHARS', '1500'))
+
+# More lines than this after a sign-off (or a longer line) means it wasn't the end of the email
+SIGNATURE_MAX_LINES = 10
+SIGNATURE_LINE_CHARS = 80
+
+# A trailing paragraph with one disclaimer phrase has to be this long to
+# count (two phrases always do) - "this is privileged info, so..." is not
+DISCLAIMER_MIN_CHARS = 200
+
+# Opening of the message being replied to, kept so "Approved" still makes sense
+QUOTE_CONTEXT_CHARS = 500
+
+# Stand in for reply / forward header blocks in the cleaned body
+REPLY_LABEL = '--- Replying to'
+FORWARD_LABEL = '--- Forwarded message'
+
+FORWARD_SUBJECT = re.compile(r'^\s*(?:re\s*:\s*)*(?:fw|fwd)\s*:', re.IGNORECASE)
+
+# Reply headers - everything from here down is thread history
+REPLY_MARKERS = re.compile(
+    r'^\s*(?:'
+    r'On\b.{0,200}\bwrote:\s*$'                       # Gmail / Apple Mail
+    r'|-{2,}\s*Original Message\s*-{2,}'              # Outlook (plain text)
+    r'|-{2,}\s*Reply message\s*-{2,}'
+    r')',
+    re.IGNORECASE
+)
+
+FORWARD_MARKERS = re.compile(
+    r'^\s*(?:-{2,}\s*Forwarded message\s*-{2,}|Begin forwarded message:)',
+    re.IGNORECASE
+)
+
+# Outlook / forwarded header lines, optionally bolded: "*From:* Sarah"
+HEADER_LINE = re.compile(r'^\s*\*?(From|Sent|Date|To|Cc|Subject|Importance)\*?:\*?\s*(.*)$', re.IGNORECASE)
+
+SEPARATOR_LINE = re.compile(r'^\s*(?:_{10,}|-{10,})\s*$')
+
+SIGN_OFF = re.compile(
+    r'^\s*(?:cheers|thanks|thank you|many thanks|thanks so much|regards|kind regards|best regards|'
+    r'warm regards|best|ngā mihi|nga mihi|talk soon|ta)\b[\s,.!]*(?:\w+[\s,.!]*)?$',
+    re.IGNORECASE
+)
+
+# Reads like a sentence ("Due Friday.") - instructions, not a signature line
+SENTENCE_LINE = re.compile(r'\s\S*[.!?]\s*$')
+
+# Contact details: email, URL / domain, NZ or international phone number,
+# "Name | Title", pronouns, street address, city + postcode
+CONTACT_LINE = re.compile(
+    r'\S+@\S+\.\w'
+    r'|\b(?:https?://|www\.)\S+|\b[\w-]+\.(?:co\.nz|org\.nz|com|net|org|nz)\b'
+    r'|(?:\+\d{1,3}|\b0)[\d\s().-]{6,}\d'
+    r'|\|'
+    r'|\((?:she|he|they)/\w+\)'
+    r'|^(?:level \d+|suite \d+|po box|\d+[a-z]?\s+\w+(?:\s+\w+)?\s+(?:street|st|road|rd|avenue|ave|lane|place|quay|terrace|drive))\b'
+    r'|\b(?:auckland|wellington|christchurch|hamilton|tauranga|dunedin)\s+\d{4}\b'
+    r'|^(?:new zealand|aotearoa)$',
+    re.IGNORECASE
+)
+
+# Job titles and company names - only in a short Title Case line ("Senior Producer")
+TITLE_WORDS = re.compile(
+    r'\b(?:producer|director|manager|designer|coordinator|account|creative|strategist|copywriter|'
+    r'editor|executive|partner|founder|lead|head|senior|ceo|cfo|coo|gm|ltd|limited|agency|studios?)\b',
+    re.IGNORECASE
+)
+TITLE_CASE_LINE = re.compile(r"^(?:(?:[A-Z][\w'&.-]*|of|and|&|the)\s*){1,5}$")
+
+SIGNATURE_START = re.compile(r'^(?:--|__)\s*$|^\s*Sent from my \w+|^\s*Get Outlook for \w+', re.IGNORECASE)
+
+DISCLAIMER = re.compile(
+    r'\b(?:intended recipient|confidential(?:ity)? (?:notice|information)|privileged|'
+    r'this (?:e-?mail|message) (?:and any attachments )?(?:is|may be) confidential|'
+    r'caution: this email originated|please consider the environment before printing|'
+    r'received this (?:e-?mail|message) in error|notify the sender)\b',
+    re.IGNORECASE
+)
+
+
+# ===================
+# STAGES
+# ===================
+
+def _lines(text):
+    """Lines of text, one at a time (no copy of the whole body)"""
+    start = 0
+    length = len(text)
+    while start < length:
+        end = text.find('\n', start)
+        if end == -1:
+            end = length
+        yield text[start:end].rstrip('\r')
+        start = end + 1
+
+
+def _reply_context(lines, limit=QUOTE_CONTEXT_CHARS):
+    """The start of the message being replied to, quote marks removed"""
+    used = 0
+    for line in lines:
+        if REPLY_MARKERS.match(line) or FORWARD_MARKERS.match(line) or SEPARATOR_LINE.match(line):
+            return
+        line = line.lstrip('> ').rstrip() if line.lstrip().startswith('>') else line
+        if HEADER_LINE.match(line):
+            continue
+        yield line[:limit - used]
+        used += len(line) + 1
+        if used >= limit:
+            return
+
+
+def _strip_quotes(lines, is_forward):
+    """
+    Stop at the first reply header, keeping just the opening of the
+    message being replied to. Forward headers are dropped and the
+    forwarded message kept, up to its own reply header.
+    """
+    seen_forward = False
+    in_forward_headers = False
+    pending = []   # header-looking lines we haven't decided on yet
+
+    for line in lines:
+        if pending:
+            if HEADER_LINE.match(line) or not line.strip():
+                pending.append(line)
+                continue
+            # From: followed by Sent:/Date:/To: is a message header block
+            names = {HEADER_LINE.match(l).group(1).lower() for l in pending if HEADER_LINE.match(l)}
+            if names & {'sent', 'date', 'to', 'subject'}:
+                sender = HEADER_LINE.match(pending[0]).group(2).strip('* ')
+                if not is_forward or seen_forward:
+                    yield f"{REPLY_LABEL} {sender} ---"
+                    yield line
+                    yield from _reply_context(lines, QUOTE_CONTEXT_CHARS - len(line))
+                    return
+                seen_forward = True
+                yield f"{FORWARD_LABEL} from {sender} ---"
+            else:
+                yield from pending
+            pending = []
+
+        if REPLY_MARKERS.match(line):
+            yield f"{REPLY_LABEL} ---"
+            yield from _reply_context(lines)
+            return
+        if FORWARD_MARKERS.match(line):
+            if seen_forward:
+                return
+            seen_forward = True
+            in_forward_headers = True
+            yield f"{FORWARD_LABEL} ---"
+            continue
+        if line.lstrip().startswith('>') or SEPARATOR_LINE.match(line):
+            continue
+
+        match = HEADER_LINE.match(line)
+        # Header lines straight after a forward marker
+        if in_forward_headers:
+            if match or not line.strip():
+                continue
+            in_forward_headers = False
+        if match and match.group(1).lower() == 'from':
+            pending.append(line)
+            continue
+
+        yield line
+
+    yield from (l for l in pending if not HEADER_LINE.match(l))
+
+
+def _is_disclaimer(paragraph, after_disclaimer=False):
+    """
+    Two or more disclaimer phrases, or one in a paragraph of legalese
+    length - or any, straight after another disclaimer paragraph.
+    """
+    text = ' '.join(line.strip() for line in paragraph)
+    found = len(DISCLAIMER.findall(text))
+    if after_disclaimer:
+        return found >= 1
+    return found >= 2 or (found == 1 and len(text) >= DISCLAIMER_MIN_CHARS)
+
+
+def _strip_disclaimers(lines):
+    """
+    Drop legal disclaimer paragraphs at the end of a message (before the
+    end of the body or the next reply / forward). Disclaimer paragraphs
+    are held back until we know nothing real follows them - a request
+    that happens to say "confidential" is never dropped.
+    """
+    paragraph = []
+    held = []   # trailing disclaimer paragraphs (and the blanks between them)
+
+    for line in lines:
+        is_label = line.startswith((REPLY_LABEL, FORWARD_LABEL))
+        if line.strip() and not is_label:
+            paragraph.append(line)
+            continue
+
+        if paragraph:
+            if _is_disclaimer(paragraph, after_disclaimer=bool(held)):
+                held.extend(paragraph)
+            else:
+                yield from held
+                held = []
+                yield from paragraph
+            paragraph = []
+
+        if is_label:
+            held = []   # end of that message - they were its disclaimer
+            yield line
+        elif held:
+            held.append(line)
+        else:
+            yield line
+
+    if paragraph and not _is_disclaimer(paragraph, after_disclaimer=bool(held)):
+        yield from held
+        yield from paragraph
+
+
+def _signature_kind(line):
+    """
+    'sure' for contact details or a job title, 'maybe' for a short Title
+    Case line (a name, "Hunch"), None for anything that reads as content.
+    """
+    stripped = line.strip()
+    if len(stripped) > SIGNATURE_LINE_CHARS or stripped.endswith('?') or SENTENCE_LINE.search(stripped):
+        return None
+    if CONTACT_LINE.search(stripped):
+        return 'sure'
+    if TITLE_CASE_LINE.match(stripped):
+        return 'sure' if TITLE_WORDS.search(stripped) else 'maybe'
+    return None
+
+
+def _strip_signatures(lines):
+    """
+    After a sign-off ("Cheers,") keep the name line and hold back any
+    lines that look like a signature. If the email ends (or the forwarded
+    part starts) before anything else and at least one of them is clearly
+    signature (a phone number, a job title), drop them. Any other line
+    ("Move it to Craft" as a postscript) means the email carried on, so
+    the held lines go through with it.
+    A sign-off before any content is a greeting ("Thanks Dot"), not the end.
+    """
+    held = None        # lines after a sign-off, or None when not in a signature
+    sure = False       # held lines include a definite signature line
+    name_pending = False
+    dropping = False
+    seen_content = False
+
+    for line in lines:
+        if line.startswith((REPLY_LABEL, FORWARD_LABEL)):
+            if held and not sure:
+                yield from held
+            held = None
+            dropping = False
+            seen_content = False
+            yield line
+            continue
+        if dropping:
+            continue
+        if SIGNATURE_START.match(line):
+            if held and not sure:
+                yield from held
+            held = None
+            dropping = True
+            continue
+
+        if held is not None:
+            if name_pending:
+                name_pending = not line.strip()
+                yield line
+                continue
+            kind = _signature_kind(line) if line.strip() else 'blank'
+            if kind:
+                held.append(line)
+                sure = sure or kind == 'sure'
+                if sum(1 for l in held if l.strip()) > SIGNATURE_MAX_LINES:
+                    yield from held
+                    held = None
+                continue
+            yield from held
+            held = None
+
+        yield line
+        if not line.strip():
+            continue
+        if seen_content and SIGN_OFF.match(line):
+            held = []
+            sure = False
+            name_pending = True
+        seen_content = True
+
+    if held and not sure:
+        yield from held
+
+
+def _collapse_blank(lines):
+    """At most one blank line in a row, none at the start"""
+    blank = True
+    for line in lines:
+        if line.strip():
+            blank = False
+            yield line
+        elif not blank:
+            blank = True
+            yield ''
+
+
+def _window(lines, head_chars=HEAD_CHARS, tail_chars=TAIL_CHARS):
+    """
+    Join lines, keeping the first head_chars and last tail_chars.
+    Only the tail is buffered, so memory stays flat however long the body.
+    """
+    head = []
+    head_len = 0
+    head_full = False
+    tail = deque()
+    tail_len = 0
+    dropped = 0
+
+    for line in lines:
+        if not head_full:
+            room = head_chars - head_len
+            if len(line) < room:
+                head.append(line)
+                head_len += len(line) + 1
+                continue
+            # One line can be the whole body (HTML flattened to text)
+            head.append(line[:room])
+            head_full = True
+            line = line[room:]
+            if not line:
+                continue
+
+        tail.append(line)
+        tail_len += len(line) + 1
+        while tail_len > tail_chars:
+            if len(tail) > 1:
+                removed = tail.popleft()
+                tail_len -= len(removed) + 1
+                dropped += len(removed) + 1
+            else:
+                excess = tail_len - tail_chars
+                tail[0] = tail[0][excess:]
+                tail_len -= excess
+                dropped += excess
+
+    text = '\n'.join(head)
+    if dropped:
+        text += f"\n\n[... {dropped} characters trimmed ...]\n\n"
+    elif tail:
+        text += '\n'
+    return (text + '\n'.join(tail)).strip()
+
+
+# ===================
+# PUBLIC
+# ===================
+
+def clean_body(content, subject=''):
+    """
+    Email body with thread history, disclaimers and signatures removed,
+    capped to a head/tail window. Falls back to the raw (windowed) body
+    if cleaning leaves nothing.
+    """
+    if not content:
+        return content or ''
+
+    is_forward = bool(FORWARD_SUBJECT.match(subject or ''))
+    lines = _lines(content)
+    lines = _strip_quotes(lines, is_forward)
+    lines = _strip_disclaimers(lines)
+    lines = _strip_signatures(lines)
+    cleaned = _window(_collapse_blank(lines))
+
+    if not cleaned:
+        cleaned = _window(_collapse_blank(_lines(content)))
+
+    if len(cleaned) < len(content):
+        print(f"[email_prep] Body {len(content)} -> {len(cleaned)} chars")
+    return cleaned
@@ -0,0 +1,233 @@
+"""
+Dot - History Compaction
+Keeps conversation history inside a fixed token budget.
+
+The newest turns go to Claude verbatim, as far back as the budget
+allows. Anything older is folded into a short summary that rides at the
+top of the current message, so long chats keep their thread without
+input tokens (and latency) growing with every turn. With a session the
+summary rolls forward turn to turn, and the current message itself has
+a ceiling too.
+"""
+
+import os
+import re
+import hashlib
+
+# ===================
+# CONFIG
+# ===================
+
+# Ceiling for verbatim history per request
+HISTORY_TOKENS = int(os.environ.get('HISTORY_TOKENS', '1500'))
+
+# Ceiling for the summary of older turns
+SUMMARY_TOKENS = int(os.environ.get('HISTORY_SUMMARY_TOKENS', '300'))
+
+# Ceiling for the current message (job context included) - the head and
+# tail are kept if it's over
+CURRENT_TOKENS = int(os.environ.get('HISTORY_CURRENT_TOKENS', '8000'))
+
+# Each older turn is summarised to roughly this many characters
+SUMMARY_LINE_CHARS = 160
+
+# Session data key for the rolling summary
+SUMMARY_KEY = 'history_summary'
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+
+# ===================
+# TOKENS
+# ===================
+
+def estimate_tokens(text):
+    """
+    Rough token count - about 4 characters per token for English.
+    Good enough for budgeting, and free (no tokenizer round trip).
+    """
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+
+def _text(message):
+    """Plain text of a message (string content or a list of text blocks)"""
+    content = message.get('content', '')
+    if isinstance(content, str):
+        return content
+    return ' '.join(
+        block.get('text', '') for block in content
+        if isinstance(block, dict) and block.get('type') == 'text'
+    )
+
+
+# ===================
+# COMPACTION
+# ===================
+
+def _summary_line(message):
+    """One line for an older turn: its first sentence, trimmed"""
+    text = ' '.join(_text(message).split())
+    first = SENTENCE_END.split(text, maxsplit=1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS].rstrip() + '...'
+    speaker = 'User' if message.get('role') == 'user' else 'Dot'
+    return f"- {speaker}: {first}"
+
+
+def _fingerprint(message):
+    """Short stable ID for a message, to find where the last summary stopped"""
+    raw = f"{message.get('role')}:{_text(message)}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _fold(older, previous, budget):
+    """
+    Roll the summary forward: the previous summary's lines plus a line for
+    each older turn it hasn't seen yet. The oldest lines drop off once the
+    budget is full.
+
+    Returns the new summary state: {'lines', 'dropped', 'anchor'}, where
+    anchor is the fingerprint of the newest turn folded in.
+    """
+    previous = previous or {}
+    lines = list(previous.get('lines', []))
+    dropped = previous.get('dropped', 0)
+    anchor = previous.get('anchor')
+
+    # Only turns after the last one already summarised are new. If the
+    # anchor has aged out of the stored history, every older turn is new.
+    new = older
+    if anchor:
+        for i in range(len(older) - 1, -1, -1):
+            if _fingerprint(older[i]) == anchor:
+                new = older[i + 1:]
+                break
+
+    for message in new:
+        if _text(message).strip():
+            lines.append(_summary_line(message))
+        else:
+            dropped += 1
+
+    # Keep the newest lines that fit
+    kept = []
+    used = 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    dropped += len(lines) - len(kept)
+
+    return {
+        'lines': kept,
+        'dropped': dropped,
+        'anchor': _fingerprint(older[-1]) if older else anchor,
+    }
+
+
+def _render(state):
+    """Summary text from a summary state, or None if there's nothing in it"""
+    if not state or not state.get('lines'):
+        return None
+    dropped = state.get('dropped', 0)
+    header = f"(Earlier in this chat{f', {dropped} older messages not shown' if dropped > 0 else ''}:)"
+    return header + '\n' + '\n'.join(state['lines'])
+
+
+def _split(messages, budget):
+    """
+    Recent turns (verbatim, within budget, starting on a user turn) and
+    everything older. If even the newest turn is over budget it's trimmed.
+    """
+    recent = []
+    used = 0
+    for message in reversed(messages):
+        cost = estimate_tokens(_text(message))
+        if used + cost > budget:
+            break
+        recent.append(message)
+        used += cost
+    recent.reverse()
+
+    # Newest turn alone is too big - keep its head
+    if not recent:
+        newest = messages[-1]
+        recent = [{'role': newest.get('role', 'user'), 'content': _text(newest)[:budget * 4] + ' ...'}]
+
+    # Claude wants the conversation to open with the user
+    while recent and recent[0].get('role') != 'user':
+        recent = recent[1:]
+
+    older = messages[:len(messages) - len(recent)]
+    if older:
+        print(f"[history] Kept {len(recent)} recent messages (~{used} tokens), folded {len(older)} into summary")
+    return recent, older
+
+
+def compact_history(messages, budget=HISTORY_TOKENS, summary_budget=SUMMARY_TOKENS):
+    """
+    Split history into recent turns (verbatim, within budget) and a
+    summary of everything older.
+
+    The verbatim part always starts on a user turn so the messages array
+    stays valid. If even the newest turn is over budget it's trimmed.
+
+    Returns:
+        (recent_messages, summary_text or None)
+    """
+    if not messages:
+        return [], None
+    recent, older = _split(messages, budget)
+    return recent, _render(_fold(older, None, summary_budget)) if older else None
+
+
+def compact_session_history(session_id, messages, budget=HISTORY_TOKENS, summary_budget=SUMMARY_TOKENS):
+    """
+    compact_history for a session: the summary rolls forward from the one
+    built last turn (kept with the session), so turns that have since
+    aged out of the stored history stay in it and nothing is re-summarised.
+
+    Returns:
+        (recent_messages, summary_text or None)
+    """
+    if not session_id:
+        return compact_history(messages, budget, summary_budget)
+
+    # Import here to avoid circular import
+    import sessions
+    store = sessions.get_store()
+
+    recent, older = _split(messages, budget) if messages else ([], [])
+    previous = store.get_data(session_id, SUMMARY_KEY)
+    if not older and not previous:
+        return recent, None
+
+    state = _fold(older, previous, summary_budget)
+    if state != previous:
+        store.set_data(session_id, SUMMARY_KEY, state)
+    return recent, _render(state)
+
+
+def cap_message(content, limit=CURRENT_TOKENS):
+    """Trim a message to a token ceiling, keeping its head and tail"""
+    if estimate_tokens(content) <= limit:
+        return content
+    max_chars = limit * 4
+    head = max_chars * 4 // 5
+    tail = max_chars - head
+    trimmed = len(content) - head - tail
+    print(f"[history] Current message over {limit} tokens - trimmed {trimmed} chars")
+    return f"{content[:head]}\n\n[... {trimmed} characters trimmed ...]\n\n{content[-tail:]}"
+
+
+def with_summary(content, summary):
+    """Prefix the current message (capped at CURRENT_TOKENS) with the summary of older turns"""
+    content = cap_message(content)
+    if not summary:
+        return content
+    return f"{summary}\n\n{content}"
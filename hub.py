@@ -15,10 +15,17 @@ Frontend matches job numbers to full objects from state.allJobs.
 """
 
 import os
+import re
 import json
+import hashlib
 import httpx
 from anthropic import Anthropic
 
+import history
+import jobindex
+import prompt_cache
+import sessions
+
 # ===================
 # CONFIG
 # ===================
@@ -40,6 +47,9 @@ PROMPT_PATH = os.path.join(os.path.dirname(__file__), 'prompt_hub.txt')
 with open(PROMPT_PATH, 'r') as f:
     HUB_PROMPT = f.read()
 
+# Every call reuses the same prefix - mark it cacheable once
+CACHED_SYSTEM = prompt_cache.cached_system(HUB_PROMPT)
+
 # Anthropic client
 anthropic_client = Anthropic(
     api_key=ANTHROPIC_API_KEY,
@@ -201,6 +211,11 @@ UPDATE_TODO_TOOL = {
     },
 }
 
+HUB_TOOLS = [HOROSCOPE_TOOL, SPEND_CHART_TOOL, HUNCH_SPEND_CHART_TOOL, CAPTURE_TODO_TOOL, UPDATE_TODO_TOOL]
+
+# Same tools with a cache breakpoint on the last one
+CACHED_TOOLS = prompt_cache.cached_tools(HUB_TOOLS)
+
 
 # Worker URL — same Railway service as the others
 SPEND_CHART_SERVICE_URL = os.environ.get(
@@ -519,49 +534,51 @@ def _format_jobs_for_context(jobs):
     if not jobs:
         return "No active jobs."
     
-    lines = []
-    for job in jobs:
-        # Core identifiers
-        parts = [
-            job.get('jobNumber', '???'),
-            job.get('jobName', 'Untitled'),
-            job.get('clientCode', '?'),
-        ]
-        
-        # Status info
-        stage = job.get('stage', '')
-        status = job.get('status', '')
-        if stage:
-            parts.append(stage)
-        if status and status != 'In Progress':
-            parts.append(status)
-        
-        # With client flag
-        if job.get('withClient'):
-            parts.append('WITH CLIENT')
-        
-        # Dates
-        if job.get('updateDue'):
-            parts.append(f"Due:{job.get('updateDue')}")
-        if job.get('liveDate'):
-            parts.append(f"Live:{job.get('liveDate')}")
-        
-        # Days since update
-        days_since = job.get('daysSinceUpdate', '')
-        if days_since and days_since != '-':
-            parts.append(f"({days_since})")
-        
-        # Latest update (truncated)
-        update = job.get('update', '')
-        if update:
-            update_short = update[:60] + '...' if len(update) > 60 else update
-            parts.append(f'"{update_short}"')
-        
-        lines.append(' | '.join(parts))
-    
+    lines = [_format_job_line(job) for job in jobs]
     return f"{len(jobs)} active jobs:\n" + "\n".join(lines)
 
 
+def _format_job_line(job):
+    """One job as a compact context line (see _format_jobs_for_context)"""
+    # Core identifiers
+    parts = [
+        job.get('jobNumber', '???'),
+        job.get('jobName', 'Untitled'),
+        job.get('clientCode', '?'),
+    ]
+    
+    # Status info
+    stage = job.get('stage', '')
+    status = job.get('status', '')
+    if stage:
+        parts.append(stage)
+    if status and status != 'In Progress':
+        parts.append(status)
+    
+    # With client flag
+    if job.get('withClient'):
+        parts.append('WITH CLIENT')
+    
+    # Dates
+    if job.get('updateDue'):
+        parts.append(f"Due:{job.get('updateDue')}")
+    if job.get('liveDate'):
+        parts.append(f"Live:{job.get('liveDate')}")
+    
+    # Days since update
+    days_since = job.get('daysSinceUpdate', '')
+    if days_since and days_since != '-':
+        parts.append(f"({days_since})")
+    
+    # Latest update (truncated)
+    update = job.get('update', '')
+    if update:
+        update_short = update[:60] + '...' if len(update) > 60 else update
+        parts.append(f'"{update_short}"')
+    
+    return ' | '.join(parts)
+
+
 def _format_meetings_for_context(meetings):
     """
     Format meetings for Claude's context.
@@ -589,25 +606,95 @@ def _format_meetings_for_context(meetings):
 
 
 # ===================
-# MAIN HANDLER
+# JOB CONTEXT CACHE
 # ===================
 
-def handle_hub_request(data):
-    """
-    Handle a Hub chat request with Simple Claude + Horoscope tool.
-    Jobs in context (summary format), one tool for horoscopes.
-    Maintains conversation history for multi-turn context.
+# The full job list is the biggest input on this path. Each session keeps
+# a snapshot of the list it was last sent (plus a hash per job); the
+# snapshot rides in a cached system block and later turns only carry the
+# jobs whose line changed.
+
+JOB_SNAPSHOT_KEY = 'hub_jobs'
+
+# Re-send the whole list once this many jobs differ from the snapshot
+REBASELINE_MIN = 5
+REBASELINE_RATIO = 0.2
+
+
+def _job_hash(line):
+    return hashlib.sha1(line.encode('utf-8')).hexdigest()[:16]
+
+
+def _format_job_changes(changed_lines, removed):
+    """Delta section for the current message"""
+    if not changed_lines and not removed:
+        return "No changes since the job list above."
     
-    Args:
-        data: dict with content, jobs, senderName, sessionId, history
+    sections = []
+    if changed_lines:
+        sections.append(f"Changed or new ({len(changed_lines)}):\n" + "\n".join(changed_lines))
+    if removed:
+        sections.append(f"No longer active: {', '.join(removed)}")
+    return "Changes since the job list above:\n" + "\n\n".join(sections)
+
+
+def _job_context(session_id, jobs):
+    """
+    Split job context into a snapshot and a per-turn delta.
     
     Returns:
-        dict with type, message, jobs (as job numbers), redirectTo, etc.
+        (snapshot_text or None, message_text)
+        snapshot_text goes in a cached system block (None = no session,
+        the full list goes in the message as before).
+    """
+    if not session_id:
+        return None, _format_jobs_for_context(jobs)
+    
+    job_lines = {job.get('jobNumber', '???'): _format_job_line(job) for job in jobs}
+    hashes = {number: _job_hash(line) for number, line in job_lines.items()}
+    
+    store = sessions.get_store()
+    snapshot = store.get_data(session_id, JOB_SNAPSHOT_KEY)
+    
+    if snapshot:
+        old_hashes = snapshot['hashes']
+        changed = [number for number, h in hashes.items() if old_hashes.get(number) != h]
+        removed = [number for number in old_hashes if number not in hashes]
+        
+        if len(changed) + len(removed) <= max(REBASELINE_MIN, REBASELINE_RATIO * len(old_hashes)):
+            print(f"[hub] Job context: snapshot + {len(changed)} changed, {len(removed)} removed")
+            return snapshot['text'], _format_job_changes([job_lines[n] for n in changed], removed)
+    
+    # First turn, or drifted too far - new snapshot
+    text = _format_jobs_for_context(jobs)
+    store.set_data(session_id, JOB_SNAPSHOT_KEY, {'text': text, 'hashes': hashes})
+    print(f"[hub] Job context: new snapshot of {len(jobs)} jobs")
+    return text, "No changes since the job list above."
+
+
+# ===================
+# MAIN HANDLER
+# ===================
+
+# Returned whenever Claude's reply can't be used
+MUDDLE_RESPONSE = {
+    'type': 'answer',
+    'message': "Sorry, I got in a muddle over that one.",
+    'jobs': None,
+    'nextPrompt': "Try asking another way?"
+}
+
+
+def _build_messages(data):
+    """
+    Build the system blocks and messages array for a Hub request:
+    history + current message with fresh job and meeting context.
+    Returns (system, messages).
     """
     content = data.get('content', '')
     jobs = data.get('jobs', [])
     sender_name = data.get('senderName', 'there')
-    history = data.get('history', [])  # Conversation history from frontend
+    chat_history = data.get('history', [])  # Conversation history from frontend
     access_level = data.get('accessLevel', 'Client WIP')  # Default to most restricted
     
     # Fetch meetings only for Full access users
@@ -621,10 +708,18 @@ def handle_hub_request(data):
     print(f"[hub] Question: {content}")
     print(f"[hub] Jobs in context: {len(jobs)}")
     print(f"[hub] Meetings in context: {len(meetings)}")
-    print(f"[hub] History messages: {len(history)}")
+    print(f"[hub] History messages: {len(chat_history)}")
     
-    # Build context with jobs and meetings (summary only - NOT full JSON)
-    jobs_context = _format_jobs_for_context(jobs)
+    # Build context with jobs and meetings (summary only - NOT full JSON).
+    # Focused questions get just the relevant jobs plus counts. Otherwise,
+    # with a session, the full job list is a cached snapshot and this turn
+    # only carries what changed.
+    relevant_jobs, relevance_summary = jobindex.select_jobs(content, jobs)
+    if relevant_jobs is not None:
+        job_snapshot = None
+        jobs_context = relevance_summary + "\n" + "\n".join(_format_job_line(job) for job in relevant_jobs)
+    else:
+        job_snapshot, jobs_context = _job_context(data.get('sessionId'), jobs)
     meetings_context = _format_meetings_for_context(meetings)
     
     # Current message with fresh job data
@@ -639,133 +734,294 @@ Question: {content}
 {meetings_context}
 """
     
-    # Build messages array: history + current message
-    messages = []
+    # Conversation history (without job context - keeps tokens down)
+    history_messages = [
+        {'role': msg.get('role', 'user'), 'content': msg.get('content', '')}
+        for msg in chat_history
+        if msg.get('role', 'user') in ['user', 'assistant'] and msg.get('content')
+    ]
     
-    # Add conversation history (without job context - keeps tokens down)
-    for msg in history:
-        role = msg.get('role', 'user')
-        msg_content = msg.get('content', '')
-        if role in ['user', 'assistant'] and msg_content:
-            messages.append({'role': role, 'content': msg_content})
+    # Recent turns verbatim, older ones folded into a summary - fixed token ceiling
+    messages, summary = history.compact_session_history(data.get('sessionId'), history_messages)
     
     # Add current message with fresh job context
-    messages.append({'role': 'user', 'content': current_message})
+    messages.append({'role': 'user', 'content': history.with_summary(current_message, summary)})
+    
+    if job_snapshot:
+        system = prompt_cache.cached_system(HUB_PROMPT, f"=== ACTIVE JOBS ===\n{job_snapshot}")
+    else:
+        system = CACHED_SYSTEM
+    
+    return system, messages
+
+
+def _first_tool_use(response):
+    """The first tool_use block in a response, if Claude asked for a tool"""
+    if response.stop_reason != "tool_use":
+        return None
+    for block in response.content:
+        if block.type == "tool_use":
+            return block
+    return None
+
+
+def _run_tool(tool_use_block, response, messages, mutated_types):
+    """
+    Execute a tool Claude asked for and append the exchange to messages.
+    Returns the attachment (spend-chart PNG) if the tool produced one.
+    """
+    print(f"[hub] Tool call: {tool_use_block.name}")
+    print(f"[hub] Tool input: {tool_use_block.input}")
+
+    # Note which kind of data this tool touches so the frontend
+    # can refresh the right view after the response.
+    if tool_use_block.name in ('capture_todo', 'update_todo'):
+        if 'todo' not in mutated_types:
+            mutated_types.append('todo')
+
+    # Execute the tool — may return an attachment for the Hub
+    tool_result, attachment = handle_tool_call(
+        tool_use_block.name,
+        tool_use_block.input
+    )
+    
+    # Add assistant's tool request and tool result to messages
+    messages.append({
+        "role": "assistant",
+        "content": response.content
+    })
+    messages.append({
+        "role": "user",
+        "content": [{
+            "type": "tool_result",
+            "tool_use_id": tool_use_block.id,
+            "content": tool_result
+        }]
+    })
+    
+    return attachment
+
+
+def _response_text(response):
+    """First text block of a response"""
+    for block in response.content:
+        if hasattr(block, 'text'):
+            return block.text
+    return ""
+
+
+def _build_result(result_text, pending_attachment, mutated_types):
+    """
+    Turn Claude's reply into the Hub response dict.
+    Plain text (not JSON) is treated as an answer.
+    """
+    try:
+        result = json.loads(_strip_markdown_json(result_text))
+    except json.JSONDecodeError as e:
+        print(f"[hub] JSON error: {e}")
+        print(f"[hub] Raw response: {result_text[:200] if result_text else 'empty'}")
+        # If Claude returned plain text, treat it as an answer
+        if result_text and result_text.strip():
+            return {
+                'type': 'answer',
+                'message': result_text.strip(),
+                'jobs': None,
+                'nextPrompt': None
+            }
+        return dict(MUDDLE_RESPONSE)
+    
+    print(f"[hub] Type: {result.get('type')}")
+    print(f"[hub] Message: {result.get('message', '')[:50]}...")
+    if result.get('jobs'):
+        print(f"[hub] Jobs returned: {result.get('jobs')}")
+
+    # Attach the spend chart PNG if the tool was used
+    if pending_attachment:
+        result['attachment'] = pending_attachment
+        if pending_attachment.get('type') == 'chart':
+            result['type'] = 'chart'
+
+    # Tell the frontend what to refresh (e.g. ['todo'] after a capture)
+    if mutated_types:
+        result['mutated'] = mutated_types
+
+    return result
+
+
+def handle_hub_request(data):
+    """
+    Handle a Hub chat request with Simple Claude + Horoscope tool.
+    Jobs in context (summary format), one tool for horoscopes.
+    Maintains conversation history for multi-turn context.
+    
+    Args:
+        data: dict with content, jobs, senderName, sessionId, history
+    
+    Returns:
+        dict with type, message, jobs (as job numbers), redirectTo, etc.
+    """
+    system, messages = _build_messages(data)
     
     try:
         pending_attachment = None  # holds spend-chart PNG if a chart tool fires
         mutated_types = []         # types of data the tools mutated ('todo', 'jobs', etc.)
         # First API call - may return tool use or direct response
-        response = anthropic_client.messages.create(
+        response = anthropic_client.beta.prompt_caching.messages.create(
             model=ANTHROPIC_MODEL,
             max_tokens=1500,
             temperature=0.1,
-            system=HUB_PROMPT,
+            system=system,
             messages=messages,
-            tools=[HOROSCOPE_TOOL, SPEND_CHART_TOOL, HUNCH_SPEND_CHART_TOOL, CAPTURE_TODO_TOOL, UPDATE_TODO_TOOL]
+            tools=CACHED_TOOLS
         )
+        prompt_cache.log_usage('hub', response)
         
         # Check if Claude wants to use a tool
-        if response.stop_reason == "tool_use":
-            # Find the tool use block
-            tool_use_block = None
-            for block in response.content:
-                if block.type == "tool_use":
-                    tool_use_block = block
-                    break
+        tool_use_block = _first_tool_use(response)
+        if tool_use_block:
+            pending_attachment = _run_tool(tool_use_block, response, messages, mutated_types)
             
-            if tool_use_block:
-                print(f"[hub] Tool call: {tool_use_block.name}")
-                print(f"[hub] Tool input: {tool_use_block.input}")
-
-                # Note which kind of data this tool touches so the frontend
-                # can refresh the right view after the response.
-                if tool_use_block.name in ('capture_todo', 'update_todo'):
-                    if 'todo' not in mutated_types:
-                        mutated_types.append('todo')
-
-                # Execute the tool — may return an attachment for the Hub
-                tool_result, pending_attachment = handle_tool_call(
-                    tool_use_block.name,
-                    tool_use_block.input
-                )
-                
-                # Add assistant's tool request and tool result to messages
-                messages.append({
-                    "role": "assistant",
-                    "content": response.content
-                })
-                messages.append({
-                    "role": "user",
-                    "content": [{
-                        "type": "tool_result",
-                        "tool_use_id": tool_use_block.id,
-                        "content": tool_result
-                    }]
-                })
-                
-                # Second API call to get final response
-                response = anthropic_client.messages.create(
-                    model=ANTHROPIC_MODEL,
-                    max_tokens=1500,
-                    temperature=0.1,
-                    system=HUB_PROMPT,
-                    messages=messages,
-                    tools=[HOROSCOPE_TOOL, SPEND_CHART_TOOL, HUNCH_SPEND_CHART_TOOL, CAPTURE_TODO_TOOL, UPDATE_TODO_TOOL]
-                )
+            # Second API call to get final response
+            response = anthropic_client.beta.prompt_caching.messages.create(
+                model=ANTHROPIC_MODEL,
+                max_tokens=1500,
+                temperature=0.1,
+                system=system,
+                messages=messages,
+                tools=CACHED_TOOLS
+            )
+            prompt_cache.log_usage('hub', response)
         
-        # Extract text response
-        result_text = ""
-        for block in response.content:
-            if hasattr(block, 'text'):
-                result_text = block.text
+        return _build_result(_response_text(response), pending_attachment, mutated_types)
+        
+    except Exception as e:
+        print(f"[hub] Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return dict(MUDDLE_RESPONSE)
+
+
+# ===================
+# STREAMING HANDLER
+# ===================
+
+class _MessageFieldStream:
+    """
+    Pulls the "message" string out of Claude's JSON reply as it streams,
+    so the Hub can show words before the JSON is complete.
+    feed() takes raw text deltas and returns newly decoded message text.
+    """
+    
+    KEY = re.compile(r'"message"\s*:\s*"')
+    ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', '\\': '\\', '/': '/'}
+    
+    def __init__(self):
+        self.buffer = ''
+        self.pos = None    # where the message value is decoded up to
+        self.done = False
+    
+    def feed(self, delta):
+        self.buffer += delta
+        if self.done:
+            return ''
+        
+        if self.pos is None:
+            match = self.KEY.search(self.buffer)
+            if not match:
+                return ''
+            self.pos = match.end()
+        
+        out = []
+        buf = self.buffer
+        while self.pos < len(buf):
+            char = buf[self.pos]
+            if char == '"':
+                self.done = True
+                break
+            if char != '\\':
+                out.append(char)
+                self.pos += 1
+                continue
+            
+            # Escapes - wait for the rest of the sequence if it's split across deltas
+            if self.pos + 1 >= len(buf):
+                break
+            code = buf[self.pos + 1]
+            if code != 'u':
+                out.append(self.ESCAPES.get(code, code))
+                self.pos += 2
+                continue
+            
+            # \uXXXX, possibly a surrogate pair (\uXXXX\uXXXX)
+            if self.pos + 6 > len(buf):
                 break
+            width = 6
+            if 0xD800 <= int(buf[self.pos + 2:self.pos + 6], 16) < 0xDC00:
+                width = 12
+                if self.pos + width > len(buf):
+                    break
+            out.append(json.loads('"' + buf[self.pos:self.pos + width] + '"'))
+            self.pos += width
         
-        result_text = _strip_markdown_json(result_text)
-        result = json.loads(result_text)
+        return ''.join(out)
+
+
+def stream_hub_request(data):
+    """
+    Streaming version of handle_hub_request, for /hub/stream.
+    
+    Yields (event, payload) pairs:
+        text        {'delta': str}           - message text as it's generated
+        tool_start  {'name': str}            - Claude has asked for a tool
+        tool_done   {'name': str}            - the tool has returned
+        done        {...}                    - the full result (as /hub returns, minus the attachment)
+        attachment  {...}                    - spend-chart PNG, if a chart tool fired
+        error       {...}                    - something broke; payload is the muddle response
+    """
+    system, messages = _build_messages(data)
+    pending_attachment = None
+    mutated_types = []
+    
+    try:
+        # First round may call a tool; the second (if needed) answers with its result
+        for tool_round in range(2):
+            message_stream = _MessageFieldStream()
+            
+            with anthropic_client.beta.prompt_caching.messages.stream(
+                model=ANTHROPIC_MODEL,
+                max_tokens=1500,
+                temperature=0.1,
+                system=system,
+                messages=messages,
+                tools=CACHED_TOOLS
+            ) as stream:
+                for event in stream:
+                    if event.type == 'text':
+                        delta = message_stream.feed(event.text)
+                        if delta:
+                            yield 'text', {'delta': delta}
+                    elif event.type == 'content_block_start' and event.content_block.type == 'tool_use' and tool_round == 0:
+                        yield 'tool_start', {'name': event.content_block.name}
+                response = stream.get_final_message()
+            prompt_cache.log_usage('hub', response)
+            
+            tool_use_block = _first_tool_use(response) if tool_round == 0 else None
+            if not tool_use_block:
+                break
+            
+            pending_attachment = _run_tool(tool_use_block, response, messages, mutated_types)
+            yield 'tool_done', {'name': tool_use_block.name}
         
-        print(f"[hub] Type: {result.get('type')}")
-        print(f"[hub] Message: {result.get('message', '')[:50]}...")
-        if result.get('jobs'):
-            print(f"[hub] Jobs returned: {result.get('jobs')}")
-
-        # Attach the spend chart PNG if the tool was used
-        if pending_attachment:
-            result['attachment'] = pending_attachment
-            if pending_attachment.get('type') == 'chart':
-                result['type'] = 'chart'
-
-        # Tell the frontend what to refresh (e.g. ['todo'] after a capture)
-        if mutated_types:
-            result['mutated'] = mutated_types
-
-        return result
+        result = _build_result(_response_text(response), pending_attachment, mutated_types)
         
-    except json.JSONDecodeError as e:
-        print(f"[hub] JSON error: {e}")
-        print(f"[hub] Raw response: {result_text[:200] if result_text else 'empty'}")
-        # If Claude returned plain text, treat it as an answer
-        if result_text and result_text.strip():
-            return {
-                'type': 'answer',
-                'message': result_text.strip(),
-                'jobs': None,
-                'nextPrompt': None
-            }
-        return {
-            'type': 'answer',
-            'message': "Sorry, I got in a muddle over that one.",
-            'jobs': None,
-            'nextPrompt': "Try asking another way?"
-        }
+        # The PNG goes out on its own, last, so it doesn't hold up the answer
+        attachment = result.pop('attachment', None)
+        yield 'done', result
+        if attachment:
+            yield 'attachment', attachment
         
     except Exception as e:
-        print(f"[hub] Error: {e}")
+        print(f"[hub] Stream error: {e}")
         import traceback
         traceback.print_exc()
-        return {
-            'type': 'answer', 
-            'message': "Sorry, I got in a muddle over that one.",
-            'jobs': None,
-            'nextPrompt': "Try asking another way?"
-        }
+        yield 'error', dict(MUDDLE_RESPONSE)
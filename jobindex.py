@@ -0,0 +1,230 @@
+"""
+Dot Hub - Job Index
+Picks the jobs a Hub question is actually about, before Claude sees them.
+
+Most questions ("what's due for Sky?", "where's LAB 055 at?") touch a
+handful of jobs, so instead of the whole WIP we send the top matches
+plus counts. Jobs are indexed by client code and name, job number,
+owner, due date and keywords from name / description / update. Broad
+questions ("what's on?", "give me everything") fall back to the full list.
+"""
+
+import os
+import re
+import math
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from traffic import JOB_NUMBER_PATTERN
+from utils import clients_cache
+from utils.airtable import get_nz_today
+
+# ===================
+# CONFIG
+# ===================
+
+TOP_N = int(os.environ.get('HUB_JOB_TOP_N', '12'))
+
+# Below this many jobs, just send them all
+MIN_JOBS_TO_FILTER = 15
+
+# Best match has to score at least this to trust the filter
+# (one client / owner / due hit, or a couple of decent keywords)
+MIN_SCORE = 2.0
+
+WORD = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'for', 'in', 'on', 'at', 'is',
+    'are', 'was', 'be', 'it', 'its', "it's", 'what', "what's", 'whats', 'where',
+    "where's", 'wheres', 'which', 'who', 'how', 'any', 'we', 'our', 'us', 'me',
+    'my', 'i', 'you', 'with', 'from', 'up', 'do', 'does', 'did', 'have', 'has',
+    'got', 'this', 'that', 'there', 'can', 'about', 'job', 'jobs', 'dot', 'please',
+    'show', 'tell', 'give', 'list', 'some', 'all', 'next', 'latest', 'status',
+}
+
+# Questions about the whole WIP - no point filtering
+BROAD_PATTERNS = re.compile(
+    r"\b(all (the |our |active )?jobs|everything|every job|whole (wip|list)|"
+    r"what'?s on\b|overview|big picture|across (all|every)|how many jobs)\b",
+    re.IGNORECASE
+)
+
+# Questions about timing - match on Update Due
+DUE_WORDS = {'due', 'overdue', 'late', 'today', 'tomorrow', 'week', 'deadline', 'deadlines', 'urgent'}
+
+# Client codes that are also everyday words ("which one", "the lab")
+AMBIGUOUS_CODES = {'ONE', 'LAB'}
+
+# Score weights
+EXACT_JOB = 100
+CLIENT = 6
+OWNER = 5
+DUE_SOON = 4
+WITH_CLIENT = 3
+
+
+# ===================
+# INDEX
+# ===================
+
+def _words(text):
+    return [w for w in WORD.findall((text or '').lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+def _normalise_job_number(job_number):
+    return re.sub(r'\s+', '', job_number or '').upper()
+
+
+def _parse_due(value):
+    """Update Due as a date (ISO from airtable.py), or None"""
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _client_names():
+    """Client code -> lower-case name words, from the Clients snapshot"""
+    names = {}
+    for code, record in clients_cache.get_clients().items():
+        name = record.get('fields', {}).get('Clients')
+        if name:
+            names[code] = set(_words(name))
+    return names
+
+
+class JobIndex:
+    """Inverted index over one job list"""
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.by_number = {}
+        self.by_client = defaultdict(list)
+        self.by_owner_word = defaultdict(set)
+        self.by_word = defaultdict(set)
+
+        for i, job in enumerate(jobs):
+            self.by_number[_normalise_job_number(job.get('jobNumber'))] = i
+            self.by_client[(job.get('clientCode') or '').upper()].append(i)
+            for word in _words(job.get('projectOwner')):
+                self.by_owner_word[word].add(i)
+            text = ' '.join(str(job.get(k) or '') for k in ('jobName', 'description', 'update'))
+            for word in set(_words(text)):
+                self.by_word[word].add(i)
+
+    def _idf(self, word):
+        return math.log(1 + len(self.jobs) / (1 + len(self.by_word.get(word, ()))))
+
+    def score(self, question):
+        """
+        Score every job against a question.
+        Returns (Counter of job index -> score, matched client codes).
+        """
+        scores = Counter()
+        words = _words(question)
+        word_set = set(words)
+        clients = set()
+
+        # Job numbers named outright
+        for prefix, digits in JOB_NUMBER_PATTERN.findall(question):
+            i = self.by_number.get(f'{prefix.upper()}{digits}')
+            if i is not None:
+                scores[i] += EXACT_JOB
+
+        # Clients, by code ("TOW", "sky") or name ("Tower"). Codes that are
+        # also everyday words only count when written in capitals.
+        written_upper = set(re.findall(r'\b[A-Z]{3}\b', question))
+        code_tokens = {w.upper() for w in word_set} - AMBIGUOUS_CODES
+        for code in self.by_client:
+            if code and (code in written_upper or code in code_tokens):
+                clients.add(code)
+        for code, name_words in _client_names().items():
+            if name_words and name_words <= word_set and code in self.by_client:
+                clients.add(code)
+        for code in clients:
+            for i in self.by_client[code]:
+                scores[i] += CLIENT
+
+        # Owners
+        for word in word_set:
+            for i in self.by_owner_word.get(word, ()):
+                scores[i] += OWNER
+
+        # Timing questions - anything due within the next week (or overdue)
+        if word_set & DUE_WORDS:
+            # Due dates are NZ dates - the server runs on UTC
+            today = get_nz_today()
+            horizon = today + timedelta(days=1 if 'today' in word_set or 'tomorrow' in word_set else 7)
+            for i, job in enumerate(self.jobs):
+                due = _parse_due(job.get('updateDue'))
+                if due and due <= horizon:
+                    scores[i] += DUE_SOON
+                    if due < today:
+                        scores[i] += 1
+            if 'client' in word_set or 'clients' in word_set:
+                for i, job in enumerate(self.jobs):
+                    if job.get('withClient'):
+                        scores[i] += WITH_CLIENT
+
+        # Keywords from name / description / update, rarer words count more
+        for word in word_set:
+            for i in self.by_word.get(word, ()):
+                scores[i] += self._idf(word)
+
+        return scores, clients
+
+
+# ===================
+# PUBLIC
+# ===================
+
+def select_jobs(question, jobs, top_n=TOP_N):
+    """
+    Pick the jobs relevant to a question.
+
+    Returns:
+        (selected_jobs, summary_line) - or (None, None) when the full list
+        should be sent instead (small WIP, broad question, nothing matched).
+    """
+    if not jobs or len(jobs) < MIN_JOBS_TO_FILTER or not question:
+        return None, None
+
+    if BROAD_PATTERNS.search(question):
+        print(f"[jobindex] Broad question - sending all {len(jobs)} jobs")
+        return None, None
+
+    index = JobIndex(jobs)
+    scores, clients = index.score(question)
+    if not scores or scores.most_common(1)[0][1] < MIN_SCORE:
+        print(f"[jobindex] No strong matches - sending all {len(jobs)} jobs")
+        return None, None
+
+    ranked = [i for i, _ in scores.most_common()]
+
+    # A client question stays inside those clients (plus any job named outright),
+    # and gets all of their jobs if they fit
+    if clients:
+        in_scope = {i for code in clients for i in index.by_client[code]}
+        ranked = [i for i in ranked if i in in_scope or scores[i] >= EXACT_JOB]
+    selected = ranked[:top_n]
+    for code in clients:
+        client_jobs = index.by_client[code]
+        if len(client_jobs) <= top_n * 2:
+            selected = list(dict.fromkeys(selected + client_jobs))
+
+    if len(selected) >= len(jobs) * 0.75:
+        return None, None
+
+    selected.sort()  # keep the frontend's order
+    selected_jobs = [jobs[i] for i in selected]
+
+    per_client = Counter((job.get('clientCode') or '?') for job in jobs)
+    counts = ', '.join(f"{code} {count}" for code, count in sorted(per_client.items()))
+    summary = (
+        f"Showing the {len(selected_jobs)} of {len(jobs)} active jobs most relevant to this question. "
+        f"Active jobs per client: {counts}."
+    )
+
+    print(f"[jobindex] Selected {len(selected_jobs)} of {len(jobs)} jobs")
+    return selected_jobs, summary
@@ -0,0 +1,225 @@
+"""
+Dot Traffic - Pre-Router
+Rule-based fast path that routes unambiguous emails without Claude.
+
+Some emails only ever mean one thing:
+- "todo: ..."                          -> todo worker
+- "File this - LAB 055" + LAB_055.pdf  -> file worker, LAB 055
+- "WIP SKY" / "Tracker for Tower"      -> redirect to WIP / Tracker
+
+For those we build the same routing dict Claude would return and skip
+a 5-8 second round trip. Anything the rules aren't sure about goes to
+Claude as before. Hit rates are counted per rule and shown on /health.
+"""
+
+import re
+import threading
+from collections import Counter
+
+import email_prep
+
+# ===================
+# CONFIG
+# ===================
+
+TODO_PREFIX = re.compile(r'^\s*(?:todo|to do|to-do)\s*:', re.IGNORECASE)
+
+# Replies and forwards carry a thread - never route those on the subject alone
+REPLY_SUBJECT = re.compile(r'^\s*(?:re|fw|fwd)\s*:', re.IGNORECASE)
+
+FILE_WORDS = re.compile(r'\b(file (?:this|these|it|them)|filing|archive|job bag|save (?:this|these))\b', re.IGNORECASE)
+
+# Subject is just the view and the client, e.g. "WIP SKY", "Tower tracker please"
+VIEW_WORDS = {'wip': 'wip', 'tracker': 'tracker'}
+SUBJECT_FILLER = {'for', 'please', 'pls', 'the', 'report', 'update', 'latest', 'a', 'can', 'i', 'have', 'get', 'send', 'me'}
+
+CLIENT_NAMES = {
+    'one nz': 'ONE', 'one': 'ONE',
+    'simplification': 'ONS',
+    'sky': 'SKY', 'sky tv': 'SKY',
+    'tower': 'TOW', 'tower insurance': 'TOW',
+    'fisher funds': 'FIS', 'fisher': 'FIS',
+    'firestop': 'FST',
+    'whakarongorau': 'WKA', 'healthline': 'WKA',
+    'labour': 'LAB',
+    'eon fibre': 'EON', 'eon': 'EON',
+}
+
+# A view request has (almost) nothing in the body - signature aside
+VIEW_BODY_CHARS = 60
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+# ===================
+# METRICS
+# ===================
+
+def _count(outcome):
+    with _stats_lock:
+        _stats['total'] += 1
+        _stats[outcome] += 1
+
+
+def stats():
+    """Hit counts per rule and the overall hit rate (this process)"""
+    with _stats_lock:
+        counts = dict(_stats)
+    total = counts.pop('total', 0)
+    misses = counts.get('claude', 0)
+    return {
+        'total': total,
+        'hits': total - misses,
+        'hitRate': round((total - misses) / total, 3) if total else None,
+        'byRule': counts
+    }
+
+
+# ===================
+# RULES
+# ===================
+
+def _todo(subject, content):
+    """Subject or first line starts with 'todo:'"""
+    first_line = (content or '').strip().split('\n', 1)[0]
+    if not (TODO_PREFIX.match(subject or '') or TODO_PREFIX.match(first_line)):
+        return None
+    return {
+        'type': 'action',
+        'route': 'todo',
+        'message': 'On it.',
+        'confidence': 'high',
+        'clientCode': None,
+        'clientName': None,
+        'jobNumber': None,
+        'reason': 'Rule: todo: prefix'
+    }
+
+
+def _file(subject, content, attachment_names, extract_job_number, airtable):
+    """
+    Asked to file, one job number in the subject, an attachment named
+    with that same job, and the job is live in Projects (not Completed).
+    """
+    if not attachment_names:
+        return None
+    if not (FILE_WORDS.search(subject or '') or FILE_WORDS.search((content or '')[:300])):
+        return None
+
+    job_number = extract_job_number(subject)
+    if not job_number:
+        return None
+
+    attachment_jobs = {extract_job_number(name) for name in attachment_names}
+    attachment_jobs.discard(None)
+    if attachment_jobs != {job_number}:
+        return None
+
+    project = airtable.get_project(job_number)
+    if not project or project.get('status') == 'Completed':
+        return None
+
+    client_code = job_number.split()[0]
+    return {
+        'type': 'action',
+        'route': 'file',
+        'message': 'On it.',
+        'confidence': 'high',
+        'clientCode': client_code,
+        'clientName': airtable.get_client_name(client_code),
+        'jobNumber': job_number,
+        'reason': 'Rule: file request, job number in subject and attachments'
+    }
+
+
+def _client_from_words(words, valid_codes):
+    """A single client named by code or name in a short word list, or None"""
+    found = set()
+    for word in words:
+        if word.upper() in valid_codes:
+            found.add(word.upper())
+    text = ' '.join(words)
+    for name, code in CLIENT_NAMES.items():
+        if re.search(rf'\b{re.escape(name)}\b', text):
+            found.add(code)
+    # "One NZ" matches both 'one nz' and 'one' - same code, fine
+    return found.pop() if len(found) == 1 else None
+
+
+def _view(subject, content, valid_codes, airtable):
+    """
+    Subject is only WIP/Tracker plus one client, on a fresh email (not a
+    reply or forward) with next to nothing in the body.
+    """
+    if REPLY_SUBJECT.match(subject or ''):
+        return None
+    if len(email_prep.clean_body(content or '', subject)) > VIEW_BODY_CHARS:
+        return None
+
+    words = re.findall(r"[a-z]+", (subject or '').lower())
+    views = {VIEW_WORDS[w] for w in words if w in VIEW_WORDS}
+    if len(views) != 1:
+        return None
+
+    rest = [w for w in words if w not in VIEW_WORDS and w not in SUBJECT_FILLER]
+    client_code = _client_from_words(rest, valid_codes)
+    if not client_code:
+        return None
+
+    # Anything left over besides the client is more than a plain view request
+    client_words = {client_code.lower()}
+    for name, code in CLIENT_NAMES.items():
+        if code == client_code:
+            client_words.update(name.split())
+    if any(w not in client_words for w in rest):
+        return None
+
+    view = views.pop()
+    client_name = airtable.get_client_name(client_code) or client_code
+    label = 'WIP' if view == 'wip' else 'Tracker'
+    return {
+        'type': 'redirect',
+        'route': view,
+        'message': f"For the full picture, {label}'s your friend - I've set it to {client_name} for you.",
+        'confidence': 'high',
+        'clientCode': client_code,
+        'clientName': client_name,
+        'jobNumber': None,
+        'redirectTo': view,
+        'redirectParams': {'client': client_code},
+        'url': f'/{view}?client={client_code}',
+        'reason': f'Rule: {label} request with client'
+    }
+
+
+# ===================
+# PUBLIC
+# ===================
+
+def route(subject, content, attachment_names):
+    """
+    Try the rules in order. Returns a routing dict (same shape as
+    Claude's) or None to fall through to Claude.
+    """
+    # Import here to avoid circular import
+    import airtable
+    from traffic import extract_job_number, VALID_CLIENT_CODES
+
+    try:
+        rules = (
+            ('todo', lambda: _todo(subject, content)),
+            ('file', lambda: _file(subject, content, attachment_names, extract_job_number, airtable)),
+            ('view', lambda: _view(subject, content, set(VALID_CLIENT_CODES), airtable)),
+        )
+        for name, rule in rules:
+            routing = rule()
+            if routing:
+                _count(name)
+                print(f"[prerouter] Hit '{name}': {routing.get('route')} {routing.get('jobNumber') or routing.get('clientCode') or ''}")
+                return routing
+    except Exception as e:
+        print(f"[prerouter] Rule error, falling back to Claude: {e}")
+
+    _count('claude')
+    return None
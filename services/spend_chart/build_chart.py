@@ -61,6 +61,10 @@ GREY_LIGHT  = "#E5E5E5"
 BEBAS = "Bebas Neue"
 SANS  = "DM Sans"
 
+# Part of the render cache key - bump whenever the chart's look changes
+# (palette, fonts, layout, dpi) so cached PNGs from the old style aren't served.
+RENDERER_VERSION = 1
+
 
 def _load_logo(code: str):
     """Find a client logo PNG. Returns PIL.Image or None.
@@ -10,13 +10,14 @@ summary to Claude (so Claude can talk about it) and pipes the image
 through to Hub as a side-channel attachment.
 """
 
-import base64
-from datetime import date, datetime, timezone
-from collections import defaultdict
+from bisect import bisect_right
+from datetime import date
 
+import numpy as np
 from flask import jsonify
 
-from utils import airtable
+from utils import airtable, tracker_cache
+from . import render_cache
 from .build_chart import build_chart_bytes
 
 
@@ -24,34 +25,43 @@ from .build_chart import build_chart_bytes
 # CONSTANTS
 # ===================
 
-MONTHS = ["January", "February", "March", "April", "May", "June",
-          "July", "August", "September", "October", "November", "December"]
-MONTH_NUM = {m: i + 1 for i, m in enumerate(MONTHS)}
+# Shared with the Tracker snapshot, which parses Month with the same table
+MONTHS = tracker_cache.MONTHS
+MONTH_NUM = tracker_cache.MONTH_NUM
 
 
 # ===================
 # HELPERS
 # ===================
 
-def _parse_created_time(iso_str: str) -> datetime:
-    """Parse Airtable createdTime (ISO 8601 with Z) into a UTC datetime."""
-    if iso_str.endswith("Z"):
-        iso_str = iso_str[:-1] + "+00:00"
-    return datetime.fromisoformat(iso_str)
-
-
-def _derive_year(month_num: int, created_iso: str) -> int:
-    """Pick the year whose (year, month) is closest to createdTime.
+def _derive_years(month: np.ndarray, created_year: np.ndarray,
+                  created_month: np.ndarray) -> np.ndarray:
+    """Pick, per record, the year whose (year, month) is closest to createdTime.
 
     Handles backdated records (logged late) and forward-planned ones
     (logged early) symmetrically. Documented in the build skill.
+
+    With d = month - created month, that's the created year, one year
+    earlier when d >= 6 or one later when d < -6 (a six-month tie goes to
+    the earlier year).
     """
-    dt = _parse_created_time(created_iso)
-    cy, cm = dt.year, dt.month
-    return min(
-        [cy - 1, cy, cy + 1],
-        key=lambda y: abs((y - cy) * 12 + (month_num - cm))
-    )
+    d = month - created_month
+    return created_year - (d >= 6) + (d < -6)
+
+
+def _window_index(tracker: dict, first_month: int, first_year: int) -> np.ndarray:
+    """Each record's month offset from (first_month, first_year).
+    0-11 falls inside a 12-month window starting there."""
+    years = _derive_years(tracker["month"], tracker["created_year"], tracker["created_month"])
+    return (years * 12 + tracker["month"] - 1) - (first_year * 12 + first_month - 1)
+
+
+def _as_arrays(tracker_records) -> dict:
+    """Tracker data as NumPy arrays - the snapshot's arrays pass straight
+    through, plain record lists are converted."""
+    if isinstance(tracker_records, dict):
+        return tracker_records
+    return tracker_cache.to_arrays(tracker_records)
 
 
 def _fy_for_today(year_end_month: int, today: date):
@@ -75,19 +85,14 @@ def _fy_for_today(year_end_month: int, today: date):
     return fy_start_year, fy_end_year, months
 
 
-def _committed_for_month(year: int, month_num: int,
-                         budget_history: list, clients_fallback: float) -> float:
-    """Return the monthly committed amount for (year, month_num).
-
-    Looks up Budget History for the most recent record where
-    Effective From <= first day of target month. Falls back to the
-    Clients table's Monthly Committed if no Budget History entry applies.
+def _compile_budget_history(budget_history: list) -> tuple:
+    """Parse and sort Budget History once for month lookups.
 
-    Mirrors the Hub's tracker.py get_committed model — same inputs, same
-    semantics, just inlined here so the worker doesn't depend on Hub code.
+    Returns (effective dates ascending, monthly committed amounts).
+    Rows without a parseable Effective From are skipped; where two rows
+    share a date, the first one listed wins.
     """
-    target = date(year, month_num, 1)
-    matching = []
+    by_date = {}
     for row in budget_history:
         eff_str = row.get('effective_from')
         if not eff_str:
@@ -96,70 +101,78 @@ def _committed_for_month(year: int, month_num: int,
             eff = date.fromisoformat(eff_str)
         except (TypeError, ValueError):
             continue
-        if eff <= target:
-            matching.append((eff, row.get('monthly_committed', 0)))
-    if matching:
-        matching.sort(key=lambda x: x[0], reverse=True)
-        return float(matching[0][1])
+        by_date.setdefault(eff, row.get('monthly_committed', 0))
+    dates = sorted(by_date)
+    return dates, [by_date[d] for d in dates]
+
+
+def _committed_for_month(year: int, month_num: int,
+                         compiled: tuple, clients_fallback: float) -> float:
+    """Return the monthly committed amount for (year, month_num).
+
+    Looks up Budget History (compiled by _compile_budget_history) for the
+    most recent record where Effective From <= first day of target month.
+    Falls back to the Clients table's Monthly Committed if no Budget
+    History entry applies.
+
+    Mirrors the Hub's tracker.py get_committed model — same inputs, same
+    semantics, just inlined here so the worker doesn't depend on Hub code.
+    """
+    dates, amounts = compiled
+    i = bisect_right(dates, date(year, month_num, 1))
+    if i:
+        return float(amounts[i - 1])
     return float(clients_fallback or 0)
 
 
-def _build_series(client: dict, tracker_records: list,
+def _committed_by_month(months: list, budget_history: list,
+                        clients_fallback: float) -> list:
+    """Committed amount for each (month_num, year) in a window - Budget
+    History is parsed and sorted once, then each month is a bisect."""
+    compiled = _compile_budget_history(budget_history)
+    return [_committed_for_month(y, m, compiled, clients_fallback) for (m, y) in months]
+
+
+def _build_series(client: dict, tracker_records: dict,
                   budget_history: list, today: date) -> dict:
-    """Aggregate tracker records into the 12-month FY series the renderer expects."""
+    """Aggregate tracker records into the 12-month FY series the renderer expects.
+
+    tracker_records is the client's Tracker arrays (a plain record list
+    works too) - spend is bucketed with vector maths, no per-record loop.
+    """
     year_end_name = client["year_end"]
     if year_end_name not in MONTH_NUM:
         raise ValueError(f"Bad year_end value: {year_end_name!r}")
     year_end_num = MONTH_NUM[year_end_name]
     clients_committed = client.get("monthly_committed") or 0
 
-    # Bucket spend by (month_num, year)
-    agg = defaultdict(float)
-    for r in tracker_records:
-        month_name = r.get("month")
-        spend = r.get("spend") or 0
-        created = r.get("createdTime")
-        if not month_name or not created:
-            continue
-        m = MONTH_NUM.get(month_name)
-        if not m:
-            continue
-        y = _derive_year(m, created)
-        agg[(m, y)] += spend
-
     fy_start, fy_end, fy_months = _fy_for_today(year_end_num, today)
     series = []
     today_tuple = (today.year, today.month)
 
+    # Bucket spend by month of this FY in one pass: offset 0-11 into the FY
+    tracker = _as_arrays(tracker_records)
+    offsets = _window_index(tracker, *fy_months[0])
+    in_fy = (offsets >= 0) & (offsets < 12)
+    spend_by_month = np.bincount(offsets[in_fy], weights=tracker["spend"][in_fy], minlength=12)
+
     # Determine the first month in this FY that has any tracked spend.
     # Months before that pre-date the engagement and shouldn't count toward
     # expected/variance. (A six-month gap of $0s isn't an underspend — it's
     # months before the meter started running.)
-    fy_month_set = set((y, m) for (m, y) in fy_months)
-    first_spend_tuple = None
-    for r in tracker_records:
-        month_name = r.get("month")
-        spend = r.get("spend") or 0
-        created = r.get("createdTime")
-        if not month_name or not created or spend <= 0:
-            continue
-        m = MONTH_NUM.get(month_name)
-        if not m:
-            continue
-        y = _derive_year(m, created)
-        if (y, m) in fy_month_set:
-            t = (y, m)
-            if first_spend_tuple is None or t < first_spend_tuple:
-                first_spend_tuple = t
-
-    for (m, y) in fy_months:
-        spend = agg.get((m, y), 0)
+    spent = in_fy & (tracker["spend"] > 0)
+    first_spend_index = int(offsets[spent].min()) if spent.any() else None
+
+    committed_by_month = _committed_by_month(fy_months, budget_history, clients_committed)
+
+    for i, (m, y) in enumerate(fy_months):
+        spend = float(spend_by_month[i])
         is_future = (y, m) > today_tuple
         # Pre-engagement = before the first month with any tracked spend in this FY
         is_pre_engagement = (
-            first_spend_tuple is not None and (y, m) < first_spend_tuple
+            first_spend_index is not None and i < first_spend_index
         )
-        committed = _committed_for_month(y, m, budget_history, clients_committed)
+        committed = committed_by_month[i]
         series.append({
             "month_short": MONTHS[m - 1][:3],
             "month_full": MONTHS[m - 1],
@@ -273,24 +286,23 @@ def generate_spend_chart(data):
         }), 400
 
     # 2. Pull tracker records and budget history for this client
-    tracker_records = airtable.get_tracker_for_client(client_code)
+    tracker_records = airtable.get_tracker_arrays_for_client(client_code)
     budget_history  = airtable.get_budget_history_for_client(client_code)
-    print(f"[spend_chart] Tracker records: {len(tracker_records)}, "
+    print(f"[spend_chart] Tracker records: {len(tracker_records['spend'])}, "
           f"Budget History: {len(budget_history)}")
 
     # 3. Build the 12-month series (NZ today)
     today = airtable.get_nz_today()
     chart_data = _build_series(client, tracker_records, budget_history, today)
 
-    # 4. Render PNG
+    # 4. Render PNG (or reuse an identical earlier render)
     try:
-        png_bytes = build_chart_bytes(chart_data)
+        png_bytes, image_b64 = render_cache.get_or_render("client", chart_data, build_chart_bytes)
     except Exception as e:
         print(f"[spend_chart] Render failed: {e}")
         import traceback; traceback.print_exc()
         return jsonify({"success": False, "error": f"Render failed: {e}"}), 500
 
-    image_b64 = base64.b64encode(png_bytes).decode("ascii")
     summary = _summarise(chart_data)
 
     print(f"[spend_chart] Done. Image size: {len(png_bytes):,} bytes  "
@@ -3,27 +3,32 @@ Hunch Spend Chart Service
 Generate a rolling-12-month bar chart for the whole agency, aggregating
 spend across all active clients with their total monthly committed line.
 
-GO IN → GET ALL CLIENTS → FOR EACH: TRACKER + BUDGET HISTORY →
-AGGREGATE BY MONTH → RENDER PNG → GET OUT
+GO IN → GET ALL CLIENTS → TRACKER + BUDGET HISTORY (one scan each,
+split by client) → AGGREGATE BY MONTH → RENDER PNG → GET OUT
 
 Returns base64-encoded PNG plus a one-line summary, same shape as the
 single-client handler.
 """
 
-import base64
 from datetime import date
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 from flask import jsonify
 
 from utils import airtable
+from . import render_cache
 from .build_chart import build_hunch_chart_bytes
 from .handler import (
     MONTHS, MONTH_NUM,
-    _derive_year, _committed_for_month,
+    _as_arrays, _window_index, _committed_by_month,
 )
 
 
+# Tracker and Budget History are fetched side by side
+_fetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hunch-chart")
+
+
 # ===================
 # HELPERS
 # ===================
@@ -56,86 +61,57 @@ def _period_label(months):
     return f"{start} – {end}"
 
 
-def _client_first_spend_in_window(tracker_records, window_set):
-    """Find the client's first month with positive tracked spend that
-    falls within the rolling window. Returns (year, month) tuple or None."""
-    earliest = None
-    for r in tracker_records:
-        month_name = r.get("month")
-        spend = r.get("spend") or 0
-        created = r.get("createdTime")
-        if not month_name or not created or spend <= 0:
-            continue
-        m = MONTH_NUM.get(month_name)
-        if not m:
-            continue
-        y = _derive_year(m, created)
-        if (y, m) not in window_set:
-            continue
-        t = (y, m)
-        if earliest is None or t < earliest:
-            earliest = t
-    return earliest
-
-
 def _build_hunch_series(active_clients_data, today: date) -> dict:
     """Aggregate spend + committed across all active clients per month
     in the rolling 12-month window.
 
     active_clients_data: list of dicts with keys
         client (with code/name/year_end/monthly_committed),
-        tracker (list of records),
+        tracker (Tracker arrays, or a list of records),
         budget_history (list of records)
     """
     window_months = _rolling_12_months(today)
-    window_set = set((y, m) for (m, y) in window_months)
     today_tuple = (today.year, today.month)
 
-    # Aggregate spend across all clients for each (year, month)
-    spend_by_month = defaultdict(float)
-    # Aggregate committed across all clients for each (year, month).
+    # Aggregate spend across all clients for each month of the window (offset 0-11)
+    spend_by_month = np.zeros(12)
+    # Aggregate committed across all clients for each month of the window.
     # Skip a client's committed for months before their first tracked spend
     # (pre-engagement filter, applied per client).
-    committed_by_month = defaultdict(float)
+    committed_by_month = np.zeros(12)
 
     client_status = []  # for the summary text
 
     for entry in active_clients_data:
         client = entry["client"]
-        tracker = entry["tracker"]
+        tracker = _as_arrays(entry["tracker"])
         budget_hist = entry["budget_history"]
         clients_committed = client.get("monthly_committed") or 0
 
-        # Spend bucket for this client
-        client_spend_in_window = 0.0
-        for r in tracker:
-            month_name = r.get("month")
-            spend = r.get("spend") or 0
-            created = r.get("createdTime")
-            if not month_name or not created:
-                continue
-            m = MONTH_NUM.get(month_name)
-            if not m:
-                continue
-            y = _derive_year(m, created)
-            if (y, m) in window_set:
-                spend_by_month[(y, m)] += spend
-                if (y, m) <= today_tuple:
-                    client_spend_in_window += spend
+        # Spend bucket for this client. The window ends with today's
+        # month, so everything in it is up to today.
+        offsets = _window_index(tracker, *window_months[0])
+        in_window = (offsets >= 0) & (offsets < 12)
+        client_spend = np.bincount(offsets[in_window], weights=tracker["spend"][in_window], minlength=12)
+        spend_by_month += client_spend
+        client_spend_in_window = float(client_spend.sum())
 
-        # Pre-engagement boundary for this client (within the window)
-        first_spend_tuple = _client_first_spend_in_window(tracker, window_set)
+        # Pre-engagement boundary for this client (within the window):
+        # the first month with positive tracked spend
+        spent = in_window & (tracker["spend"] > 0)
+        first_spend_index = int(offsets[spent].min()) if spent.any() else None
 
         # Committed contribution for this client per month
+        client_committed = _committed_by_month(window_months, budget_hist, clients_committed)
         client_committed_in_window = 0.0
-        for (m, y) in window_months:
-            if first_spend_tuple is None:
+        for i, (m, y) in enumerate(window_months):
+            if first_spend_index is None:
                 # No tracked spend in the window at all → don't count their committed
                 continue
-            if (y, m) < first_spend_tuple:
+            if i < first_spend_index:
                 continue
-            committed = _committed_for_month(y, m, budget_hist, clients_committed)
-            committed_by_month[(y, m)] += committed
+            committed = client_committed[i]
+            committed_by_month[i] += committed
             if (y, m) <= today_tuple and (y, m) != today_tuple:
                 # only past completed months count for variance
                 client_committed_in_window += committed
@@ -148,11 +124,11 @@ def _build_hunch_series(active_clients_data, today: date) -> dict:
 
     # Build the series in chronological order
     series = []
-    for (m, y) in window_months:
+    for i, (m, y) in enumerate(window_months):
         is_future = (y, m) > today_tuple
         is_inflight = (y, m) == today_tuple
-        spend = spend_by_month.get((y, m), 0)
-        committed = committed_by_month.get((y, m), 0)
+        spend = float(spend_by_month[i])
+        committed = float(committed_by_month[i])
         # Treat in-flight current month visually like 'future' (faded outline,
         # excluded from variance) since it's not done yet.
         series.append({
@@ -247,31 +223,34 @@ def generate_hunch_spend_chart(data):
             "error": "No active clients found (all have Monthly Committed = 0)."
         }), 404
 
-    # 2. For each active client, fetch tracker + budget history
+    # 2. Pull the whole Tracker and Budget History tables once (side by
+    #    side) and split them by client - two scans instead of 2 per client
+    tracker_future = _fetch_pool.submit(airtable.get_tracker_arrays_by_client)
+    budget_future = _fetch_pool.submit(airtable.get_budget_history_by_client)
+    tracker_by_client = tracker_future.result()
+    budget_by_client = budget_future.result()
+
     active_data = []
     for client in active:
-        code = client["code"]
-        tracker = airtable.get_tracker_for_client(code)
-        budget_hist = airtable.get_budget_history_for_client(code)
+        code = (client["code"] or "").upper()
         active_data.append({
             "client": client,
-            "tracker": tracker,
-            "budget_history": budget_hist,
+            "tracker": tracker_by_client.get(code) or [],
+            "budget_history": budget_by_client.get(code, []),
         })
 
     # 3. Build the rolling 12-month series
     today = airtable.get_nz_today()
     chart_data = _build_hunch_series(active_data, today)
 
-    # 4. Render PNG
+    # 4. Render PNG (or reuse an identical earlier render)
     try:
-        png_bytes = build_hunch_chart_bytes(chart_data)
+        png_bytes, image_b64 = render_cache.get_or_render("hunch", chart_data, build_hunch_chart_bytes)
     except Exception as e:
         print(f"[hunch_chart] Render failed: {e}")
         import traceback; traceback.print_exc()
         return jsonify({"success": False, "error": f"Render failed: {e}"}), 500
 
-    image_b64 = base64.b64encode(png_bytes).decode("ascii")
     summary = _summarise(chart_data)
 
     print(f"[hunch_chart] Done. Image size: {len(png_bytes):,} bytes")
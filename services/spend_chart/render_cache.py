@@ -0,0 +1,123 @@
+"""
+Spend Chart Render Cache
+Skip matplotlib when the chart hasn't changed.
+
+A chart is a pure function of its series (the _build_series /
+_build_hunch_series output) and the renderer, so the PNG is cached under
+a SHA-256 of both. "How's Tower tracking?" asked twice with no new
+Tracker or Budget History records hits the cache; a new record, a new
+month or a RENDERER_VERSION bump changes the key.
+
+In memory with LRU eviction, plus an optional directory on disk
+(SPEND_CHART_CACHE_DIR) so renders survive restarts and are shared
+between workers.
+"""
+
+import os
+import json
+import base64
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from .build_chart import RENDERER_VERSION
+
+
+# ===================
+# CONFIG
+# ===================
+
+CACHE_SIZE = int(os.environ.get("SPEND_CHART_CACHE_SIZE", "64"))
+CACHE_DIR = os.environ.get("SPEND_CHART_CACHE_DIR", "")
+
+_cache = OrderedDict()   # key -> (png_bytes, image_b64), least recently used first
+_lock = threading.Lock()
+
+
+# ===================
+# HELPERS
+# ===================
+
+def cache_key(kind: str, chart_data: dict) -> str:
+    """SHA-256 of the renderer version, chart kind and series data."""
+    payload = json.dumps(
+        {"renderer": RENDERER_VERSION, "kind": kind, "data": chart_data},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _remember(key: str, entry: tuple):
+    with _lock:
+        _cache[key] = entry
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _disk_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.png")
+
+
+def _read_disk(key: str):
+    if not CACHE_DIR:
+        return None
+    try:
+        with open(_disk_path(key), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_disk(key: str, png_bytes: bytes):
+    """Write atomically so a half-written PNG is never read back."""
+    if not CACHE_DIR:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(png_bytes)
+        os.replace(tmp_path, _disk_path(key))
+    except OSError as e:
+        print(f"[render_cache] Couldn't write {key[:12]} to disk: {e}")
+
+
+# ===================
+# PUBLIC
+# ===================
+
+def get_or_render(kind: str, chart_data: dict, render) -> tuple:
+    """
+    Cached PNG for this chart, rendering it only on a miss.
+
+    Args:
+        kind: which chart ("client" / "hunch") - different renderers
+        chart_data: the series dict handed to the renderer
+        render: build_chart_bytes / build_hunch_chart_bytes
+
+    Returns:
+        (png_bytes, image_b64)
+    """
+    key = cache_key(kind, chart_data)
+
+    with _lock:
+        entry = _cache.get(key)
+        if entry:
+            _cache.move_to_end(key)
+    if entry:
+        print(f"[render_cache] Hit {kind} {key[:12]} (memory)")
+        return entry
+
+    png_bytes = _read_disk(key)
+    if png_bytes:
+        print(f"[render_cache] Hit {kind} {key[:12]} (disk)")
+    else:
+        png_bytes = render(chart_data)
+        _write_disk(key, png_bytes)
+        print(f"[render_cache] Rendered {kind} {key[:12]}")
+
+    entry = (png_bytes, base64.b64encode(png_bytes).decode("ascii"))
+    _remember(key, entry)
+    return entry
@@ -0,0 +1,302 @@
+"""
+Dot Traffic - Session Store
+Conversation memory for Hub sessions, with TTL expiry.
+
+Two backends behind the same interface:
+- MemorySessionStore: a dict in this process (single worker / local dev)
+- SQLiteSessionStore: the local state DB, shared by every gunicorn
+  worker on the host - a session keeps its memory whichever process
+  takes its next message
+
+Pick with SESSION_STORE=memory|sqlite (default sqlite).
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from utils import local_db
+
+# ===================
+# CONFIG
+# ===================
+
+SESSION_STORE = os.environ.get('SESSION_STORE', 'sqlite').lower()
+SESSION_TIMEOUT = 30 * 60  # 30 minutes
+
+# Keep only last 10 exchanges (20 messages)
+MAX_MESSAGES = 20
+
+# Hard cap on live sessions - the least recently active go first
+MAX_SESSIONS = int(os.environ.get('SESSION_MAX', '1000'))
+
+
+# ===================
+# BACKENDS
+# ===================
+
+class MemorySessionStore:
+    """
+    Sessions in a dict - only this process sees them.
+    Kept in last-active order, so expiry only ever looks at the oldest
+    entries and a touch is a move_to_end - no scan of every session.
+    """
+
+    def __init__(self, ttl=SESSION_TIMEOUT, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()   # session ID -> {'messages': [...], 'last_active': ts}, oldest first
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        """Drop expired sessions from the old end (amortised O(1) per call)"""
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest['last_active'] <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def _touch(self, session_id, session, now):
+        session['last_active'] = now
+        self._sessions.move_to_end(session_id)
+
+    def get(self, session_id):
+        """Messages for a session ([] if new or expired); marks it active"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if not session:
+                return []
+            self._touch(session_id, session, now)
+            return list(session['messages'])
+
+    def append(self, session_id, messages, max_messages=MAX_MESSAGES):
+        """Add messages to a session, keeping the last max_messages"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.setdefault(session_id, {'messages': [], 'last_active': now})
+            session['messages'] = (session['messages'] + list(messages))[-max_messages:]
+            self._touch(session_id, session, now)
+            
+            # Over the cap - evict the least recently active
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get_data(self, session_id, key):
+        """Extra per-session state (e.g. the Hub's job snapshot), or None"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if not session:
+                return None
+            self._touch(session_id, session, now)
+            return session.get('data', {}).get(key)
+
+    def set_data(self, session_id, key, value):
+        """Store extra per-session state - expires with the session"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.setdefault(session_id, {'messages': [], 'last_active': now})
+            session.setdefault('data', {})[key] = value
+            self._touch(session_id, session, now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore:
+    """
+    Sessions in the local state DB - shared by every worker on the host.
+    last_active is indexed, so expiry and cap eviction are range deletes
+    on the index rather than table scans.
+    """
+
+    def __init__(self, ttl=SESSION_TIMEOUT, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._table_ready = False
+
+    def _db(self):
+        conn = local_db.connect()
+        if not self._table_ready:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                ' session_id TEXT PRIMARY KEY,'
+                ' messages TEXT NOT NULL,'
+                ' last_active REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS sessions_last_active ON sessions (last_active)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS session_data ('
+                ' session_id TEXT NOT NULL,'
+                ' key TEXT NOT NULL,'
+                ' value TEXT NOT NULL,'
+                ' last_active REAL NOT NULL,'
+                ' PRIMARY KEY (session_id, key))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS session_data_last_active ON session_data (last_active)')
+            self._table_ready = True
+        return conn
+
+    def get(self, session_id):
+        """Messages for a session ([] if new or expired); marks it active"""
+        now = time.time()
+        conn = self._db()
+        row = conn.execute(
+            'SELECT messages FROM sessions WHERE session_id = ? AND last_active > ?',
+            (session_id, now - self.ttl)
+        ).fetchone()
+        if not row:
+            return []
+        conn.execute('UPDATE sessions SET last_active = ? WHERE session_id = ?', (now, session_id))
+        return json.loads(row[0])
+
+    def _evict(self, conn, cutoff, inclusive):
+        """Drop sessions last active before cutoff (or at it), with their session data"""
+        op = '<=' if inclusive else '<'
+        conn.execute(
+            f'DELETE FROM session_data WHERE session_id IN ('
+            f' SELECT session_id FROM sessions WHERE last_active {op} ?)',
+            (cutoff,)
+        )
+        conn.execute(f'DELETE FROM sessions WHERE last_active {op} ?', (cutoff,))
+
+    def _prune(self, conn, now, is_new):
+        """
+        Expired sessions, then (when one was just added) anything past the
+        cap, oldest first - both walk the last_active index. Their session
+        data goes with them.
+        """
+        self._evict(conn, now - self.ttl, inclusive=False)
+        if is_new:
+            cutoff = conn.execute(
+                'SELECT last_active FROM sessions ORDER BY last_active DESC LIMIT 1 OFFSET ?',
+                (self.max_sessions,)
+            ).fetchone()
+            if cutoff:
+                self._evict(conn, cutoff[0], inclusive=True)
+
+    def append(self, session_id, messages, max_messages=MAX_MESSAGES):
+        """
+        Add messages to a session, keeping the last max_messages.
+        Read-modify-write under an immediate transaction so two workers
+        appending to the same session don't lose each other's messages.
+        """
+        now = time.time()
+        conn = self._db()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT messages FROM sessions WHERE session_id = ? AND last_active > ?',
+                (session_id, now - self.ttl)
+            ).fetchone()
+            current = json.loads(row[0]) if row else []
+            if not row:
+                # Expired (or never seen) - don't inherit stale session data
+                conn.execute('DELETE FROM session_data WHERE session_id = ?', (session_id,))
+            updated = (current + list(messages))[-max_messages:]
+            conn.execute(
+                'INSERT INTO sessions (session_id, messages, last_active) VALUES (?, ?, ?) '
+                'ON CONFLICT(session_id) DO UPDATE SET messages = excluded.messages, last_active = excluded.last_active',
+                (session_id, json.dumps(updated), now)
+            )
+            self._prune(conn, now, is_new=not row)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get_data(self, session_id, key):
+        """Extra per-session state (e.g. the Hub's job snapshot), or None"""
+        now = time.time()
+        conn = self._db()
+        row = conn.execute(
+            'SELECT value FROM session_data WHERE session_id = ? AND key = ? AND last_active > ?',
+            (session_id, key, now - self.ttl)
+        ).fetchone()
+        if not row:
+            return None
+        conn.execute(
+            'UPDATE session_data SET last_active = ? WHERE session_id = ? AND key = ?',
+            (now, session_id, key)
+        )
+        conn.execute('UPDATE sessions SET last_active = ? WHERE session_id = ?', (now, session_id))
+        return json.loads(row[0])
+
+    def set_data(self, session_id, key, value):
+        """
+        Store extra per-session state - expires with the session.
+        Hub sessions have data but no messages, so like the memory store
+        this creates an (empty) session row: expiry and the cap then go
+        through the same index as append().
+        """
+        now = time.time()
+        conn = self._db()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(
+                'UPDATE sessions SET last_active = ? WHERE session_id = ? AND last_active > ?',
+                (now, session_id, now - self.ttl)
+            )
+            is_new = cursor.rowcount == 0
+            if is_new:
+                # Expired (or never seen) - start it afresh, stale data and all
+                conn.execute('DELETE FROM session_data WHERE session_id = ?', (session_id,))
+                conn.execute(
+                    'INSERT INTO sessions (session_id, messages, last_active) VALUES (?, ?, ?) '
+                    'ON CONFLICT(session_id) DO UPDATE SET messages = excluded.messages, last_active = excluded.last_active',
+                    (session_id, '[]', now)
+                )
+            conn.execute(
+                'INSERT INTO session_data (session_id, key, value, last_active) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(session_id, key) DO UPDATE SET value = excluded.value, last_active = excluded.last_active',
+                (session_id, key, json.dumps(value), now)
+            )
+            self._prune(conn, now, is_new)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def delete(self, session_id):
+        conn = self._db()
+        conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+        conn.execute('DELETE FROM session_data WHERE session_id = ?', (session_id,))
+
+
+BACKENDS = {
+    'memory': MemorySessionStore,
+    'sqlite': SQLiteSessionStore,
+}
+
+
+# ===================
+# PUBLIC
+# ===================
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The configured session store (created on first use)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = BACKENDS.get(SESSION_STORE)
+                if not backend:
+                    print(f"[sessions] Unknown SESSION_STORE '{SESSION_STORE}', using memory")
+                    backend = MemorySessionStore
+                _store = backend()
+                print(f"[sessions] Using {type(_store).__name__}")
+    return _store
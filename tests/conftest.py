@@ -0,0 +1,6 @@
+"""Modules live at the repo root - make them importable from tests/"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
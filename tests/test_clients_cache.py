@@ -0,0 +1,45 @@
+"""Clients snapshot - Airtable is faked"""
+
+import pytest
+
+from utils import clients_cache
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Count Clients loads; the fake table fails while calls['down'] is set"""
+    calls = {'count': 0, 'down': False}
+
+    def iter_records(table_name, params=None, fields=None):
+        calls['count'] += 1
+        if calls['down']:
+            raise RuntimeError('Airtable down')
+        return iter([{'id': 'rec1', 'fields': {'Client code': 'TOW', 'Clients': 'Tower'}}])
+
+    monkeypatch.setattr(clients_cache.airtable_client, 'iter_records', iter_records)
+    monkeypatch.setattr(clients_cache, 'AIRTABLE_API_KEY', 'test')
+    monkeypatch.setattr(clients_cache, '_snapshot', {})
+    monkeypatch.setattr(clients_cache, '_loaded_at', 0.0)
+    return calls
+
+
+def test_lookup_from_snapshot(fetches):
+    assert clients_cache.get_client_fields('TOW')['Clients'] == 'Tower'
+    assert clients_cache.get_client('SKY') is None
+    assert fetches['count'] == 1
+
+
+def test_failed_refresh_serves_stale_and_backs_off(fetches, monkeypatch):
+    clients_cache.get_clients()
+    fetches['down'] = True
+    clients_cache.invalidate()
+
+    for _ in range(5):
+        assert 'TOW' in clients_cache.get_clients()
+    assert fetches['count'] == 2
+
+    # Retried once the backoff is up
+    monkeypatch.setattr(clients_cache, '_loaded_at', clients_cache._loaded_at - clients_cache.RETRY_AFTER)
+    fetches['down'] = False
+    clients_cache.get_clients()
+    assert fetches['count'] == 3
@@ -0,0 +1,57 @@
+"""Stale dispatch sweep - uses a throwaway state DB, no worker calls"""
+
+import threading
+import time
+
+import pytest
+
+import dispatch
+from utils import local_db
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    monkeypatch.setattr(local_db, 'STATE_DB_PATH', str(tmp_path / 'state.sqlite3'))
+    monkeypatch.setattr(local_db, '_local', threading.local())
+    monkeypatch.setattr(dispatch, '_table_ready', False)
+    return dispatch._db()
+
+
+def _insert(conn, dispatch_id, status, age):
+    updated = time.time() - age
+    conn.execute(
+        'INSERT INTO dispatches (id, route, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+        (dispatch_id, 'file', status, '{}', updated, updated)
+    )
+
+
+def test_resume_stale(db, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(dispatch._pool, 'submit', lambda fn, dispatch_id: submitted.append(dispatch_id))
+    stale = dispatch.STALE_AFTER + 5
+    _insert(db, 'old-queued', 'queued', stale)
+    _insert(db, 'old-retrying', 'retrying', stale)
+    _insert(db, 'new-queued', 'queued', 5)
+    _insert(db, 'old-sending', 'sending', stale)
+    _insert(db, 'ancient', 'delivered', dispatch.RETENTION_DAYS * 86400 + 5)
+
+    dispatch._resume_stale()
+
+    assert sorted(submitted) == ['old-queued', 'old-retrying']
+    assert dispatch.get_status('old-sending')['status'] == 'failed'
+    assert dispatch.get_status('ancient') is None
+
+
+def test_sweeper_keeps_running(db, monkeypatch):
+    sweeps = threading.Semaphore(0)
+    monkeypatch.setattr(dispatch, '_resume_stale', sweeps.release)
+    monkeypatch.setattr(dispatch, 'SWEEP_INTERVAL', 0.01)
+    monkeypatch.setattr(dispatch, '_sweeper', None)
+
+    dispatch._ensure_started()
+    sweeper = dispatch._sweeper
+    dispatch._ensure_started()
+    assert dispatch._sweeper is sweeper
+
+    for _ in range(3):
+        assert sweeps.acquire(timeout=2)
@@ -0,0 +1,162 @@
+"""Email body cleaning - what reaches Claude has to keep every instruction"""
+
+import pytest
+
+from email_prep import clean_body, REPLY_LABEL, FORWARD_LABEL
+
+
+# ===================
+# GREETINGS
+# ===================
+
+def test_kia_ora_greeting_keeps_every_line():
+    body = "Kia ora Dot,\nMove it to Craft and set due Friday.\nAlso mark it with client."
+    assert clean_body(body) == body
+
+
+def test_thanks_greeting_keeps_every_line():
+    cleaned = clean_body("Thanks Dot\nTOW 123 now with client.\nDue Friday.\n\nSarah")
+    assert 'TOW 123 now with client.' in cleaned
+    assert 'Due Friday.' in cleaned
+
+
+@pytest.mark.parametrize('greeting', ['Cheers Dot,', 'Thanks,', 'Kia ora', 'Ngā mihi Dot'])
+def test_greeting_first_is_not_a_sign_off(greeting):
+    cleaned = clean_body(f"\n{greeting}\nSKY 042 is approved\nBook the shoot\nSend to Hunch")
+    for line in ('SKY 042 is approved', 'Book the shoot', 'Send to Hunch'):
+        assert line in cleaned
+
+
+# ===================
+# SIGNATURES
+# ===================
+
+def test_signature_after_sign_off_is_dropped():
+    cleaned = clean_body(
+        "Hi Dot,\nMove TOW 123 to Friday.\n\nCheers,\nSarah\n\n"
+        "Sarah Smith | Producer\nHunch\n021 555 1234\nwww.hunch.co.nz"
+    )
+    assert cleaned == "Hi Dot,\nMove TOW 123 to Friday.\n\nCheers,\nSarah"
+
+
+def test_content_after_sign_off_is_kept():
+    cleaned = clean_body("Hi Dot,\nMove TOW 123 to Friday.\n\nThanks\nSarah\nAlso TOW 124 is approved.\nDue Monday.")
+    assert 'Also TOW 124 is approved.' in cleaned
+    assert 'Due Monday.' in cleaned
+
+
+def test_postscript_instructions_after_sign_off_are_kept():
+    cleaned = clean_body('Hi Dot,\nClient feedback on LAB 055 below.\nThanks\nSarah\nMove it to Craft\nSet update due Friday')
+    assert cleaned.endswith('Sarah\nMove it to Craft\nSet update due Friday')
+
+
+def test_full_signature_block_is_dropped():
+    cleaned = clean_body(
+        "Move TOW 123 to Friday.\n\nCheers,\nSarah\n\nSenior Producer\nsarah@hunch.co.nz\n"
+        "M +64 21 555 1234\nLevel 2, 10 Customs Street\nAuckland 1010\nNew Zealand\n(she/her)"
+    )
+    assert cleaned == "Move TOW 123 to Friday.\n\nCheers,\nSarah"
+
+
+def test_short_word_after_name_is_kept_without_signature():
+    assert clean_body("All good.\nThanks\nSam\nApproved\n\nSent from my iPhone") == "All good.\nThanks\nSam\nApproved"
+
+
+def test_question_after_sign_off_is_kept():
+    cleaned = clean_body("Hi Dot,\nCan you move TOW 123?\n\nThanks\nSarah\nP\nOr Monday?")
+    assert 'Or Monday?' in cleaned
+
+
+def test_sent_from_my_iphone_is_dropped():
+    assert clean_body("Approved - go ahead\n\nSent from my iPhone") == "Approved - go ahead"
+
+
+# ===================
+# THREADS
+# ===================
+
+def test_reply_cut_keeps_short_context():
+    cleaned = clean_body(
+        "Approved, thanks.\n\nOn Tue, 3 Jun 2025 at 10:02, Dot <dot@hunch.co.nz> wrote:\n"
+        "> Here's the SKY 042 storyboard for sign-off.\n> " + "Earlier thread. " * 100
+    )
+    assert cleaned.startswith("Approved, thanks.")
+    assert REPLY_LABEL in cleaned
+    assert "SKY 042 storyboard" in cleaned
+    assert len(cleaned) < 700
+
+
+def test_outlook_reply_header_cut():
+    cleaned = clean_body(
+        "Yes please\n\nFrom: Sarah Smith\nSent: Tuesday, 3 June 2025 10:02\nTo: Dot\n"
+        "Subject: TOW 123\n\nShall we push TOW 123 to Friday?\n\n" + "_" * 32 + "\nFrom: Dot\nSent: Monday\n\nOlder"
+    )
+    assert cleaned.startswith("Yes please")
+    assert f"{REPLY_LABEL} Sarah Smith ---" in cleaned
+    assert "Shall we push TOW 123 to Friday?" in cleaned
+    assert "Older" not in cleaned
+
+
+def test_forward_keeps_forwarded_message():
+    cleaned = clean_body(
+        "FYI - see below\n\n---------- Forwarded message ---------\n"
+        "From: Client <c@tower.co.nz>\nDate: Mon, 2 Jun 2025\nSubject: Banners\nTo: Sarah\n\n"
+        "Please resize the TOW 123 banners to 300x250.",
+        subject='Fwd: Banners'
+    )
+    assert FORWARD_LABEL in cleaned
+    assert "Please resize the TOW 123 banners to 300x250." in cleaned
+    assert "Date:" not in cleaned
+
+
+def test_disclaimer_dropped():
+    cleaned = clean_body(
+        "Go ahead with LAB 055.\n\n"
+        "This email is confidential and intended only for the intended recipient.\nIf received in error delete it."
+    )
+    assert cleaned == "Go ahead with LAB 055."
+
+
+def test_disclaimer_words_mid_body_are_kept():
+    body = 'Hi,\nThe client said this is privileged info, so update SKY 042 to With Client.\n\nCheers\nSam'
+    assert clean_body(body) == body
+
+
+def test_short_last_paragraph_with_one_disclaimer_word_is_kept():
+    body = 'Hi,\nUpdate SKY 042 to With Client - the pricing is confidential information.'
+    assert clean_body(body) == body
+
+
+def test_disclaimer_block_before_reply_dropped():
+    cleaned = clean_body(
+        "Approved.\n\nThis email is confidential. If you are not the intended recipient delete it.\n\n"
+        "Please consider the environment before printing this email.\n\n"
+        "On Mon, 2 Jun 2025 at 09:00, Sam <sam@hunch.co.nz> wrote:\n> LAB 055 ok to go?"
+    )
+    assert cleaned == f"Approved.\n\n{REPLY_LABEL} ---\nLAB 055 ok to go?"
+
+
+def test_disclaimer_followed_by_content_is_kept():
+    cleaned = clean_body(
+        "Update SKY 042.\n\nThis message is confidential and for the intended recipient only.\n\n"
+        "Also move TOW 123 to Friday."
+    )
+    assert 'intended recipient' in cleaned
+    assert cleaned.endswith('Also move TOW 123 to Friday.')
+
+
+# ===================
+# WINDOW
+# ===================
+
+def test_long_body_is_windowed():
+    cleaned = clean_body("start " + "x" * 50000 + " end")
+    assert cleaned.startswith("start ")
+    assert cleaned.endswith(" end")
+    assert "characters trimmed" in cleaned
+    assert len(cleaned) < 8000
+
+
+def test_empty_body():
+    assert clean_body('') == ''
+    assert clean_body(None) == ''
@@ -0,0 +1,35 @@
+"""Hub job index - job numbers and due dates"""
+
+from datetime import date
+
+import pytest
+
+import jobindex
+
+
+@pytest.fixture(autouse=True)
+def no_clients(monkeypatch):
+    monkeypatch.setattr(jobindex.clients_cache, 'get_clients', lambda: {})
+
+
+def _jobs():
+    return [
+        {'jobNumber': 'LAB 055', 'clientCode': 'LAB', 'jobName': 'Election posters', 'updateDue': '2025-06-20'},
+        {'jobNumber': 'TOW 012', 'clientCode': 'TOW', 'jobName': 'Banners', 'updateDue': '2025-06-03'},
+        {'jobNumber': 'SKY 042', 'clientCode': 'SKY', 'jobName': 'Storyboard', 'updateDue': '2025-06-02'},
+    ]
+
+
+@pytest.mark.parametrize('question', ["where's LAB 055 at?", 'LAB055 status', 'LAB-055?', 'is lab_055 done'])
+def test_job_number_any_separator(question):
+    scores, _ = jobindex.JobIndex(_jobs()).score(question)
+    assert scores.most_common(1)[0][0] == 0
+    assert scores[0] >= jobindex.EXACT_JOB
+
+
+def test_due_uses_nz_today(monkeypatch):
+    # Tuesday morning in NZ is still Monday in UTC
+    monkeypatch.setattr(jobindex, 'get_nz_today', lambda: date(2025, 6, 3))
+    scores, _ = jobindex.JobIndex(_jobs()).score("what's due today")
+    assert scores[2] > scores[1] > 0   # SKY 042 overdue, TOW 012 due today
+    assert scores[0] == 0
@@ -0,0 +1,124 @@
+"""Pre-router rules - Airtable is faked, nothing leaves the process"""
+
+import pytest
+
+import prerouter
+from traffic import extract_job_number, VALID_CLIENT_CODES
+
+
+class FakeAirtable:
+    def __init__(self, projects=None):
+        self.projects = projects or {}
+
+    def get_project(self, job_number):
+        return self.projects.get(job_number)
+
+    def get_client_name(self, client_code):
+        return {'SKY': 'Sky', 'TOW': 'Tower', 'LAB': 'Labour'}.get(client_code)
+
+
+CODES = set(VALID_CLIENT_CODES)
+
+
+# ===================
+# TODO
+# ===================
+
+@pytest.mark.parametrize('subject', ['todo: call Sarah', 'To do: book courier', 'TO-DO: chase invoice'])
+def test_todo_prefix(subject):
+    assert prerouter._todo(subject, '')['route'] == 'todo'
+
+
+def test_todo_on_first_line():
+    assert prerouter._todo('Quick one', 'todo: call Sarah\nthanks')['route'] == 'todo'
+
+
+@pytest.mark.parametrize('subject', ['RE: todo: call Sarah', 'Fwd: todo: book courier', 're: fw: todo: x'])
+def test_todo_ignores_replies_and_forwards(subject):
+    assert prerouter._todo(subject, 'Done - see below') is None
+
+
+# ===================
+# FILE
+# ===================
+
+def _file(subject, content, attachments, projects):
+    return prerouter._file(subject, content, attachments, extract_job_number, FakeAirtable(projects))
+
+
+def test_file_live_job():
+    routing = _file('File this - LAB 055', '', ['LAB_055_final.pdf'], {'LAB 055': {'status': 'In Progress'}})
+    assert routing['route'] == 'file'
+    assert routing['jobNumber'] == 'LAB 055'
+    assert routing['clientName'] == 'Labour'
+
+
+def test_file_completed_job_goes_to_claude():
+    assert _file('File this - LAB 055', '', ['LAB_055.pdf'], {'LAB 055': {'status': 'Completed'}}) is None
+
+
+def test_file_unknown_job():
+    assert _file('File this - LAB 055', '', ['LAB_055.pdf'], {}) is None
+
+
+def test_file_attachment_for_another_job():
+    assert _file('File this - LAB 055', '', ['LAB_056.pdf'], {'LAB 055': {'status': 'In Progress'}}) is None
+
+
+def test_file_needs_file_words():
+    assert _file('LAB 055 feedback', '', ['LAB_055.pdf'], {'LAB 055': {'status': 'In Progress'}}) is None
+
+
+# ===================
+# VIEW
+# ===================
+
+def _view(subject, content=''):
+    return prerouter._view(subject, content, CODES, FakeAirtable())
+
+
+@pytest.mark.parametrize('subject, route, code', [
+    ('WIP SKY', 'wip', 'SKY'),
+    ('Tower tracker please', 'tracker', 'TOW'),
+    ('Can I get the WIP for Sky', 'wip', 'SKY'),
+])
+def test_view_subject_only(subject, route, code):
+    routing = _view(subject)
+    assert routing['route'] == route
+    assert routing['clientCode'] == code
+
+
+def test_view_with_sign_off_only():
+    assert _view('WIP SKY', 'Thanks\nSarah')['route'] == 'wip'
+
+
+@pytest.mark.parametrize('subject', ['RE: WIP SKY', 'Fwd: Tower tracker', 'FW: WIP for Sky'])
+def test_view_ignores_replies_and_forwards(subject):
+    assert _view(subject) is None
+
+
+def test_view_ignores_emails_with_a_body():
+    body = 'Can you move TOW 012 to next week on the WIP and let the client know?'
+    assert _view('WIP SKY', body) is None
+
+
+def test_view_needs_one_client_and_one_view():
+    assert _view('WIP') is None
+    assert _view('WIP SKY Tower') is None
+    assert _view('WIP and tracker for Sky') is None
+    assert _view('WIP Sky launch video') is None
+
+
+# ===================
+# ROUTE
+# ===================
+
+def test_route_falls_through_to_claude(monkeypatch):
+    import airtable
+    monkeypatch.setattr(airtable, 'get_project', lambda job_number: None)
+    assert prerouter.route('RE: TOW 012 banners', 'Looks good, approved', []) is None
+    assert prerouter.stats()['byRule'].get('claude')
+
+
+def test_route_todo():
+    assert prerouter.route('todo: call Sarah', '', [])['route'] == 'todo'
@@ -0,0 +1,87 @@
+"""Session stores - the SQLite one runs against a throwaway state DB"""
+
+import threading
+
+import pytest
+
+import sessions
+from utils import local_db
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the stores"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(sessions.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, monkeypatch, tmp_path):
+    monkeypatch.setattr(local_db, 'STATE_DB_PATH', str(tmp_path / 'state.sqlite3'))
+    monkeypatch.setattr(local_db, '_local', threading.local())
+    return lambda **kwargs: sessions.BACKENDS[request.param](**kwargs)
+
+
+def _message(text):
+    return [{'role': 'user', 'content': text}]
+
+
+def test_append_and_get(make_store, clock):
+    store = make_store()
+    store.append('s1', _message('one'))
+    store.append('s1', _message('two'))
+    assert [m['content'] for m in store.get('s1')] == ['one', 'two']
+    assert store.get('nobody') == []
+
+
+def test_data_round_trip(make_store, clock):
+    store = make_store()
+    store.set_data('s1', 'jobs', {'TOW 123': 'In Progress'})
+    assert store.get_data('s1', 'jobs') == {'TOW 123': 'In Progress'}
+    assert store.get_data('s1', 'other') is None
+    assert store.get('s1') == []
+
+
+def test_cap_evicts_least_recently_active_with_data(make_store, clock):
+    store = make_store(max_sessions=3)
+    for i in range(5):
+        clock[0] += 1
+        store.append(f's{i}', _message('hi'))
+        store.set_data(f's{i}', 'jobs', i)
+    for i in range(2):
+        assert store.get(f's{i}') == []
+        assert store.get_data(f's{i}', 'jobs') is None
+    assert store.get_data('s4', 'jobs') == 4
+
+
+def test_data_only_sessions_are_capped(make_store, clock):
+    store = make_store(max_sessions=3)
+    for i in range(6):
+        clock[0] += 1
+        store.set_data(f'hub{i}', 'jobs', i)
+    assert [store.get_data(f'hub{i}', 'jobs') for i in range(6)] == [None, None, None, 3, 4, 5]
+
+
+def test_expired_session_takes_its_data(make_store, clock):
+    store = make_store(ttl=60)
+    store.append('s1', _message('hi'))
+    store.set_data('s1', 'jobs', 1)
+    clock[0] += 61
+    store.append('s1', _message('again'))
+    assert store.get_data('s1', 'jobs') is None
+    assert [m['content'] for m in store.get('s1')] == ['again']
+
+
+def test_sqlite_eviction_deletes_data_rows(make_store, clock):
+    store = make_store(max_sessions=2)
+    if not isinstance(store, sessions.SQLiteSessionStore):
+        pytest.skip('SQLite rows only')
+    for i in range(4):
+        clock[0] += 1
+        store.set_data(f's{i}', 'jobs', i)
+    conn = store._db()
+    assert sorted(r[0] for r in conn.execute('SELECT DISTINCT session_id FROM session_data')) == ['s2', 's3']
+    clock[0] += sessions.SESSION_TIMEOUT + 1
+    store.append('s9', _message('hi'))
+    assert conn.execute('SELECT COUNT(*) FROM session_data').fetchone()[0] == 0
@@ -0,0 +1,199 @@
+"""Tracker snapshot - Airtable is faked with an in-memory table"""
+
+import numpy as np
+import pytest
+
+from utils import tracker_cache
+
+
+def _record(record_id, client, spend, month, created='2025-05-02T01:00:00.000Z', spend_type='Project budget'):
+    return {
+        'id': record_id,
+        'createdTime': created,
+        'fields': {'Client Code': [client], 'Spend': spend, 'Month': month, 'Spend type': spend_type},
+    }
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """Fresh snapshot state over a fake Tracker table; records every fetch's params"""
+    records = {}
+    changed = set()   # IDs written since the last fetch - what LAST_MODIFIED_TIME() would return
+    fetches = []
+
+    def iter_records(table_name, params=None, fields=None):
+        fetches.append(params or {})
+        ids = changed if (params or {}).get('filterByFormula') else records
+        result = [records[record_id] for record_id in ids if record_id in records]
+        changed.clear()
+        return iter(result)
+
+    monkeypatch.setattr(tracker_cache.airtable_client, 'iter_records', iter_records)
+    monkeypatch.setattr(tracker_cache, 'AIRTABLE_API_KEY', 'test')
+    for name, value in (('_partitions', {}), ('_locations', {}), ('_versions', {}), ('_arrays', {}),
+                        ('_synced_at', 0.0), ('_full_at', 0.0), ('_loaded', False), ('_dirty', False)):
+        monkeypatch.setattr(tracker_cache, name, value)
+
+    def add(*records_):
+        for record in records_:
+            records[record['id']] = record
+            changed.add(record['id'])
+
+    add.records = records
+    add.fetches = fetches
+    return add
+
+
+# ===================
+# SNAPSHOT
+# ===================
+
+def test_rows_by_client_and_spend_type(table):
+    table(
+        _record('rec1', 'TOW', 5000, 'May'),
+        _record('rec2', 'TOW', '$1,200', 'June'),
+        _record('rec3', 'SKY', 300, 'May'),
+        _record('rec4', 'TOW', 99, 'May', spend_type='Retainer'),
+    )
+    rows = tracker_cache.get_client_rows('tow')
+    assert sorted(r['spend'] for r in rows) == [1200.0, 5000.0]
+    assert tracker_cache.get_client_rows('TOW', spend_type=None)[-1]['spend'] == 99.0
+    assert tracker_cache.get_client_rows('LAB') == []
+    assert set(tracker_cache.get_rows_by_client()) == {'TOW', 'SKY'}
+
+
+def test_no_api_key_means_no_snapshot(table, monkeypatch):
+    monkeypatch.setattr(tracker_cache, 'AIRTABLE_API_KEY', None)
+    assert tracker_cache.get_client_rows('TOW') is None
+    assert table.fetches == []
+
+
+def test_reads_within_ttl_do_not_refetch(table):
+    table(_record('rec1', 'TOW', 5000, 'May'))
+    tracker_cache.get_client_rows('TOW')
+    tracker_cache.get_client_rows('TOW')
+    tracker_cache.get_arrays_by_client()
+    assert len(table.fetches) == 1
+
+
+def test_upsert_replaces_and_moves_client(table):
+    partitions, locations = {}, {}
+    tracker_cache._upsert(partitions, locations, _record('rec1', 'TOW', 100, 'May'))
+    tracker_cache._upsert(partitions, locations, _record('rec2', 'TOW', 200, 'May'))
+    tracker_cache._upsert(partitions, locations, _record('rec1', 'TOW', 150, 'May'))
+    assert sorted(partitions['TOW']['spend']) == [150.0, 200.0]
+
+    tracker_cache._upsert(partitions, locations, _record('rec2', 'SKY', 200, 'May'))
+    assert partitions['TOW']['id'] == ['rec1']
+    assert partitions['SKY']['id'] == ['rec2']
+    assert locations == {'rec1': ('TOW', 0), 'rec2': ('SKY', 0)}
+
+
+def test_remove_keeps_locations_aligned(table):
+    partitions, locations = {}, {}
+    for i in range(5):
+        tracker_cache._upsert(partitions, locations, _record(f'rec{i}', 'TOW', i, 'May'))
+    tracker_cache._remove(partitions, locations, 'rec1')
+    tracker_cache._remove(partitions, locations, 'missing')
+    columns = partitions['TOW']
+    assert sorted(columns['id']) == ['rec0', 'rec2', 'rec3', 'rec4']
+    for record_id, (code, row) in locations.items():
+        assert columns['id'][row] == record_id
+        assert columns['spend'][row] == float(record_id[-1])
+
+
+# ===================
+# REFRESH
+# ===================
+
+def test_incremental_refresh_after_invalidate(table):
+    table(_record('rec1', 'TOW', 100, 'May'))
+    tracker_cache.get_client_rows('TOW')
+    assert 'filterByFormula' not in table.fetches[0]
+
+    table(_record('rec1', 'TOW', 175, 'May'), _record('rec2', 'TOW', 50, 'June'))
+    tracker_cache.invalidate()
+    rows = tracker_cache.get_client_rows('TOW')
+    assert 'LAST_MODIFIED_TIME()' in table.fetches[1]['filterByFormula']
+    assert sorted(r['spend'] for r in rows) == [50.0, 175.0]
+
+
+def test_full_reload_drops_deleted_records(table, monkeypatch):
+    table(_record('rec1', 'TOW', 100, 'May'), _record('rec2', 'TOW', 50, 'June'))
+    tracker_cache.get_client_rows('TOW')
+
+    del table.records['rec2']
+    monkeypatch.setattr(tracker_cache, 'FULL_RELOAD', 0)
+    tracker_cache.invalidate()
+    assert [r['spend'] for r in tracker_cache.get_client_rows('TOW')] == [100.0]
+
+
+def test_failed_refresh_keeps_snapshot_and_stays_dirty(table, monkeypatch):
+    table(_record('rec1', 'TOW', 100, 'May'))
+    tracker_cache.get_client_rows('TOW')
+
+    def boom(table_name, params=None, fields=None):
+        raise RuntimeError('Airtable down')
+
+    monkeypatch.setattr(tracker_cache.airtable_client, 'iter_records', boom)
+    tracker_cache.invalidate()
+    assert [r['spend'] for r in tracker_cache.get_client_rows('TOW')] == [100.0]
+    assert tracker_cache._dirty
+
+
+# ===================
+# ARRAYS
+# ===================
+
+def test_client_arrays_skip_incomplete_rows(table):
+    table(
+        _record('rec1', 'TOW', 100, 'May'),
+        _record('rec2', 'TOW', None, 'May'),
+        _record('rec3', 'TOW', 50, 'Someday'),
+        _record('rec4', 'TOW', 25, 'June', created=None),
+        _record('rec5', 'TOW', 10, 'December', created='2024-11-20T00:00:00.000Z'),
+    )
+    arrays = tracker_cache.get_client_arrays('TOW')
+    order = np.argsort(arrays['spend'])
+    assert arrays['spend'][order].tolist() == [10.0, 100.0]
+    assert arrays['month'][order].tolist() == [12, 5]
+    assert arrays['created_year'][order].tolist() == [2024, 2025]
+    assert arrays['created_month'][order].tolist() == [11, 5]
+
+
+def test_client_arrays_rebuilt_only_on_change(table):
+    table(_record('rec1', 'TOW', 100, 'May'), _record('rec2', 'SKY', 10, 'May'))
+    first = tracker_cache.get_client_arrays('TOW')
+    assert tracker_cache.get_client_arrays('TOW') is first
+
+    table(_record('rec2', 'SKY', 20, 'May'))
+    tracker_cache.invalidate()
+    assert tracker_cache.get_client_arrays('TOW') is first
+    assert tracker_cache.get_client_arrays('SKY')['spend'].tolist() == [20.0]
+
+    table(_record('rec1', 'TOW', 300, 'May'))
+    tracker_cache.invalidate()
+    assert tracker_cache.get_client_arrays('TOW')['spend'].tolist() == [300.0]
+
+
+def test_to_arrays_matches_snapshot_arrays(table):
+    records = [_record(f'rec{i}', 'TOW', i * 10, month, created=f'2025-0{i % 9 + 1}-01T00:00:00.000Z')
+               for i, month in enumerate(['January', 'May', 'July', 'Bogus', 'December'])]
+    table(*records)
+    from_snapshot = tracker_cache.get_client_arrays('TOW')
+    from_rows = tracker_cache.to_arrays(tracker_cache.get_client_rows('TOW'))
+    for name in ('spend', 'month', 'created_year', 'created_month'):
+        assert np.array_equal(np.sort(from_snapshot[name]), np.sort(from_rows[name]))
+
+
+def test_unknown_client_arrays_are_empty(table):
+    table(_record('rec1', 'TOW', 100, 'May'))
+    arrays = tracker_cache.get_client_arrays('LAB')
+    assert len(arrays['spend']) == 0
+    assert 'LAB' not in tracker_cache.get_arrays_by_client()
+
+
+def test_chart_months_are_the_snapshot_months():
+    from services.spend_chart import handler
+    assert handler.MONTH_NUM is tracker_cache.MONTH_NUM
+    assert handler.MONTHS is tracker_cache.MONTHS
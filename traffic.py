@@ -12,12 +12,20 @@ One brain. Two inputs. Same Dot.
 import os
 import re
 import json
-import time
+import threading
 import requests
 import httpx
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from anthropic import Anthropic
 
+import email_prep
+import history
+import prerouter
+import prompt_cache
+import sessions
+from utils import airtable_client, clients_cache
+
 # ===================
 # CONFIG
 # ===================
@@ -29,6 +37,21 @@ AIRTABLE_BASE_ID = os.environ.get('AIRTABLE_BASE_ID', 'app8CI7NAZqhQ4G1Y')
 ANTHROPIC_MODEL = 'claude-sonnet-4-6'
 
 VALID_CLIENT_CODES = ['ONE', 'ONS', 'ONB', 'SKY', 'TOW', 'FIS', 'FST', 'WKA', 'HUN', 'LAB', 'EON', 'OTH']
+VALID_CODES = frozenset(VALID_CLIENT_CODES)
+
+# Job numbers: 'TOW 023', 'ONE_125', 'SKY-014', 'LAB055' - any case.
+# Compiled once; the lookarounds stand in for \b so 'LAB_055_final' matches.
+JOB_NUMBER_PATTERN = re.compile(r'(?<![A-Za-z0-9])([A-Za-z]{3})(?:\s+|[_-])?(\d{3})(?!\d)')
+
+# Tool calls in one Claude turn run side by side on this many threads
+TOOL_WORKERS = int(os.environ.get('TRAFFIC_TOOL_WORKERS', '4'))
+
+# Request threads per gunicorn worker (Procfile --threads) - every one of
+# them can have a turn's tools in flight at once
+REQUEST_THREADS = int(os.environ.get('GUNICORN_THREADS', '32'))
+
+# Tools that write - never run two of these at once (job numbers would collide)
+SERIAL_TOOLS = {'reserve_job_number'}
 
 # Airtable headers
 AIRTABLE_HEADERS = {
@@ -47,52 +70,45 @@ if not os.path.exists(PROMPT_PATH):
 with open(PROMPT_PATH, 'r') as f:
     TRAFFIC_PROMPT = f.read()
 
+# Every call reuses the same prefix - mark it cacheable once
+CACHED_SYSTEM = prompt_cache.cached_system(TRAFFIC_PROMPT)
+
 # Anthropic client
 anthropic_client = Anthropic(
     api_key=ANTHROPIC_API_KEY,
     http_client=httpx.Client(timeout=60.0, follow_redirects=True)
 )
 
+# Pool for running a turn's tool calls concurrently. Sized so every request
+# thread can have TOOL_WORKERS tools running - one slow email's tools never
+# queue behind another request's. Threads are only started as needed.
+_tool_pool = ThreadPoolExecutor(max_workers=REQUEST_THREADS * TOOL_WORKERS, thread_name_prefix='traffic-tool')
+
 
 # ===================
 # CONVERSATION MEMORY (Hub only)
 # ===================
 
-conversations = {}
-SESSION_TIMEOUT = 30 * 60  # 30 minutes
+# Stored in sessions.py so every gunicorn worker sees the same history
 
 def get_conversation(session_id):
-    """Get or create conversation history for a session"""
-    now = time.time()
-    
-    # Clean up old sessions
-    expired = [sid for sid, data in conversations.items() if now - data['last_active'] > SESSION_TIMEOUT]
-    for sid in expired:
-        del conversations[sid]
-    
-    if session_id not in conversations:
-        conversations[session_id] = {
-            'messages': [],
-            'last_active': now
-        }
-    else:
-        conversations[session_id]['last_active'] = now
-    
-    return conversations[session_id]
+    """Get conversation history for a session ({'messages': [...]})"""
+    return {'messages': sessions.get_store().get(session_id)}
 
 def add_to_conversation(session_id, role, content):
     """Add a message to conversation history"""
-    conv = get_conversation(session_id)
-    conv['messages'].append({'role': role, 'content': content})
-    
-    # Keep only last 10 exchanges (20 messages)
-    if len(conv['messages']) > 20:
-        conv['messages'] = conv['messages'][-20:]
+    sessions.get_store().append(session_id, [{'role': role, 'content': content}])
+
+def add_exchange(session_id, user_content, assistant_content):
+    """Add a user/assistant pair in one write, so concurrent requests can't interleave them"""
+    sessions.get_store().append(session_id, [
+        {'role': 'user', 'content': user_content},
+        {'role': 'assistant', 'content': assistant_content}
+    ])
 
 def clear_conversation(session_id):
     """Clear conversation history for a session"""
-    if session_id in conversations:
-        del conversations[session_id]
+    sessions.get_store().delete(session_id)
     return True
 
 
@@ -103,8 +119,6 @@ def clear_conversation(session_id):
 def tool_search_people(client_code=None, search_term=None):
     """Search People table"""
     try:
-        url = get_airtable_url('People')
-        
         filters = ["{Active} = TRUE()"]
         if client_code:
             # Handle One NZ divisions
@@ -118,37 +132,24 @@ def tool_search_people(client_code=None, search_term=None):
         }
         
         all_people = []
-        offset = None
         
-        while True:
-            if offset:
-                params['offset'] = offset
-            
-            response = requests.get(url, headers=AIRTABLE_HEADERS, params=params)
-            response.raise_for_status()
-            data = response.json()
+        for record in airtable_client.iter_records('People', params=params):
+            fields = record.get('fields', {})
+            name = fields.get('Name', fields.get('Full name', ''))
+            if not name:
+                continue
             
-            for record in data.get('records', []):
-                fields = record.get('fields', {})
-                name = fields.get('Name', fields.get('Full name', ''))
-                if not name:
+            if search_term:
+                searchable = f"{name} {fields.get('Email Address', '')}".lower()
+                if search_term.lower() not in searchable:
                     continue
-                
-                if search_term:
-                    searchable = f"{name} {fields.get('Email Address', '')}".lower()
-                    if search_term.lower() not in searchable:
-                        continue
-                
-                all_people.append({
-                    'name': name,
-                    'email': fields.get('Email Address', ''),
-                    'phone': fields.get('Phone Number', ''),
-                    'clientCode': fields.get('Client Link', '')
-                })
             
-            offset = data.get('offset')
-            if not offset:
-                break
+            all_people.append({
+                'name': name,
+                'email': fields.get('Email Address', ''),
+                'phone': fields.get('Phone Number', ''),
+                'clientCode': fields.get('Client Link', '')
+            })
         
         return {'count': len(all_people), 'people': all_people}
     
@@ -159,20 +160,10 @@ def tool_search_people(client_code=None, search_term=None):
 def tool_get_client_detail(client_code):
     """Get detailed client info"""
     try:
-        url = get_airtable_url('Clients')
-        params = {
-            'filterByFormula': f"{{Client code}} = '{client_code}'",
-            'maxRecords': 1
-        }
-        response = requests.get(url, headers=AIRTABLE_HEADERS, params=params)
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
-        if not records:
+        fields = clients_cache.get_client_fields(client_code)
+        if fields is None:
             return {'error': f'Client {client_code} not found'}
         
-        fields = records[0].get('fields', {})
-        
         def parse_currency(val):
             if isinstance(val, (int, float)):
                 return val
@@ -205,42 +196,36 @@ def tool_get_client_detail(client_code):
 def tool_get_spend_summary(client_code, period='this_month'):
     """Get spend summary for a client"""
     try:
-        clients_url = get_airtable_url('Clients')
-        clients_response = requests.get(clients_url, headers=AIRTABLE_HEADERS)
-        clients_response.raise_for_status()
-        
         client_info = None
-        for record in clients_response.json().get('records', []):
-            fields = record.get('fields', {})
-            if fields.get('Client code', '') == client_code:
-                def parse_currency(val):
-                    if isinstance(val, (int, float)):
-                        return float(val)
-                    if isinstance(val, str):
-                        return float(val.replace('$', '').replace(',', '') or 0)
-                    if isinstance(val, list):
-                        return float(val[0]) if val else 0
-                    return 0
-                
-                monthly = parse_currency(fields.get('Monthly Committed', 0))
-                rollover = parse_currency(fields.get('Rollover Credit', 0))
-                rollover_use = fields.get('Rollover use', '')
-                
-                client_info = {
-                    'name': fields.get('Clients', ''),
-                    'code': client_code,
-                    'monthlyBudget': monthly,
-                    'quarterlyBudget': monthly * 3,
-                    'currentQuarter': fields.get('Current Quarter', ''),
-                    'rollover': rollover,
-                    'rolloverUse': rollover_use,
-                    'JAN-MAR': parse_currency(fields.get('JAN-MAR', 0)),
-                    'APR-JUN': parse_currency(fields.get('APR-JUN', 0)),
-                    'JUL-SEP': parse_currency(fields.get('JUL-SEP', 0)),
-                    'OCT-DEC': parse_currency(fields.get('OCT-DEC', 0)),
-                    'thisMonth': parse_currency(fields.get('This month', 0)),
-                }
-                break
+        fields = clients_cache.get_client_fields(client_code)
+        if fields is not None:
+            def parse_currency(val):
+                if isinstance(val, (int, float)):
+                    return float(val)
+                if isinstance(val, str):
+                    return float(val.replace('$', '').replace(',', '') or 0)
+                if isinstance(val, list):
+                    return float(val[0]) if val else 0
+                return 0
+            
+            monthly = parse_currency(fields.get('Monthly Committed', 0))
+            rollover = parse_currency(fields.get('Rollover Credit', 0))
+            rollover_use = fields.get('Rollover use', '')
+            
+            client_info = {
+                'name': fields.get('Clients', ''),
+                'code': client_code,
+                'monthlyBudget': monthly,
+                'quarterlyBudget': monthly * 3,
+                'currentQuarter': fields.get('Current Quarter', ''),
+                'rollover': rollover,
+                'rolloverUse': rollover_use,
+                'JAN-MAR': parse_currency(fields.get('JAN-MAR', 0)),
+                'APR-JUN': parse_currency(fields.get('APR-JUN', 0)),
+                'JUL-SEP': parse_currency(fields.get('JUL-SEP', 0)),
+                'OCT-DEC': parse_currency(fields.get('OCT-DEC', 0)),
+                'thisMonth': parse_currency(fields.get('This month', 0)),
+            }
         
         if not client_info:
             return {'error': f'Client {client_code} not found'}
@@ -349,6 +334,7 @@ def tool_reserve_job_number(client_code):
             json={'fields': {'Next Job #': new_next_num}}
         )
         update_response.raise_for_status()
+        clients_cache.invalidate()
         
         return {
             'success': True,
@@ -467,6 +453,9 @@ CLAUDE_TOOLS = [
     }
 ]
 
+# Same tools with a cache breakpoint on the last one
+CACHED_TOOLS = prompt_cache.cached_tools(CLAUDE_TOOLS)
+
 
 def execute_tool(tool_name, tool_input):
     """Execute a tool and return results"""
@@ -509,35 +498,81 @@ def execute_tool(tool_name, tool_input):
     return result
 
 
+def execute_tools(tool_blocks):
+    """
+    Execute every tool_use block from one Claude turn.
+    Read-only tools run concurrently on the tool pool (up to TOOL_WORKERS
+    per turn); write tools (SERIAL_TOOLS) run one at a time. Results come
+    back in block order.
+    """
+    if len(tool_blocks) == 1:
+        block = tool_blocks[0]
+        return [execute_tool(block.name, block.input)]
+    
+    print(f"[traffic] Executing {len(tool_blocks)} tools: {[b.name for b in tool_blocks]}")
+    
+    # At most TOOL_WORKERS of this turn's reads in flight at once
+    slots = threading.BoundedSemaphore(TOOL_WORKERS)
+    
+    def submit(block):
+        slots.acquire()
+        future = _tool_pool.submit(execute_tool, block.name, block.input)
+        future.add_done_callback(lambda _: slots.release())
+        return future
+    
+    futures = [
+        None if block.name in SERIAL_TOOLS else submit(block)
+        for block in tool_blocks
+    ]
+    
+    # Writes run here in order while the reads are in flight
+    results = [
+        execute_tool(block.name, block.input) if future is None else None
+        for block, future in zip(tool_blocks, futures)
+    ]
+    
+    return [
+        future.result() if future is not None else result
+        for future, result in zip(futures, results)
+    ]
+
+
 # ===================
 # EXTRACTION HELPERS
 # ===================
 
+def _scan_job_numbers(text):
+    """Every valid job number in text, in order of appearance (one regex pass)"""
+    if not text:
+        return []
+    found = []
+    for match in JOB_NUMBER_PATTERN.finditer(text):
+        code = match.group(1).upper()
+        if code in VALID_CODES:
+            found.append(f"{code} {match.group(2)}")
+    return found
+
+
+def extract_job_numbers(subject=None, attachment_names=None, content=None):
+    """
+    All candidate job numbers, best first: subject, then attachment
+    names, then body. Each input is scanned once and duplicates keep
+    their best position.
+    """
+    candidates = _scan_job_numbers(subject)
+    for name in attachment_names or []:
+        candidates += _scan_job_numbers(name)
+    candidates += _scan_job_numbers(content)
+    return list(dict.fromkeys(candidates))
+
+
 def extract_job_number(text):
     """
     Extract job number from text (e.g., 'TOW 023').
-    Pattern: 3 letters + space + 3 digits
+    Pattern: 3 letters + space / underscore / hyphen / nothing + 3 digits
     """
-    if not text:
-        return None
-    
-    # Look for pattern: 3 letters + space + 3 digits
-    match = re.search(r'\b([A-Z]{3})\s+(\d{3})\b', text.upper())
-    if match:
-        code = match.group(1)
-        number = match.group(2)
-        if code in VALID_CLIENT_CODES:
-            return f"{code} {number}"
-    
-    # Also check for underscore variant: ONE_125
-    match = re.search(r'\b([A-Z]{3})_(\d{3})\b', text.upper())
-    if match:
-        code = match.group(1)
-        number = match.group(2)
-        if code in VALID_CLIENT_CODES:
-            return f"{code} {number}"
-    
-    return None
+    found = _scan_job_numbers(text)
+    return found[0] if found else None
 
 
 def strip_markdown_json(content):
@@ -579,15 +614,16 @@ def route_request(request_data, active_jobs=None):
     attachment_names = request_data.get('attachmentNames', [])
     session_id = request_data.get('sessionId', None)
     
-    # Extract job number hint (regex is fine for structured data)
-    job_number = extract_job_number(subject)
-    if not job_number:
-        job_number = extract_job_number(content)
-    if not job_number and attachment_names:
-        for filename in attachment_names:
-            job_number = extract_job_number(filename)
-            if job_number:
-                break
+    # Unambiguous emails (todo:, file-to-job, WIP/Tracker + client) skip Claude
+    if source == 'email':
+        routing = prerouter.route(subject, content, attachment_names)
+        if routing:
+            return routing
+    
+    # Extract job number hints (regex is fine for structured data)
+    job_numbers = extract_job_numbers(subject, attachment_names, content)
+    job_number = job_numbers[0] if job_numbers else None
+    other_job_numbers = ', '.join(job_numbers[1:6]) or 'None'
     
     # Debug logging
     print(f"[traffic] === ROUTING DEBUG ===")
@@ -595,6 +631,8 @@ def route_request(request_data, active_jobs=None):
     print(f"[traffic] Content: {content[:100]}..." if len(content) > 100 else f"[traffic] Content: {content}")
     print(f"[traffic] Sender: {sender_email}")
     print(f"[traffic] Job number (regex): {job_number}")
+    if len(job_numbers) > 1:
+        print(f"[traffic] Other job numbers: {other_job_numbers}")
     
     # Format active jobs for prompt
     active_jobs_text = "No active jobs provided"
@@ -629,35 +667,38 @@ Has Attachments: {has_attachments}
 Attachment Names: {', '.join(attachment_names) if isinstance(attachment_names, list) else attachment_names}
 
 Job number found in text: {job_number if job_number else 'None'}
+Other job numbers mentioned: {other_job_numbers}
 
 Active jobs for reference:
 {active_jobs_text}
 
-Email content:
-{content}"""
+Email content (quoted thread, signatures and disclaimers removed):
+{email_prep.clean_body(content, subject)}"""
     
     # Build messages array
     messages = []
+    summary = None
     
-    # Add conversation history for hub sessions
+    # Add conversation history for hub sessions - recent turns verbatim,
+    # older ones folded into a summary, within a fixed token budget
     if source == 'hub' and session_id:
         conv = get_conversation(session_id)
-        for msg in conv['messages'][-10:]:  # Last 10 messages
-            messages.append(msg)
+        messages, summary = history.compact_session_history(session_id, conv['messages'])
     
     # Add current message
-    messages.append({'role': 'user', 'content': full_content})
+    messages.append({'role': 'user', 'content': history.with_summary(full_content, summary)})
     
     # Call Claude
     try:
-        response = anthropic_client.messages.create(
+        response = anthropic_client.beta.prompt_caching.messages.create(
             model=ANTHROPIC_MODEL,
             max_tokens=1500,
             temperature=0.1,
-            system=TRAFFIC_PROMPT,
-            tools=CLAUDE_TOOLS,
+            system=CACHED_SYSTEM,
+            tools=CACHED_TOOLS,
             messages=messages
         )
+        prompt_cache.log_usage('traffic', response)
         
         # Handle tool use - loop until Claude is done (max 5 rounds to prevent runaway)
         tool_rounds = 0
@@ -667,18 +708,17 @@ Email content:
             tool_rounds += 1
             print(f"[traffic] Tool round {tool_rounds}")
             
-            tool_results = []
             content_blocks = response.content
+            tool_blocks = [block for block in content_blocks if block.type == 'tool_use']
             
-            for block in content_blocks:
-                if block.type == 'tool_use':
-                    print(f"[traffic] Executing tool: {block.name}")
-                    tool_result = execute_tool(block.name, block.input)
-                    tool_results.append({
-                        'type': 'tool_result',
-                        'tool_use_id': block.id,
-                        'content': json.dumps(tool_result)
-                    })
+            tool_results = [
+                {
+                    'type': 'tool_result',
+                    'tool_use_id': block.id,
+                    'content': json.dumps(tool_result)
+                }
+                for block, tool_result in zip(tool_blocks, execute_tools(tool_blocks))
+            ]
             
             # Add assistant's tool use to messages
             assistant_content = []
@@ -699,14 +739,15 @@ Email content:
             messages.append({'role': 'user', 'content': tool_results})
             
             # Next Claude call with tool results
-            response = anthropic_client.messages.create(
+            response = anthropic_client.beta.prompt_caching.messages.create(
                 model=ANTHROPIC_MODEL,
                 max_tokens=1500,
                 temperature=0.1,
-                system=TRAFFIC_PROMPT,
-                tools=CLAUDE_TOOLS,
+                system=CACHED_SYSTEM,
+                tools=CACHED_TOOLS,
                 messages=messages
             )
+            prompt_cache.log_usage('traffic', response)
         
         # If we hit max rounds and Claude still wants tools, force a final answer
         if tool_rounds >= max_tool_rounds and response.stop_reason == 'tool_use':
@@ -733,13 +774,14 @@ Email content:
             messages.append({'role': 'user', 'content': "You've gathered enough information. Please provide your final JSON response now based on what you have."})
             
             # Final call WITHOUT tools to force JSON response
-            response = anthropic_client.messages.create(
+            response = anthropic_client.beta.prompt_caching.messages.create(
                 model=ANTHROPIC_MODEL,
                 max_tokens=1500,
                 temperature=0.1,
-                system=TRAFFIC_PROMPT,
+                system=CACHED_SYSTEM,
                 messages=messages  # No tools parameter = must respond with text
             )
+            prompt_cache.log_usage('traffic', response)
             print(f"[traffic] Forced final response, stop_reason: {response.stop_reason}")
         
         content_blocks = response.content
@@ -774,8 +816,7 @@ Email content:
         
         # Update conversation memory for hub sessions
         if source == 'hub' and session_id:
-            add_to_conversation(session_id, 'user', content)
-            add_to_conversation(session_id, 'assistant', routing.get('message', '')[:200])
+            add_exchange(session_id, content, routing.get('message', '')[:200])
         
         return routing
         
@@ -0,0 +1,240 @@
+"""
+Dot Traffic - Traffic Log Writer
+Write-behind queue for the Traffic table.
+
+The /traffic response never depends on the Traffic log, so app.py
+queues the write here and returns straight away. A background thread
+collects queued writes for a short window, sends them as Airtable
+batch calls (10 records per create/update), retries with backoff, and
+flushes whatever is left when the process shuts down.
+"""
+
+import os
+import time
+import queue
+import atexit
+import threading
+
+import httpx
+
+import airtable
+import dedup
+from utils import airtable_client
+
+# ===================
+# CONFIG
+# ===================
+
+TRAFFIC_TABLE = 'Traffic'
+
+# Airtable accepts at most 10 records per create/update call
+BATCH_SIZE = 10
+
+# How long the writer waits to fill a batch once the first write arrives
+BATCH_WINDOW = float(os.environ.get('TRAFFIC_LOG_BATCH_WINDOW', '0.5'))
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 0.5   # seconds, doubles each retry
+
+# How long shutdown waits for the queue to drain
+FLUSH_TIMEOUT = 10.0
+
+_queue = queue.Queue()
+_stopping = threading.Event()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+# ===================
+# SENDING
+# ===================
+
+def _retryable(status_code):
+    """Rate limits and server errors are worth another go; 4xx are not"""
+    return status_code == 429 or status_code >= 500
+
+
+def _send(method, records):
+    """
+    Send one batch (create or update) with retries.
+    Returns the created/updated records, or None if Airtable rejected it.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            if method == 'create':
+                response = airtable_client.post(TRAFFIC_TABLE, {'records': records})
+            else:
+                response = airtable_client.patch(TRAFFIC_TABLE, {'records': records})
+
+            if response.status_code == 200:
+                return response.json().get('records', [])
+
+            if not _retryable(response.status_code):
+                print(f"[traffic_log] {method} rejected: {response.status_code} - {response.text}")
+                return None
+
+            print(f"[traffic_log] {method} got {response.status_code}, retrying")
+
+        except httpx.HTTPError as e:
+            print(f"[traffic_log] {method} failed ({e}), retrying")
+
+        if attempt < MAX_ATTEMPTS - 1:
+            time.sleep(BACKOFF_BASE * (2 ** attempt))
+
+    print(f"[traffic_log] Gave up on {method} of {len(records)} records after {MAX_ATTEMPTS} attempts")
+    return None
+
+
+def _send_batch(method, records):
+    """
+    Send a batch; if Airtable rejects it outright (one bad record fails
+    the whole call), resend each record alone so the good ones still land.
+    """
+    result = _send(method, records)
+    if result is None and len(records) > 1:
+        result = []
+        for record in records:
+            single = _send(method, [record])
+            result.append(single[0] if single else None)
+    return result
+
+
+def _write(items):
+    """Write a group of queued items as batched creates and updates"""
+    creates = [item[1] for item in items if item[0] == 'create']
+
+    # Several updates to the same record collapse into one
+    updates = {}
+    for item in items:
+        if item[0] == 'update':
+            updates.setdefault(item[1], {}).update(item[2])
+
+    for i in range(0, len(creates), BATCH_SIZE):
+        chunk = creates[i:i + BATCH_SIZE]
+        created = _send_batch('create', [{'fields': fields} for fields in chunk]) or []
+
+        # Give the dedup index the real record IDs
+        for fields, record in zip(chunk, created):
+            if record:
+                dedup.remember(fields.get('internetMessageId'), record.get('id'), fields.get('Route'))
+
+    update_records = [{'id': record_id, 'fields': fields} for record_id, fields in updates.items()]
+    for i in range(0, len(update_records), BATCH_SIZE):
+        _send_batch('update', update_records[i:i + BATCH_SIZE])
+
+    if creates or update_records:
+        print(f"[traffic_log] Wrote {len(creates)} creates, {len(update_records)} updates")
+
+
+# ===================
+# WRITER THREAD
+# ===================
+
+def _collect():
+    """
+    Block for the next write, then gather whatever else arrives within
+    BATCH_WINDOW. Returns an empty list if there's nothing to do.
+    """
+    try:
+        items = [_queue.get(timeout=1.0)]
+    except queue.Empty:
+        return []
+
+    deadline = time.time() + BATCH_WINDOW
+    while not _stopping.is_set():
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            items.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+
+    # Anything already waiting goes in this round too
+    while True:
+        try:
+            items.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+
+    return items
+
+
+def _run():
+    """Writer loop - runs until shutdown and the queue is empty"""
+    while not (_stopping.is_set() and _queue.empty()):
+        items = _collect()
+        if not items:
+            continue
+        try:
+            _write(items)
+        except Exception as e:
+            print(f"[traffic_log] Error writing batch: {e}")
+        finally:
+            for _ in items:
+                _queue.task_done()
+
+
+def _ensure_writer():
+    """
+    Start the writer thread on first use.
+    Lazy so each gunicorn worker starts its own after fork.
+    """
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_run, name='traffic-log', daemon=True)
+            _writer.start()
+
+
+def flush(timeout=FLUSH_TIMEOUT):
+    """
+    Skip the batch window and wait for queued writes to land.
+    Registered with atexit so a worker shutdown doesn't drop log entries.
+    """
+    if _writer is None:
+        return
+    _stopping.set()
+    _writer.join(timeout)
+    if not _queue.empty():
+        print(f"[traffic_log] Shutdown with {_queue.qsize()} writes still queued")
+
+
+atexit.register(flush)
+
+
+# ===================
+# PUBLIC
+# ===================
+
+def log_traffic(internet_message_id, conversation_id, route, status, job_number, client_code, sender_email, subject, email_body=None):
+    """
+    Queue a Traffic log entry. Same arguments as airtable.log_traffic,
+    but returns immediately - the record is created in the background.
+    """
+    if not airtable.AIRTABLE_API_KEY:
+        return
+
+    fields = airtable.build_traffic_fields(
+        internet_message_id, conversation_id, route, status,
+        job_number, client_code, sender_email, subject, email_body
+    )
+
+    # Mark it seen now, so a redelivery arriving before the write lands is still caught
+    dedup.remember(internet_message_id, None, route)
+
+    _ensure_writer()
+    _queue.put(('create', fields))
+
+
+def update_traffic_record(record_id, updates):
+    """
+    Queue an update to an existing Traffic record (see airtable.update_traffic_record).
+    """
+    if not airtable.AIRTABLE_API_KEY or not record_id:
+        return
+
+    _ensure_writer()
+    _queue.put(('update', record_id, dict(updates)))
@@ -5,10 +5,11 @@ Shared data lookups for all workers.
 
 import os
 import re
-import httpx
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+from utils import airtable_client, clients_cache, tracker_cache
+
 # ===================
 # CONFIG
 # ===================
@@ -23,19 +24,42 @@ CLIENTS_TABLE = 'Clients'
 TRACKER_TABLE = 'Tracker'
 MEETINGS_TABLE = 'Meetings'
 
-TIMEOUT = 10.0
 NZ_TZ = ZoneInfo('Pacific/Auckland')
 
+# ===================
+# FIELD PROJECTIONS
+# ===================
 
-def _headers():
-    return {
-        'Authorization': f'Bearer {AIRTABLE_API_KEY}',
-        'Content-Type': 'application/json'
-    }
+# Each read asks Airtable for only the fields it uses (fields[]),
+# so big fields like The Story and EmailBody don't ride along.
+
+NEXT_JOB_FIELDS = ['Next Job #', 'Next #', 'Teams ID']
+
+PROJECT_FIELDS = [
+    'Project Name', 'Stage', 'Status', 'With Client?', 'Update',
+    'Teams Channel ID', 'Channel Url', 'Files Url',
+]
+
+WIP_FIELDS = [
+    'Job Number', 'Project Name', 'Description', 'Update', 'Status',
+    'With Client?',
+]
+
+# Fields the TO DO email needs from Projects
+TODO_FIELDS = [
+    'Job Number', 'Project Name', 'Description', 'Update Due',
+    'Channel Url', 'Project Owner', 'With Client?',
+]
 
+MEETING_FIELDS = ['Title', 'Start', 'End', 'Location', 'Whose meeting']
 
-def _url(table):
-    return f'https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{table}'
+# createdTime comes back on every record regardless of projection
+TRACKER_FIELDS = ['Spend', 'Month']
+
+# Whole-table Tracker reads also need the client to partition on
+TRACKER_BULK_FIELDS = TRACKER_FIELDS + ['Client Code']
+
+BUDGET_HISTORY_FIELDS = ['Client', 'Effective From', 'Monthly Committed']
 
 
 def _get_current_quarter():
@@ -71,34 +95,17 @@ def get_client_sharepoint(client_code):
     if not AIRTABLE_API_KEY or not client_code:
         return None
     
-    try:
-        params = {
-            'filterByFormula': f"{{Client code}}='{client_code}'"
-        }
-        
-        response = httpx.get(
-            _url(CLIENTS_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
-        if not records:
-            print(f"[airtable] No client found for code: {client_code}")
-            return None
-        
-        sharepoint_url = records[0]['fields'].get('Sharepoint ID', None)
-        
-        if not sharepoint_url:
-            print(f"[airtable] No SharePoint URL configured for: {client_code}")
-            
-        return sharepoint_url
-        
-    except Exception as e:
-        print(f"[airtable] Error looking up client SharePoint: {e}")
+    fields = clients_cache.get_client_fields(client_code)
+    if fields is None:
+        print(f"[airtable] No client found for code: {client_code}")
         return None
+    
+    sharepoint_url = fields.get('Sharepoint ID', None)
+    
+    if not sharepoint_url:
+        print(f"[airtable] No SharePoint URL configured for: {client_code}")
+        
+    return sharepoint_url
 
 
 def get_next_job_number(client_code):
@@ -117,16 +124,13 @@ def get_next_job_number(client_code):
         return None, None, None, "Missing API key or client code"
     
     try:
+        # Read straight from Airtable, not the Clients cache - the counter
+        # must be current or two setups could reserve the same number
         params = {
             'filterByFormula': f"{{Client code}}='{client_code}'"
         }
         
-        response = httpx.get(
-            _url(CLIENTS_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
+        response = airtable_client.get(CLIENTS_TABLE, params=params, fields=NEXT_JOB_FIELDS)
         response.raise_for_status()
         
         records = response.json().get('records', [])
@@ -147,13 +151,9 @@ def get_next_job_number(client_code):
         team_id = fields.get('Teams ID', None)
         
         # Increment the counter for next time
-        response = httpx.patch(
-            f"{_url(CLIENTS_TABLE)}/{record_id}",
-            headers=_headers(),
-            json={'fields': {'Next #': current_counter + 1}},
-            timeout=TIMEOUT
-        )
+        response = airtable_client.patch(CLIENTS_TABLE, {'fields': {'Next #': current_counter + 1}}, record_id=record_id)
         response.raise_for_status()
+        clients_cache.invalidate()
         
         print(f"[airtable] Reserved job number: {job_number}, incremented to {current_counter + 1}")
         return job_number, record_id, team_id, None
@@ -170,28 +170,11 @@ def get_client_name(client_code):
     if not AIRTABLE_API_KEY or not client_code:
         return None
     
-    try:
-        params = {
-            'filterByFormula': f"{{Client code}}='{client_code}'"
-        }
-        
-        response = httpx.get(
-            _url(CLIENTS_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
-        records = response.json().get('records', [])
-        if not records:
-            return None
-        
-        return records[0]['fields'].get('Clients', None)
-        
-    except Exception as e:
-        print(f"[airtable] Error looking up client name: {e}")
+    fields = clients_cache.get_client_fields(client_code)
+    if not fields:
         return None
+    
+    return fields.get('Clients', None)
 
 
 # ===================
@@ -213,12 +196,7 @@ def get_email_body(internet_message_id):
             'maxRecords': 1
         }
         
-        response = httpx.get(
-            _url(TRAFFIC_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
+        response = airtable_client.get(TRAFFIC_TABLE, params=params, fields=['EmailBody'])
         response.raise_for_status()
         
         records = response.json().get('records', [])
@@ -253,12 +231,7 @@ def get_project(job_number):
             'maxRecords': 1
         }
         
-        response = httpx.get(
-            _url(PROJECTS_TABLE), 
-            headers=_headers(), 
-            params=params, 
-            timeout=TIMEOUT
-        )
+        response = airtable_client.get(PROJECTS_TABLE, params=params, fields=PROJECT_FIELDS)
         response.raise_for_status()
         
         records = response.json().get('records', [])
@@ -348,12 +321,7 @@ def create_project(job_number, job_name, description=None,
         print(f"[airtable] Creating project: {job_number} - {job_name}")
         print(f"[airtable] Fields: {list(fields.keys())}")
         
-        response = httpx.post(
-            _url(PROJECTS_TABLE),
-            headers=_headers(),
-            json={'fields': fields},
-            timeout=TIMEOUT
-        )
+        response = airtable_client.post(PROJECTS_TABLE, {'fields': fields})
         response.raise_for_status()
         
         new_record = response.json()
@@ -414,12 +382,7 @@ def update_project(job_record_id, **kwargs):
         if not fields:
             return True, None
 
-        response = httpx.patch(
-            f"{_url(PROJECTS_TABLE)}/{job_record_id}",
-            headers=_headers(),
-            json={'fields': fields},
-            timeout=TIMEOUT
-        )
+        response = airtable_client.patch(PROJECTS_TABLE, {'fields': fields}, record_id=job_record_id)
         response.raise_for_status()
 
         return True, None
@@ -489,18 +452,14 @@ def create_tracker(project_record_id, spend=None, spend_type='Project budget',
         
         print(f"[airtable] Creating tracker record for project: {project_record_id}")
         
-        response = httpx.post(
-            _url(TRACKER_TABLE),
-            headers=_headers(),
-            json={'fields': fields},
-            timeout=TIMEOUT
-        )
+        response = airtable_client.post(TRACKER_TABLE, {'fields': fields})
         response.raise_for_status()
         
         new_record = response.json()
         record_id = new_record.get('id')
         
         print(f"[airtable] Created tracker: {record_id}")
+        tracker_cache.invalidate()
         return record_id, None
         
     except Exception as e:
@@ -530,12 +489,7 @@ def write_update(job_record_id, update_text, update_due=None):
         if update_due:
             update_data['fields']['Update Due'] = update_due
         
-        response = httpx.post(
-            _url(UPDATES_TABLE), 
-            headers=_headers(), 
-            json=update_data, 
-            timeout=TIMEOUT
-        )
+        response = airtable_client.post(UPDATES_TABLE, update_data)
         response.raise_for_status()
         
         new_record = response.json()
@@ -570,33 +524,13 @@ def get_jobs_for_client(client_code):
         filter_formula = f"AND(OR({{Status}}='In Progress', {{Status}}='On Hold', {{Status}}='Incoming'), FIND('{client_code}', {{Job Number}}))"
         
         params = {'filterByFormula': filter_formula}
-        all_records = []
-        offset = None
-        
-        while True:
-            if offset:
-                params['offset'] = offset
-            
-            response = httpx.get(
-                _url(PROJECTS_TABLE),
-                headers=_headers(),
-                params=params,
-                timeout=TIMEOUT
-            )
-            response.raise_for_status()
-            data = response.json()
-            all_records.extend(data.get('records', []))
-            
-            offset = data.get('offset')
-            if not offset:
-                break
         
         with_hunch = []
         with_you = []
         on_hold = []
         upcoming = []
         
-        for record in all_records:
+        for record in airtable_client.iter_records(PROJECTS_TABLE, params=params, fields=WIP_FIELDS):
             fields = record.get('fields', {})
             status = fields.get('Status', '')
             
@@ -771,24 +705,16 @@ def get_todo_jobs():
         next_day, _ = get_next_workday()
         end_of_week, week_label = get_end_of_week()
         
-        # Fetch active jobs with Update Due set
+        # Fetch active jobs with Update Due set - every page, not just the first
         params = {
             'filterByFormula': "AND(OR({Status}='In Progress', {Status}='Incoming'), {Update Due}!='')"
         }
         
-        response = httpx.get(
-            _url(PROJECTS_TABLE),
-            headers=_headers(),
-            params=params,
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
         today_jobs = []
         tomorrow_jobs = []
         week_jobs = []
         
-        for record in response.json().get('records', []):
+        for record in airtable_client.iter_records(PROJECTS_TABLE, params=params, fields=TODO_FIELDS):
             fields = record.get('fields', {})
             
             # Skip if with client
@@ -850,17 +776,10 @@ def get_meetings():
         today_date = get_nz_today()
         next_day, _ = get_next_workday()
         
-        response = httpx.get(
-            _url(MEETINGS_TABLE),
-            headers=_headers(),
-            timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        
         today_meetings = []
         tomorrow_meetings = []
         
-        for record in response.json().get('records', []):
+        for record in airtable_client.iter_records(MEETINGS_TABLE, fields=MEETING_FIELDS):
             fields = record.get('fields', {})
             
             start_str = fields.get('Start', '')
@@ -901,6 +820,16 @@ def get_meetings():
 # SPEND CHART HELPERS
 # ===================
 
+def _chart_client(fields, client_code):
+    """Shape a Clients record's fields into the chart metadata dict"""
+    return {
+        'code': fields.get('Client code', client_code),
+        'name': fields.get('Clients', client_code),
+        'year_end': fields.get('Year end'),
+        'monthly_committed': float(fields.get('Monthly Committed') or 0),
+    }
+
+
 def get_client_for_chart(client_code):
     """
     Fetch the client metadata needed to build a YTD spend chart.
@@ -912,28 +841,10 @@ def get_client_for_chart(client_code):
         return None
 
     try:
-        params = {
-            'filterByFormula': f"{{Client code}}='{client_code}'",
-            'maxRecords': 1,
-        }
-        response = httpx.get(
-            _url(CLIENTS_TABLE),
-            headers=_headers(),
-            params=params,
-            timeout=TIMEOUT,
-        )
-        response.raise_for_status()
-        records = response.json().get('records', [])
-        if not records:
+        fields = clients_cache.get_client_fields(client_code)
+        if fields is None:
             return None
-
-        fields = records[0].get('fields', {})
-        return {
-            'code': fields.get('Client code', client_code),
-            'name': fields.get('Clients', client_code),
-            'year_end': fields.get('Year end'),
-            'monthly_committed': float(fields.get('Monthly Committed') or 0),
-        }
+        return _chart_client(fields, client_code)
     except Exception as e:
         print(f"[airtable] Error fetching client {client_code}: {e}")
         return None
@@ -952,37 +863,10 @@ def get_all_clients_for_chart():
         return []
 
     try:
-        all_records = []
-        params = {'pageSize': 100}
-        offset = None
-        while True:
-            if offset:
-                params['offset'] = offset
-            response = httpx.get(
-                _url(CLIENTS_TABLE),
-                headers=_headers(),
-                params=params,
-                timeout=TIMEOUT,
-            )
-            response.raise_for_status()
-            data = response.json()
-            all_records.extend(data.get('records', []))
-            offset = data.get('offset')
-            if not offset:
-                break
-
-        out = []
-        for record in all_records:
-            fields = record.get('fields', {})
-            code = fields.get('Client code')
-            if not code:
-                continue
-            out.append({
-                'code': code,
-                'name': fields.get('Clients', code),
-                'year_end': fields.get('Year end'),
-                'monthly_committed': float(fields.get('Monthly Committed') or 0),
-            })
+        out = [
+            _chart_client(record.get('fields', {}), code)
+            for code, record in clients_cache.get_clients().items()
+        ]
 
         print(f"[airtable] Fetched {len(out)} clients for Hunch chart")
         return out
@@ -992,19 +876,65 @@ def get_all_clients_for_chart():
         return []
 
 
+def _tracker_row(record):
+    """Shape a Tracker record for the chart, or None if it has no usable Spend"""
+    fields = record.get('fields', {})
+    spend = fields.get('Spend')
+    if spend is None:
+        return None
+    # Spend can be a number or a string (Airtable currency formatting)
+    if isinstance(spend, str):
+        try:
+            spend = float(spend.replace('$', '').replace(',', '').strip())
+        except ValueError:
+            return None
+    return {
+        'spend': float(spend),
+        'month': fields.get('Month'),
+        'createdTime': record.get('createdTime'),
+    }
+
+
+def _budget_history_row(fields, client_code):
+    """Shape a Budget History record, or None if it's missing a date or amount"""
+    eff = fields.get('Effective From')
+    committed = fields.get('Monthly Committed')
+    if not eff or committed is None:
+        return None
+    return {
+        'client': fields.get('Client', client_code),
+        'effective_from': eff,  # ISO date string 'YYYY-MM-DD'
+        'monthly_committed': float(committed),
+    }
+
+
+def _client_code_value(value):
+    """Client code from a formula / lookup / text field ('TOW', ['TOW'], 'TOW\n')"""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return str(value).strip().upper() if value else None
+
+
 def get_tracker_for_client(client_code):
     """
     Fetch all Tracker records for one client.
 
     Returns list of dicts with: spend (float), month (string), createdTime
-    (ISO 8601 string). Filters server-side on the {Client Code} formula
-    field, paginates with offset, and only keeps Project budget entries
-    (matches the Hub's tracker.py spend rule — Extra budget and Project
-    on us don't count toward committed-spend tracking).
+    (ISO 8601 string). Only keeps Project budget entries (matches the
+    Hub's tracker.py spend rule — Extra budget and Project on us don't
+    count toward committed-spend tracking).
+
+    Reads the Tracker snapshot (tracker_cache). If that can't load, falls
+    back to filtering server-side on the {Client Code} formula field.
     """
     if not AIRTABLE_API_KEY or not client_code:
         return []
 
+    rows = tracker_cache.get_client_rows(client_code)
+    if rows is not None:
+        print(f"[airtable] Tracker records for {client_code}: {len(rows)} (Project budget only, snapshot)")
+        return rows
+
     try:
         # Server-side filter on Tracker's Client Code formula field.
         # Also restrict to Project budget so we match Hub tracker semantics.
@@ -1014,43 +944,13 @@ def get_tracker_for_client(client_code):
             f"{{Spend type}}='Project budget'"
             f")"
         )
-        params = {'filterByFormula': formula, 'pageSize': 100}
-        all_records = []
-        offset = None
-
-        while True:
-            if offset:
-                params['offset'] = offset
-            response = httpx.get(
-                _url(TRACKER_TABLE),
-                headers=_headers(),
-                params=params,
-                timeout=TIMEOUT,
-            )
-            response.raise_for_status()
-            data = response.json()
-            all_records.extend(data.get('records', []))
-            offset = data.get('offset')
-            if not offset:
-                break
+        params = {'filterByFormula': formula}
 
         out = []
-        for record in all_records:
-            fields = record.get('fields', {})
-            spend = fields.get('Spend')
-            if spend is None:
-                continue
-            # Spend can be a number or a string (Airtable currency formatting)
-            if isinstance(spend, str):
-                try:
-                    spend = float(spend.replace('$', '').replace(',', '').strip())
-                except ValueError:
-                    continue
-            out.append({
-                'spend': float(spend),
-                'month': fields.get('Month'),
-                'createdTime': record.get('createdTime'),
-            })
+        for record in airtable_client.iter_records(TRACKER_TABLE, params=params, fields=TRACKER_FIELDS):
+            row = _tracker_row(record)
+            if row:
+                out.append(row)
 
         print(f"[airtable] Tracker records for {client_code}: {len(out)} (Project budget only)")
         return out
@@ -1060,6 +960,18 @@ def get_tracker_for_client(client_code):
         return []
 
 
+def get_tracker_arrays_for_client(client_code):
+    """
+    One client's Project budget Tracker rows as NumPy arrays (see
+    tracker_cache.get_client_arrays) - what the chart maths runs on.
+    """
+    arrays = tracker_cache.get_client_arrays(client_code)
+    if arrays is not None:
+        print(f"[airtable] Tracker arrays for {client_code}: {len(arrays['spend'])} rows (Project budget only, snapshot)")
+        return arrays
+    return tracker_cache.to_arrays(get_tracker_for_client(client_code))
+
+
 def get_budget_history_for_client(client_code):
     """
     Fetch all Budget History records for one client.
@@ -1079,41 +991,13 @@ def get_budget_history_for_client(client_code):
     try:
         # Budget History uses 'Client' (not 'Client code') as the key field —
         # see schema. It's a multilineText field, so an exact-match formula:
-        params = {
-            'filterByFormula': f"{{Client}}='{client_code}'",
-            'pageSize': 100,
-        }
-        all_records = []
-        offset = None
-
-        while True:
-            if offset:
-                params['offset'] = offset
-            response = httpx.get(
-                _url('Budget History'),
-                headers=_headers(),
-                params=params,
-                timeout=TIMEOUT,
-            )
-            response.raise_for_status()
-            data = response.json()
-            all_records.extend(data.get('records', []))
-            offset = data.get('offset')
-            if not offset:
-                break
+        params = {'filterByFormula': f"{{Client}}='{client_code}'"}
 
         out = []
-        for record in all_records:
-            fields = record.get('fields', {})
-            eff = fields.get('Effective From')
-            committed = fields.get('Monthly Committed')
-            if not eff or committed is None:
-                continue
-            out.append({
-                'client': fields.get('Client', client_code),
-                'effective_from': eff,  # ISO date string 'YYYY-MM-DD'
-                'monthly_committed': float(committed),
-            })
+        for record in airtable_client.iter_records('Budget History', params=params, fields=BUDGET_HISTORY_FIELDS):
+            row = _budget_history_row(record.get('fields', {}), client_code)
+            if row:
+                out.append(row)
 
         out.sort(key=lambda r: r['effective_from'])
         print(f"[airtable] Budget History for {client_code}: {len(out)} records")
@@ -1122,3 +1006,80 @@ def get_budget_history_for_client(client_code):
     except Exception as e:
         print(f"[airtable] Error fetching Budget History for {client_code}: {e}")
         return []
+
+
+def get_tracker_by_client():
+    """
+    Fetch Project budget Tracker records for every client in one scan.
+
+    Returns dict of client code -> list of dicts shaped like
+    get_tracker_for_client. Used by the Hunch chart, which needs every
+    client's spend - one paginated read instead of one per client.
+
+    Reads the Tracker snapshot (tracker_cache), or scans the table
+    directly if that can't load.
+    """
+    if not AIRTABLE_API_KEY:
+        return {}
+
+    by_client = tracker_cache.get_rows_by_client()
+    if by_client is not None:
+        return by_client
+
+    try:
+        params = {'filterByFormula': "{Spend type}='Project budget'"}
+
+        out = {}
+        count = 0
+        for record in airtable_client.iter_records(TRACKER_TABLE, params=params, fields=TRACKER_BULK_FIELDS):
+            client_code = _client_code_value(record.get('fields', {}).get('Client Code'))
+            row = _tracker_row(record)
+            if not client_code or not row:
+                continue
+            out.setdefault(client_code, []).append(row)
+            count += 1
+
+        print(f"[airtable] Tracker records for all clients: {count} across {len(out)} clients (Project budget only)")
+        return out
+
+    except Exception as e:
+        print(f"[airtable] Error fetching tracker for all clients: {e}")
+        return {}
+
+
+def get_tracker_arrays_by_client():
+    """Every client's Project budget Tracker rows as NumPy arrays, by client code"""
+    by_client = tracker_cache.get_arrays_by_client()
+    if by_client is not None:
+        return by_client
+    return {code: tracker_cache.to_arrays(rows) for code, rows in get_tracker_by_client().items()}
+
+
+def get_budget_history_by_client():
+    """
+    Fetch Budget History for every client in one scan.
+
+    Returns dict of client code -> list of dicts shaped like
+    get_budget_history_for_client (sorted by effective_from ascending).
+    """
+    if not AIRTABLE_API_KEY:
+        return {}
+
+    try:
+        out = {}
+        for record in airtable_client.iter_records('Budget History', fields=BUDGET_HISTORY_FIELDS):
+            fields = record.get('fields', {})
+            client_code = _client_code_value(fields.get('Client'))
+            row = _budget_history_row(fields, client_code)
+            if not client_code or not row:
+                continue
+            out.setdefault(client_code, []).append(row)
+
+        for rows in out.values():
+            rows.sort(key=lambda r: r['effective_from'])
+        print(f"[airtable] Budget History for all clients: {sum(len(r) for r in out.values())} records across {len(out)} clients")
+        return out
+
+    except Exception as e:
+        print(f"[airtable] Error fetching Budget History for all clients: {e}")
+        return {}
@@ -0,0 +1,204 @@
+"""
+Dot - Airtable Client
+One pooled, keep-alive HTTP session for every Airtable call.
+
+Both airtable.py (Brain) and utils/airtable.py (Workers) go through here,
+so a single /traffic request reuses warm TLS connections to
+api.airtable.com instead of opening a fresh one per lookup.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+# ===================
+# CONFIG
+# ===================
+
+AIRTABLE_API_KEY = os.environ.get('AIRTABLE_API_KEY')
+AIRTABLE_BASE_ID = os.environ.get('AIRTABLE_BASE_ID', 'app8CI7NAZqhQ4G1Y')
+
+# Connection pool - override via env on busier deployments
+MAX_CONNECTIONS = int(os.environ.get('AIRTABLE_MAX_CONNECTIONS', '40'))
+MAX_KEEPALIVE = int(os.environ.get('AIRTABLE_MAX_KEEPALIVE', '10'))
+KEEPALIVE_EXPIRY = float(os.environ.get('AIRTABLE_KEEPALIVE_EXPIRY', '30'))
+
+# HTTP/2 multiplexes concurrent lookups over one connection.
+# Needs the 'h2' package (httpx[http2]) - falls back to HTTP/1.1 keep-alive.
+HTTP2 = os.environ.get('AIRTABLE_HTTP2', 'true').lower() in ('1', 'true', 'yes')
+
+DEFAULT_TIMEOUT = 10.0
+
+# Per-table timeouts. Big tables scanned with formulas get more headroom;
+# gateway lookups stay tight so a slow Airtable fails fast.
+TABLE_TIMEOUTS = {
+    'Traffic': 10.0,
+    'Projects': 10.0,
+    'Clients': 8.0,
+    'Tracker': 20.0,
+    'Budget History': 20.0,
+    'Meetings': 10.0,
+}
+
+# Airtable caps pages at 100 records
+PAGE_SIZE = 100
+
+_client = None
+_client_lock = threading.Lock()
+
+# Background threads that fetch the next page while the current one is processed
+_prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='airtable-page')
+
+
+# ===================
+# SESSION
+# ===================
+
+def _http2_available():
+    """True if HTTP/2 is enabled and the h2 package is installed"""
+    if not HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_client():
+    """
+    Get the shared httpx.Client, creating it on first use.
+    Created lazily so each gunicorn worker builds its own pool after fork.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                http2 = _http2_available()
+                _client = httpx.Client(
+                    base_url=f'https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/',
+                    headers={
+                        'Authorization': f'Bearer {AIRTABLE_API_KEY}',
+                        'Content-Type': 'application/json'
+                    },
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE,
+                        keepalive_expiry=KEEPALIVE_EXPIRY
+                    ),
+                    timeout=DEFAULT_TIMEOUT,
+                    http2=http2
+                )
+                print(f"[airtable_client] Session ready (http2={http2}, pool={MAX_CONNECTIONS})")
+    return _client
+
+
+def close():
+    """Close the shared session (tests / shutdown)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def timeout_for(table):
+    """Timeout for a table, falling back to the default"""
+    return TABLE_TIMEOUTS.get(table, DEFAULT_TIMEOUT)
+
+
+def _path(table, record_id=None):
+    """Relative URL for a table (or one record in it)"""
+    return f'{table}/{record_id}' if record_id else table
+
+
+# ===================
+# REQUESTS
+# ===================
+
+def get(table, params=None, record_id=None, fields=None, timeout=None):
+    """
+    GET records from a table. Returns the httpx.Response.
+    fields: optional list of field names - only these are downloaded.
+    """
+    if fields:
+        params = dict(params or {})
+        params['fields[]'] = list(fields)
+    return get_client().get(
+        _path(table, record_id),
+        params=params,
+        timeout=timeout or timeout_for(table)
+    )
+
+
+def post(table, json, timeout=None):
+    """POST (create) records in a table. Returns the httpx.Response."""
+    return get_client().post(
+        _path(table),
+        json=json,
+        timeout=timeout or timeout_for(table)
+    )
+
+
+def patch(table, json, record_id=None, timeout=None):
+    """PATCH one record (record_id) or a batch of records. Returns the httpx.Response."""
+    return get_client().patch(
+        _path(table, record_id),
+        json=json,
+        timeout=timeout or timeout_for(table)
+    )
+
+
+# ===================
+# PAGINATION
+# ===================
+
+def iter_records(table, params=None, fields=None, page_size=PAGE_SIZE, timeout=None):
+    """
+    Yield every record matching a query, following Airtable's offset
+    pagination. The next page is already in flight while the caller
+    works through the current one.
+
+    Args:
+        table: table name
+        params: query params (filterByFormula, maxRecords, sort...)
+        fields: optional list of field names - only these are downloaded
+        page_size: records per page (max 100)
+
+    Raises httpx errors like get() - callers keep their own try/except.
+    """
+    base_params = dict(params or {})
+    base_params['pageSize'] = page_size
+
+    def fetch_page(offset):
+        page_params = dict(base_params)
+        if offset:
+            page_params['offset'] = offset
+        response = get(table, params=page_params, fields=fields, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    data = fetch_page(None)
+    while True:
+        offset = data.get('offset')
+        next_page = _prefetch_pool.submit(fetch_page, offset) if offset else None
+
+        try:
+            yield from data.get('records', [])
+        except GeneratorExit:
+            # Caller stopped early - don't leave the prefetch waiting on us
+            if next_page:
+                next_page.cancel()
+            raise
+
+        if not next_page:
+            return
+        data = next_page.result()
+
+
+def list_records(table, params=None, fields=None, page_size=PAGE_SIZE, timeout=None):
+    """All records matching a query, across every page (see iter_records)"""
+    return list(iter_records(table, params=params, fields=fields,
+                             page_size=page_size, timeout=timeout))
@@ -0,0 +1,101 @@
+"""
+Dot - Clients Cache
+In-process snapshot of the Clients table, indexed by Client code.
+
+The Clients table is about a dozen rows that rarely change, so we load
+the whole thing once and answer Team ID / name / SharePoint / chart
+lookups from memory. The snapshot refreshes after CLIENTS_CACHE_TTL
+seconds, and anything that writes to Clients calls invalidate().
+"""
+
+import os
+import time
+import threading
+
+from utils import airtable_client
+
+# ===================
+# CONFIG
+# ===================
+
+AIRTABLE_API_KEY = os.environ.get('AIRTABLE_API_KEY')
+
+CLIENTS_TABLE = 'Clients'
+
+# Rollup fields (This month, This Quarter) move as spend is tracked,
+# so keep this short enough that spend answers stay current.
+CACHE_TTL = float(os.environ.get('CLIENTS_CACHE_TTL', '120'))
+
+# After a failed load, wait this long before trying Airtable again
+RETRY_AFTER = 15
+
+_snapshot = {}        # Client code -> Airtable record {'id', 'fields'}
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+# ===================
+# LOADING
+# ===================
+
+def _load():
+    """Fetch every Clients record and index by Client code"""
+    index = {}
+    for record in airtable_client.iter_records(CLIENTS_TABLE):
+        code = record.get('fields', {}).get('Client code')
+        if code:
+            index[code] = record
+    return index
+
+
+def get_clients():
+    """
+    Get the Clients snapshot: dict of Client code -> record.
+    Refreshes when older than CACHE_TTL. If a refresh fails we keep
+    serving the previous snapshot rather than failing the lookup, and
+    don't retry for RETRY_AFTER seconds - during an outage every lookup
+    would otherwise queue on the lock behind a full request timeout.
+    """
+    global _snapshot, _loaded_at
+
+    if not AIRTABLE_API_KEY:
+        return {}
+
+    if time.time() - _loaded_at < CACHE_TTL:
+        return _snapshot
+
+    with _lock:
+        # Another thread may have refreshed while we waited
+        if time.time() - _loaded_at < CACHE_TTL:
+            return _snapshot
+        try:
+            _snapshot = _load()
+            _loaded_at = time.time()
+            print(f"[clients_cache] Loaded {len(_snapshot)} clients")
+        except Exception as e:
+            _loaded_at = time.time() - CACHE_TTL + RETRY_AFTER
+            print(f"[clients_cache] Error loading Clients table, retrying in {RETRY_AFTER}s: {e}")
+
+    return _snapshot
+
+
+def get_client(client_code):
+    """
+    Look up one client record by code.
+    Returns the Airtable record dict ({'id', 'fields'}) or None.
+    """
+    if not client_code:
+        return None
+    return get_clients().get(client_code)
+
+
+def get_client_fields(client_code):
+    """Fields dict for a client, or None if not found"""
+    record = get_client(client_code)
+    return record.get('fields', {}) if record else None
+
+
+def invalidate():
+    """Drop the snapshot so the next lookup reloads it (call after writes)"""
+    global _loaded_at
+    _loaded_at = 0.0
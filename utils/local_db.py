@@ -0,0 +1,46 @@
+"""
+Dot - Local State DB
+A small SQLite file for state that every worker process on this host
+needs to share (dedup index, dispatch status, sessions).
+
+Nothing here is the source of truth - Airtable is. Losing the file
+(redeploy, new container) just means a few more Airtable round trips.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+
+# ===================
+# CONFIG
+# ===================
+
+STATE_DB_PATH = os.environ.get(
+    'DOT_STATE_DB',
+    os.path.join(tempfile.gettempdir(), 'dot-brain.sqlite3')
+)
+
+_local = threading.local()
+
+
+# ===================
+# CONNECTIONS
+# ===================
+
+def connect():
+    """
+    Get this thread's connection to the state DB.
+    One connection per thread (and per process - never reused across fork).
+    Autocommit mode, WAL so readers don't block the writer.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+
+    conn = sqlite3.connect(STATE_DB_PATH, timeout=5.0, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
@@ -0,0 +1,324 @@
+"""
+Dot - Tracker Cache
+In-process snapshot of the Tracker table, partitioned by client.
+
+Spend charts used to filter Tracker server-side one client at a time,
+and every call made Airtable's formula engine rescan the whole table.
+Instead we page through Tracker once with only the fields the charts
+use, and keep it in memory as columns per client (spend, month, spend
+type, createdTime - parallel lists, one row per record).
+
+After that, refreshes are incremental: only records modified since the
+last sync (LAST_MODIFIED_TIME(), with a safety overlap) are fetched and
+patched in. Deletions don't show up in an incremental fetch, so the
+whole table is reloaded every TRACKER_FULL_RELOAD seconds as well.
+
+Month names and createdTime are parsed once, as records come in, and
+each client's NumPy arrays are built once per change to that client -
+so chart maths is vectorised over ready-made arrays.
+"""
+
+import os
+import time
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils import airtable_client
+
+# ===================
+# CONFIG
+# ===================
+
+AIRTABLE_API_KEY = os.environ.get('AIRTABLE_API_KEY')
+
+TRACKER_TABLE = 'Tracker'
+
+# createdTime comes back on every record regardless of projection
+SNAPSHOT_FIELDS = ['Spend', 'Month', 'Spend type', 'Client Code']
+
+# How stale the snapshot can get before a read fetches recent changes
+CACHE_TTL = float(os.environ.get('TRACKER_CACHE_TTL', '60'))
+
+# Full reload interval - picks up deleted records
+FULL_RELOAD = float(os.environ.get('TRACKER_FULL_RELOAD', '3600'))
+
+# Re-fetch a little before the last sync, in case our clock and Airtable's disagree
+MODIFIED_OVERLAP = 120
+
+COLUMNS = ('id', 'spend', 'month', 'spend_type', 'created', 'month_num', 'created_year', 'created_month')
+
+# The one month list - spend charts label and bucket with these too
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+MONTH_NUM = {m: i + 1 for i, m in enumerate(MONTHS)}
+
+_partitions = {}      # Client code -> {column name -> list}, rows aligned across columns
+_locations = {}       # record ID -> (client code, row index)
+_versions = {}        # Client code -> change counter, bumped on every write to the partition
+_arrays = {}          # (client code, spend type) -> (version, NumPy arrays)
+_synced_at = 0.0      # start of the last successful sync (epoch seconds)
+_full_at = 0.0        # start of the last full reload
+_loaded = False
+_dirty = False        # a write happened - fetch changes on the next read
+
+_data_lock = threading.Lock()      # guards the snapshot
+_refresh_lock = threading.Lock()   # one refresh at a time
+
+
+# ===================
+# SNAPSHOT
+# ===================
+
+def _client_code(value):
+    """Client Code formula / lookup value ('TOW' or ['TOW'])"""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return str(value).strip().upper() if value else None
+
+
+def _parse_spend(value):
+    """Spend as a float - it can be a number or a formatted string ('$5,000')"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            return float(value.replace('$', '').replace(',', '').strip())
+        except ValueError:
+            return None
+    return float(value)
+
+
+def _parse_created(created):
+    """(year, month) of an ISO createdTime ('2025-05-02T...Z', UTC), or (0, 0)"""
+    try:
+        return int(created[:4]), int(created[5:7])
+    except (TypeError, ValueError):
+        return 0, 0
+
+
+def _remove(partitions, locations, record_id):
+    """Drop a record's row - swap with the partition's last row and pop (O(1))"""
+    location = locations.pop(record_id, None)
+    if not location:
+        return
+    code, row = location
+    _versions[code] = _versions.get(code, 0) + 1
+    columns = partitions[code]
+    last = len(columns['id']) - 1
+    if row != last:
+        for name in COLUMNS:
+            columns[name][row] = columns[name][last]
+        locations[columns['id'][row]] = (code, row)
+    for name in COLUMNS:
+        columns[name].pop()
+
+
+def _upsert(partitions, locations, record):
+    """Insert or replace one Tracker record (it may have moved client)"""
+    record_id = record.get('id')
+    fields = record.get('fields', {})
+    _remove(partitions, locations, record_id)
+
+    code = _client_code(fields.get('Client Code'))
+    if not record_id or not code:
+        return
+
+    columns = partitions.get(code)
+    if columns is None:
+        columns = partitions[code] = {name: [] for name in COLUMNS}
+    _versions[code] = _versions.get(code, 0) + 1
+    locations[record_id] = (code, len(columns['id']))
+    created_year, created_month = _parse_created(record.get('createdTime'))
+    columns['id'].append(record_id)
+    columns['spend'].append(_parse_spend(fields.get('Spend')))
+    columns['month'].append(fields.get('Month'))
+    columns['spend_type'].append(fields.get('Spend type'))
+    columns['created'].append(record.get('createdTime'))
+    columns['month_num'].append(MONTH_NUM.get(fields.get('Month'), 0))
+    columns['created_year'].append(created_year)
+    columns['created_month'].append(created_month)
+
+
+def _fetch(since=None):
+    """Tracker records (projected), or only those modified after `since`"""
+    params = {}
+    if since:
+        stamp = datetime.fromtimestamp(since - MODIFIED_OVERLAP, tz=timezone.utc)
+        params['filterByFormula'] = f"IS_AFTER(LAST_MODIFIED_TIME(), '{stamp.strftime('%Y-%m-%dT%H:%M:%S.000Z')}')"
+    return list(airtable_client.iter_records(TRACKER_TABLE, params=params, fields=SNAPSHOT_FIELDS))
+
+
+def _refresh():
+    """Bring the snapshot up to date - full reload or just recent changes"""
+    global _partitions, _locations, _synced_at, _full_at, _loaded, _dirty
+
+    started = time.time()
+    full = not _loaded or started - _full_at >= FULL_RELOAD
+
+    # Cleared before the fetch so a write landing mid-refresh isn't lost
+    was_dirty, _dirty = _dirty, False
+    try:
+        records = _fetch(None if full else _synced_at)
+    except Exception:
+        _dirty = _dirty or was_dirty
+        raise
+
+    if full:
+        partitions, locations = {}, {}
+        for record in records:
+            _upsert(partitions, locations, record)
+        with _data_lock:
+            _partitions, _locations = partitions, locations
+            _arrays.clear()
+            _full_at = started
+        print(f"[tracker_cache] Loaded {len(records)} Tracker records across {len(partitions)} clients")
+    else:
+        with _data_lock:
+            for record in records:
+                _upsert(_partitions, _locations, record)
+        if records:
+            print(f"[tracker_cache] Refreshed {len(records)} changed Tracker records")
+
+    _synced_at = started
+    _loaded = True
+
+
+def _ensure_fresh():
+    """
+    Refresh if older than CACHE_TTL. If a refresh fails we keep serving
+    the previous snapshot. Returns False if there's no snapshot at all.
+    """
+    if not AIRTABLE_API_KEY:
+        return False
+
+    if _loaded and not _dirty and time.time() - _synced_at < CACHE_TTL:
+        return True
+
+    with _refresh_lock:
+        # Another thread may have refreshed while we waited
+        if _loaded and not _dirty and time.time() - _synced_at < CACHE_TTL:
+            return True
+        try:
+            _refresh()
+        except Exception as e:
+            print(f"[tracker_cache] Error refreshing Tracker snapshot: {e}")
+
+    return _loaded
+
+
+def _rows(columns, spend_type):
+    """Chart rows from one partition: Spend set, matching spend type"""
+    return [
+        {'spend': spend, 'month': month, 'createdTime': created}
+        for spend, month, kind, created in zip(
+            columns['spend'], columns['month'], columns['spend_type'], columns['created']
+        )
+        if spend is not None and (spend_type is None or kind == spend_type)
+    ]
+
+
+def _build_arrays(columns, spend_type):
+    """
+    NumPy columns for the chart maths: spend, month (1-12), and the
+    createdTime year / month. Rows without Spend, a Month or a
+    createdTime are left out, as are other spend types.
+    """
+    spend = np.array([np.nan if v is None else v for v in columns['spend']], dtype=np.float64)
+    month = np.array(columns['month_num'], dtype=np.int64)
+    created_year = np.array(columns['created_year'], dtype=np.int64)
+    keep = ~np.isnan(spend) & (month > 0) & (created_year > 0)
+    if spend_type is not None:
+        keep &= np.array([kind == spend_type for kind in columns['spend_type']], dtype=bool)
+    return {
+        'spend': spend[keep],
+        'month': month[keep],
+        'created_year': created_year[keep],
+        'created_month': np.array(columns['created_month'], dtype=np.int64)[keep],
+    }
+
+
+def to_arrays(rows):
+    """Chart arrays (as get_client_arrays) from rows shaped like get_client_rows"""
+    columns = {name: [] for name in ('spend', 'month_num', 'created_year', 'created_month', 'spend_type')}
+    for row in rows:
+        created_year, created_month = _parse_created(row.get('createdTime'))
+        columns['spend'].append(row.get('spend'))
+        columns['month_num'].append(MONTH_NUM.get(row.get('month'), 0))
+        columns['created_year'].append(created_year)
+        columns['created_month'].append(created_month)
+    return _build_arrays(columns, None)
+
+
+def _client_arrays(code, spend_type):
+    """Arrays for one partition, rebuilt only when it has changed (call under _data_lock)"""
+    version = _versions.get(code, 0)
+    cached = _arrays.get((code, spend_type))
+    if cached and cached[0] == version:
+        return cached[1]
+    arrays = _build_arrays(_partitions[code], spend_type)
+    _arrays[(code, spend_type)] = (version, arrays)
+    return arrays
+
+
+# ===================
+# PUBLIC
+# ===================
+
+def get_client_rows(client_code, spend_type='Project budget'):
+    """
+    Tracker rows for one client: list of {'spend', 'month', 'createdTime'}.
+    Returns None if the snapshot couldn't be loaded at all.
+    """
+    if not _ensure_fresh():
+        return None
+    with _data_lock:
+        columns = _partitions.get((client_code or '').upper())
+        return _rows(columns, spend_type) if columns else []
+
+
+def get_rows_by_client(spend_type='Project budget'):
+    """
+    Tracker rows for every client: dict of client code -> rows, shaped
+    like get_client_rows. Returns None if the snapshot couldn't be loaded.
+    """
+    if not _ensure_fresh():
+        return None
+    with _data_lock:
+        by_client = {code: _rows(columns, spend_type) for code, columns in _partitions.items()}
+    return {code: rows for code, rows in by_client.items() if rows}
+
+
+def get_client_arrays(client_code, spend_type='Project budget'):
+    """
+    One client's Tracker rows as NumPy arrays: {'spend', 'month',
+    'created_year', 'created_month'}. Built once per change to the
+    client's records and shared between reads - treat as read-only.
+    Returns None if the snapshot couldn't be loaded at all.
+    """
+    if not _ensure_fresh():
+        return None
+    code = (client_code or '').upper()
+    with _data_lock:
+        if code not in _partitions:
+            return to_arrays([])
+        return _client_arrays(code, spend_type)
+
+
+def get_arrays_by_client(spend_type='Project budget'):
+    """
+    Every client's arrays (as get_client_arrays): dict of client code ->
+    arrays. Returns None if the snapshot couldn't be loaded.
+    """
+    if not _ensure_fresh():
+        return None
+    with _data_lock:
+        by_client = {code: _client_arrays(code, spend_type) for code in _partitions}
+    return {code: arrays for code, arrays in by_client.items() if len(arrays['spend'])}
+
+
+def invalidate():
+    """Fetch recent changes on the next read (call after writing to Tracker)"""
+    global _dirty
+    _dirty = True